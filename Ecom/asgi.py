@@ -13,4 +13,7 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Ecom.settings')
 
+# Under an ASGI server, serve the catalog pages with the async views
+os.environ.setdefault('ASYNC_CATALOG_VIEWS', '1')
+
 application = get_asgi_application()
@@ -12,9 +12,17 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import os
 from pathlib import Path
 
+import environ
+
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
+
+# 🌱 Environment configuration (django-environ)
+# Values come from real env vars, or an optional .env file next to manage.py.
+env = environ.Env()
+if (BASE_DIR / '.env').exists():
+    environ.Env.read_env(BASE_DIR / '.env')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
@@ -45,21 +53,30 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'store.middleware.SlowQueryMiddleware',
+    'store.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'store.middleware.DatabaseRoutingMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
+    'store.middleware.PrerenderedPageMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'store.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'Ecom.urls'
 
+# ⚡ Route catalog pages to store/async_views.py (switched on by Ecom/asgi.py)
+ASYNC_CATALOG_VIEWS = env.bool('ASYNC_CATALOG_VIEWS', default=False)
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Django's engine, plus render timing for store/metrics.py
+        'BACKEND': 'store.metrics.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -90,6 +107,102 @@ DATABASES = {
     }
 }
 
+# Point at another database, e.g. DATABASE_URL=sqlite:////srv/ecom/db.sqlite3
+if env('DATABASE_URL', default=None):
+    DATABASES['default'] = env.db('DATABASE_URL')
+
+# 🚀 DB_PROFILE=production: SQLite tuned for several gunicorn workers
+# - PRAGMAs below are applied to every new connection (store/db.py)
+# - connections are kept open between requests and health-checked
+# - atomic() blocks start with BEGIN IMMEDIATE, so a transaction that reads
+#   and then writes waits for the write lock up front instead of failing
+#   half-way with "database is locked"
+DB_PROFILE = env('DB_PROFILE', default='development')
+
+SQLITE_PRAGMAS = {}
+
+if DB_PROFILE == 'production':
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': env.int('DB_CONN_MAX_AGE', default=600),
+        'CONN_HEALTH_CHECKS': True,
+    })
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+        DATABASES['default'].setdefault('OPTIONS', {})['transaction_mode'] = 'IMMEDIATE'
+
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',          # readers no longer block the writer
+        'synchronous': 'NORMAL',        # safe with WAL, far fewer fsyncs
+        'busy_timeout': env.int('DB_BUSY_TIMEOUT_MS', default=5000),
+        'mmap_size': env.int('DB_MMAP_SIZE', default=256 * 1024 * 1024),
+        'cache_size': -env.int('DB_CACHE_KB', default=64 * 1024),  # negative = KiB
+        'temp_store': 'MEMORY',
+    }
+
+# 📚 Optional read replica for catalog pages (Product / Brand / Category)
+# Locally: REPLICA_DB_PATH=replica.sqlite3, refreshed by `manage.py snapshot_replica`.
+# store.routers.CatalogReadRouter sends catalog reads there unless the request
+# already wrote something or is inside a transaction.
+REPLICA_DB_PATH = env('REPLICA_DB_PATH', default=None)
+
+if REPLICA_DB_PATH:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': REPLICA_DB_PATH,
+        'OPTIONS': dict(DATABASES['default'].get('OPTIONS', {})),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+CATALOG_READ_DB = env('CATALOG_READ_DB', default='replica' if REPLICA_DB_PATH else None)
+
+# After a write, keep this browser on the primary for a few seconds so the
+# redirect that follows still sees its own changes.
+REPLICA_PIN_SECONDS = env.int('REPLICA_PIN_SECONDS', default=10)
+
+DATABASE_ROUTERS = ['store.routers.CatalogReadRouter']
+
+# 🗄 Order archive (store/archive.py, `manage.py archive_orders`)
+# Delivered / cancelled orders older than this move to the archive tables.
+ORDER_ARCHIVE_AFTER_DAYS = env.int('ORDER_ARCHIVE_AFTER_DAYS', default=365)
+ORDER_ARCHIVE_BATCH_SIZE = env.int('ORDER_ARCHIVE_BATCH_SIZE', default=500)
+
+# 📈 Request metrics (store/metrics.py, MetricsMiddleware, /metrics)
+# METRICS_DB: SQLite file the gunicorn workers add their counts to, so
+# /metrics shows every worker. Empty = per-worker numbers only.
+METRICS_ENABLED = env.bool('METRICS_ENABLED', default=True)
+METRICS_DB = env('METRICS_DB', default=str(BASE_DIR / 'metrics.sqlite3') if DB_PROFILE == 'production' else '')
+METRICS_FLUSH_SECONDS = env.int('METRICS_FLUSH_SECONDS', default=10)
+SERVER_TIMING_HEADER = env.bool('SERVER_TIMING_HEADER', default=True)
+
+# 🐢 Slow query log (store/slowlog.py, /staff/slow-queries/)
+# Queries slower than SLOW_QUERY_MS are logged, grouped by fingerprint and
+# (SLOW_QUERY_EXPLAIN) explained once per fingerprint. 0 = off.
+SLOW_QUERY_MS = env.float('SLOW_QUERY_MS', default=100)
+SLOW_QUERY_EXPLAIN = env.bool('SLOW_QUERY_EXPLAIN', default=True)
+
+# 🔬 Sampled cProfile dumps (store/profiling.py, /staff/profiles/)
+# PROFILE_EVERY_N=200 profiles one request in 200; 0 = no sampling.
+# PROFILE_ON_REQUEST lets staff ask for a profile with ?_profile=1.
+# Both off = the middleware is not installed at all.
+PROFILE_EVERY_N = env.int('PROFILE_EVERY_N', default=0)
+PROFILE_ON_REQUEST = env.bool('PROFILE_ON_REQUEST', default=False)
+PROFILE_DIR = env('PROFILE_DIR', default=str(BASE_DIR / 'profiles'))
+PROFILE_KEEP = env.int('PROFILE_KEEP', default=200)
+
+# 🖼 Media serving (store/media.py, /media/...)
+# MEDIA_HASHED_URLS: image URLs carry a content hash and are cached for a
+# year (Cache-Control: immutable). Behind nginx, set MEDIA_ACCEL_REDIRECT to
+# an `internal` location aliased to MEDIA_ROOT (e.g. /protected-media/);
+# behind Apache / lighttpd, MEDIA_X_SENDFILE. Django then only sends headers.
+MEDIA_HASHED_URLS = env.bool('MEDIA_HASHED_URLS', default=True)
+MEDIA_ACCEL_REDIRECT = env('MEDIA_ACCEL_REDIRECT', default='')
+MEDIA_X_SENDFILE = env.bool('MEDIA_X_SENDFILE', default=False)
+
+# 🖨 Pre-rendered catalog pages (store/prerender.py, `manage.py render_catalog`)
+# PRERENDERED_PAGES: visitors without a session cookie get product, brand,
+# category and product list pages from PRERENDER_ROOT instead of the views.
+PRERENDERED_PAGES = env.bool('PRERENDERED_PAGES', default=DB_PROFILE == 'production')
+PRERENDER_ROOT = env('PRERENDER_ROOT', default=str(BASE_DIR / 'prerendered'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -129,6 +242,12 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATIC_URL = '/static/'
 STATICFILES_STORAGE ='whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+STORAGES = {
+    # Uploaded images: stored once per content, content-hash URLs (store/media.py)
+    'default': {'BACKEND': 'store.media.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -6,12 +6,17 @@ This file routes top-level URLs to the application's URL modules.
 Key Structure:
 - /admin/ → Django admin
 - /       → store app (home, products, cart, orders, auth, etc.)
+- /media/ → uploaded images (store.views.media_file)
 """
 
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+
+from store.media import DIGEST_LENGTH
+from store.views import media_file
 
 urlpatterns = [
     # 🛠 Django admin dashboard
@@ -22,6 +27,10 @@ urlpatterns = [
     path('', include('store.urls')),
 ]
 
-# 📸 Serve media files (product images) during development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# 🖼 Uploaded images, in production too (store/media.py):
+# /media/<content hash>/<name> is cached for good, /media/<name> revalidates
+media_prefix = re.escape(settings.MEDIA_URL.lstrip('/'))
+urlpatterns += [
+    re_path(rf'^{media_prefix}(?P<digest>[0-9a-f]{{{DIGEST_LENGTH}}})/(?P<name>.+)$', media_file, name='media_hashed'),
+    re_path(rf'^{media_prefix}(?P<name>.+)$', media_file, name='media'),
+]
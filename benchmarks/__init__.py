@@ -0,0 +1,8 @@
+"""
+📏 Benchmarks
+
+Stand-alone scripts that measure the shop under realistic load. Run them from
+the project root, e.g.::
+
+    python -m benchmarks.sqlite_locking --workers 8
+"""
@@ -0,0 +1,180 @@
+"""
+⚡ gunicorn (sync workers, WSGI) vs uvicorn (ASGI, async catalog views)
+
+Starts each server on the same machine with the same number of worker
+processes, hammers the catalog pages with concurrent keep-alive HTTP clients
+and prints throughput and latency percentiles side by side.
+
+The database is copied to a temp file first, so sessions written by
+product_detail never touch the real db.sqlite3.
+
+    python -m benchmarks.asgi_vs_wsgi --workers 2 --concurrency 32 --duration 20
+
+Needs gunicorn and uvicorn installed (see requirements.txt).
+"""
+import argparse
+import http.client
+import os
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list (seconds)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def copy_database(source):
+    tmp = tempfile.mkdtemp(prefix='ecom-asgibench-')
+    target = os.path.join(tmp, 'bench.sqlite3')
+    src, dst = sqlite3.connect(source), sqlite3.connect(target)
+    src.backup(dst)
+    src.close()
+    dst.close()
+    return target
+
+
+def catalog_urls(db_path):
+    """A realistic mix of catalog pages that exist in this database."""
+    db = sqlite3.connect(db_path)
+    urls = ['/', '/products/']
+    for (pk,) in db.execute('SELECT id FROM store_product ORDER BY id LIMIT 5'):
+        urls.append(f'/products/{pk}/')
+    for (slug,) in db.execute('SELECT slug FROM store_brand ORDER BY id LIMIT 3'):
+        urls.append(f'/brand/{slug}/')
+        urls.append(f'/products/?brand={slug}')
+    for (slug,) in db.execute('SELECT slug FROM store_category ORDER BY id LIMIT 3'):
+        urls.append(f'/category/{slug}/')
+    db.close()
+    return urls
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+def server_command(kind, port, workers):
+    bind = f'127.0.0.1:{port}'
+    if kind == 'gunicorn':
+        return [sys.executable, '-m', 'gunicorn', 'Ecom.wsgi:application',
+                '--workers', str(workers), '--worker-class', 'sync',
+                '--bind', bind, '--log-level', 'warning']
+    return [sys.executable, '-m', 'uvicorn', 'Ecom.asgi:application',
+            '--workers', str(workers), '--host', '127.0.0.1', '--port', str(port),
+            '--log-level', 'warning', '--no-access-log']
+
+
+def hammer(port, urls, concurrency, duration):
+    """
+    ``concurrency`` threads, each with its own keep-alive connection, cycling
+    through ``urls`` until ``duration`` seconds have passed.
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(offset):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        mine = []
+        i = offset
+        while time.perf_counter() < stop_at:
+            url = urls[i % len(urls)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                conn.request('GET', url, headers={'Host': 'localhost'})
+                resp = conn.getresponse()
+                resp.read()
+                if resp.status >= 500:
+                    raise http.client.HTTPException(resp.status)
+                mine.append(time.perf_counter() - start)
+            except (OSError, http.client.HTTPException):
+                with lock:
+                    errors[0] += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': len(latencies) / duration,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+
+def run(kind, db_path, urls, args):
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}', DJANGO_SETTINGS_MODULE='Ecom.settings')
+    proc = subprocess.Popen(server_command(kind, port, args.workers), cwd=BASE_DIR, env=env)
+    try:
+        wait_until_up(port)
+        hammer(port, urls, args.concurrency, min(3, args.duration))   # warm-up
+        return hammer(port, urls, args.concurrency, args.duration)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=15)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=2, help='worker processes per server')
+    parser.add_argument('--concurrency', type=int, default=32, help='concurrent clients')
+    parser.add_argument('--duration', type=float, default=20, help='seconds per server')
+    parser.add_argument('--database', default=str(BASE_DIR / 'db.sqlite3'),
+                        help='SQLite file to copy and serve (default: db.sqlite3)')
+    args = parser.parse_args(argv)
+
+    db_path = copy_database(args.database)
+    urls = catalog_urls(db_path)
+    print(f'{len(urls)} URLs, {args.workers} workers, {args.concurrency} clients, {args.duration:.0f}s each')
+
+    print(f"{'server':<10} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    try:
+        for kind in ('gunicorn', 'uvicorn'):
+            r = run(kind, db_path, urls, args)
+            print(f"{kind:<10} {r['rps']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+                  f"{r['p99_ms']:>8.1f} {r['errors']:>7}")
+    finally:
+        shutil.rmtree(os.path.dirname(db_path), ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+📥 Catalog import benchmark (django-import-export)
+
+Imports a generated product file into a throw-away database and reports
+rows/s and query count for:
+
+- ``bulk``     ➝ store.resources.ProductResource (use_bulk + prefetching loader)
+- ``per-row``  ➝ the same resource with use_bulk off and import-export's
+                 default one-query-per-row instance loader (what the admin
+                 did before); run on a smaller slice, it's slow
+
+Each mode first inserts the file into an empty catalog, then imports it
+again with every price changed (the "update existing SKUs" path).
+
+    python -m benchmarks.catalog_import --rows 100000 --per-row-rows 5000
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def _setup_django(db_path):
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'Ecom.settings'
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    sys.path.insert(0, str(BASE_DIR))
+
+    import django
+    django.setup()
+
+
+def make_dataset(rows, brands, categories, price='1.250'):
+    import tablib
+
+    data = tablib.Dataset(headers=['sku', 'upc', 'name', 'description', 'price', 'stock', 'brand', 'category'])
+    for i in range(rows):
+        data.append((
+            f'IMP{i:07d}', f'7{i:011d}', f'Imported product {i}', '',
+            price, i % 500, brands[i % len(brands)], categories[i % len(categories)],
+        ))
+    return data
+
+
+def timed_import(resource, dataset):
+    from django.db import connection
+
+    queries = 0
+
+    def count(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    # Counted with a wrapper: the debug query log stops at 9000 queries
+    with connection.execute_wrapper(count):
+        start = time.perf_counter()
+        result = resource.import_data(dataset, dry_run=False, use_transactions=True, raise_errors=True)
+        elapsed = time.perf_counter() - start
+    totals = result.totals
+    return {
+        'rows': len(dataset),
+        'seconds': elapsed,
+        'rows_per_sec': len(dataset) / elapsed if elapsed else 0.0,
+        'queries': queries,
+        'new': totals.get('new', 0),
+        'updated': totals.get('update', 0),
+    }
+
+
+def run(rows, per_row_rows):
+    tmp = tempfile.mkdtemp(prefix='ecom-importbench-')
+    db_path = os.path.join(tmp, 'bench.sqlite3')
+    subprocess.run(
+        [sys.executable, 'manage.py', 'migrate', '--verbosity', '0', '--skip-checks'],
+        cwd=BASE_DIR, env=dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}'), check=True,
+    )
+    _setup_django(db_path)
+
+    from import_export.instance_loaders import ModelInstanceLoader
+    from store.models import Brand, Category, Product
+    from store.resources import ProductResource
+
+    class PerRowProductResource(ProductResource):
+        class Meta(ProductResource.Meta):
+            use_bulk = False
+            instance_loader_class = ModelInstanceLoader
+
+    brands = [b.slug for b in Brand.objects.bulk_create(
+        [Brand(name=f'Brand {i}', slug=f'brand-{i}') for i in range(50)])]
+    categories = [c.slug for c in Category.objects.bulk_create(
+        [Category(name=f'Category {i}', slug=f'category-{i}') for i in range(20)])]
+
+    results = []
+    try:
+        for mode, resource_class, n in (('bulk', ProductResource, rows),
+                                        ('per-row', PerRowProductResource, per_row_rows)):
+            if not n:
+                continue
+            Product.objects.all().delete()
+            insert = timed_import(resource_class(), make_dataset(n, brands, categories))
+            update = timed_import(resource_class(), make_dataset(n, brands, categories, price='1.500'))
+            assert Product.objects.filter(price='1.500').count() == n, "update pass lost rows"
+            results.append((mode, 'insert', insert))
+            results.append((mode, 'update', update))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=100_000, help='rows for the bulk import')
+    parser.add_argument('--per-row-rows', type=int, default=5_000,
+                        help='rows for the per-row comparison (0 to skip)')
+    args = parser.parse_args(argv)
+
+    print(f"{'mode':<8} {'pass':<7} {'rows':>8} {'seconds':>8} {'rows/s':>9} {'queries':>8}")
+    for mode, phase, r in run(args.rows, args.per_row_rows):
+        print(f"{mode:<8} {phase:<7} {r['rows']:>8} {r['seconds']:>8.1f} "
+              f"{r['rows_per_sec']:>9.0f} {r['queries']:>8}")
+
+
+if __name__ == '__main__':
+    main()
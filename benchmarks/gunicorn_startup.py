@@ -0,0 +1,219 @@
+"""
+🦄 gunicorn start-up time, first-request latency and per-worker memory
+
+Starts gunicorn with gunicorn.conf.py in up to three set-ups:
+
+- ``cold``:    no preload, no warm-up (every worker imports Django itself)
+- ``preload``: app imported in the master before fork, no warm-up
+- ``warm``:    preload + store/warmup.py (the shipped default)
+
+and for each reports:
+
+- time from launch until ``/`` answers
+- how much slower the first request to each hot URL is than the median of
+  the next rounds (the "after every deploy" latency spike)
+- RSS, PSS and private memory of the master and every worker
+  (``/proc/<pid>/smaps_rollup``, Linux only). PSS splits shared pages
+  between the processes sharing them, so the PSS total is what the workers
+  really cost; with preload it drops as pages are shared copy-on-write.
+
+The database is copied to a temp file first, like the other benchmarks.
+
+    python -m benchmarks.gunicorn_startup --workers 4 --database /srv/ecom/db.sqlite3
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from .asgi_vs_wsgi import catalog_urls, copy_database, free_port
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+VARIANTS = {
+    'cold': {'GUNICORN_PRELOAD': 'False', 'GUNICORN_WARMUP': 'False'},
+    'preload': {'GUNICORN_PRELOAD': 'True', 'GUNICORN_WARMUP': 'False'},
+    'warm': {'GUNICORN_PRELOAD': 'True', 'GUNICORN_WARMUP': 'True'},
+}
+
+
+def get(port, url, timeout=60):
+    """One GET on a new connection (sync workers close it anyway). Returns ``(status, ms)``."""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    started = time.perf_counter()
+    try:
+        conn.request('GET', url, headers={'Host': 'localhost'})
+        response = conn.getresponse()
+        response.read()
+        return response.status, (time.perf_counter() - started) * 1000
+    finally:
+        conn.close()
+
+
+def wait_for_first_response(port, proc, timeout=120):
+    """Seconds until the server answers ``/`` (any status)."""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if proc.poll() is not None:
+            raise RuntimeError(f'gunicorn exited with status {proc.returncode}')
+        try:
+            get(port, '/')
+            return time.perf_counter() - started
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f'server on port {port} did not answer within {timeout}s')
+
+
+# 🧠 Memory
+# ---------
+
+def children(pid):
+    """Direct child processes of ``pid`` (gunicorn's workers)."""
+    found = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as handle:
+                stat = handle.read()
+        except OSError:
+            continue
+        # "pid (comm) state ppid ...": comm may contain spaces, so split after ")"
+        if int(stat.rsplit(')', 1)[1].split()[1]) == pid:
+            found.append(int(entry))
+    return sorted(found)
+
+
+def memory(pid):
+    """``{'rss_mb', 'pss_mb', 'private_mb'}`` of one process."""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as handle:
+        for line in handle:
+            name, _, rest = line.partition(':')
+            if rest.strip().endswith('kB'):
+                fields[name] = int(rest.split()[0]) / 1024
+    return {
+        'rss_mb': round(fields.get('Rss', 0), 1),
+        'pss_mb': round(fields.get('Pss', 0), 1),
+        'private_mb': round(fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0), 1),
+    }
+
+
+def wait_for_workers(pid, count, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        workers = children(pid)
+        if len(workers) >= count:
+            return workers
+        time.sleep(0.1)
+    return children(pid)
+
+
+# 🏁 One set-up
+# -------------
+
+def run(variant, db_path, urls, args):
+    port = free_port()
+    env = dict(
+        os.environ, **VARIANTS[variant],
+        DATABASE_URL=f'sqlite:///{db_path}', DJANGO_SETTINGS_MODULE='Ecom.settings',
+    )
+    command = [sys.executable, '-m', 'gunicorn', '-c', str(BASE_DIR / 'gunicorn.conf.py'),
+               '--bind', f'127.0.0.1:{port}', '--workers', str(args.workers), '--log-level', 'warning']
+    proc = subprocess.Popen(command, cwd=BASE_DIR, env=env)
+    try:
+        startup = wait_for_first_response(port, proc)
+
+        first = {url: get(port, url)[1] for url in urls}
+        later = {url: [] for url in urls}
+        for _ in range(args.rounds):
+            for url in urls:
+                later[url].append(get(port, url)[1])
+
+        workers = wait_for_workers(proc.pid, args.workers)
+        master = memory(proc.pid)
+        per_worker = [memory(pid) for pid in workers]
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    pages = []
+    for url in urls:
+        median = statistics.median(later[url])
+        pages.append({
+            'url': url, 'first_ms': round(first[url], 1), 'median_ms': round(median, 1),
+            'first_extra_ms': round(max(0.0, first[url] - median), 1),
+        })
+    worst = max(pages, key=lambda page: page['first_extra_ms'])
+    return {
+        'variant': variant,
+        'startup_s': round(startup, 2),
+        'first_extra_ms': round(sum(page['first_extra_ms'] for page in pages), 1),
+        'worst_first_extra_ms': worst['first_extra_ms'],
+        'worst_url': worst['url'],
+        'pages': pages,
+        'master': master,
+        'workers': per_worker,
+        'workers_pss_mb': round(sum(w['pss_mb'] for w in per_worker), 1),
+        'total_pss_mb': round(master['pss_mb'] + sum(w['pss_mb'] for w in per_worker), 1),
+    }
+
+
+def print_report(results):
+    print(f"{'set-up':<8} {'start s':>8} {'1st-hit +ms':>12} {'worst +ms':>10} "
+          f"{'worker RSS':>11} {'worker PSS':>11} {'private':>8} {'total PSS':>10}")
+    for r in results:
+        workers = r['workers'] or [{'rss_mb': 0, 'pss_mb': 0, 'private_mb': 0}]
+        print(f"{r['variant']:<8} {r['startup_s']:>8.2f} {r['first_extra_ms']:>12.1f} "
+              f"{r['worst_first_extra_ms']:>10.1f} "
+              f"{statistics.mean(w['rss_mb'] for w in workers):>9.1f}MB "
+              f"{statistics.mean(w['pss_mb'] for w in workers):>9.1f}MB "
+              f"{statistics.mean(w['private_mb'] for w in workers):>6.1f}MB "
+              f"{r['total_pss_mb']:>8.1f}MB")
+    print("(1st-hit +ms: first request minus median, summed over the URLs; "
+          "worker columns: mean per worker; total PSS: master + all workers)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers')
+    parser.add_argument('--rounds', type=int, default=5, help='requests per URL after the first one')
+    parser.add_argument('--variants', default='cold,preload,warm',
+                        help=f"comma-separated, from: {', '.join(VARIANTS)}")
+    parser.add_argument('--database', default=str(BASE_DIR / 'db.sqlite3'),
+                        help='SQLite file to copy and serve (default: db.sqlite3)')
+    parser.add_argument('--output', help='also write the full report as JSON')
+    args = parser.parse_args(argv)
+
+    variants = [v.strip() for v in args.variants.split(',') if v.strip()]
+    unknown = set(variants) - set(VARIANTS)
+    if unknown:
+        parser.error(f"unknown variant(s): {', '.join(sorted(unknown))}")
+
+    db_path = copy_database(args.database)
+    urls = catalog_urls(db_path) + ['/api/autocomplete/?q=a']
+    db = sqlite3.connect(db_path)
+    for (upc,) in db.execute('SELECT upc FROM store_product ORDER BY id LIMIT 1'):
+        urls.append(f'/api/lookup/?code={upc}')
+    db.close()
+    print(f'{len(urls)} URLs, {args.workers} workers, {args.rounds} rounds after the first request')
+    try:
+        results = [run(variant, db_path, urls, args) for variant in variants]
+    finally:
+        shutil.rmtree(os.path.dirname(db_path), ignore_errors=True)
+
+    print_report(results)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,507 @@
+"""
+🚦 Scenario load test: shopper journeys with per-endpoint latency percentiles
+
+Virtual users loop over scripted journeys until ``--duration`` is up:
+
+- ``browse`` (anonymous): home ➝ product_list filtered by brand ➝ by brand
+  and category ➝ a few product_detail pages
+- ``buy`` (logged in): home ➝ filtered product_list ➝ product_detail ➝
+  add_to_cart ➝ cart_detail ➝ update_cart_item ➝ checkout. There is no
+  checkout view yet, so "checkout" is the cart page followed by
+  remove_cart_item for every line (it also keeps carts from growing).
+
+Two targets:
+
+- ``--target client`` (default): in-process Django test clients on a temp
+  copy of ``--database``; one ``loadtest-<n>`` customer per virtual user is
+  created in the copy.
+- ``--target http://127.0.0.1:8000``: a running server (runserver, gunicorn,
+  uvicorn). Customers log in through /login/ as ``--username`` (a pattern,
+  default: the ``generate_fake_data`` customers) with ``--password``.
+  Product ids and slugs are read from ``--database``, which should be the
+  database the server uses.
+
+Concurrency is threads (``--runner threads``) or one asyncio loop with
+Django's AsyncClient (``--runner asyncio``, in-process only). In-process
+runs honour ``DB_PROFILE``: with the default SQLite settings, concurrent
+cart writes fail with "database is locked" (counted as errors), see
+benchmarks/sqlite_locking.py.
+
+The JSON report has throughput and p50/p95/p99 per endpoint (URL name).
+``--baseline`` compares against an earlier report and exits with status 1
+when an endpoint's p95 or the overall throughput got worse by more than
+``--max-regression`` percent::
+
+    python -m benchmarks.load_test --users 8 --duration 30 --output benchmarks/baseline.json
+    # ... change something ...
+    python -m benchmarks.load_test --users 8 --duration 30 --baseline benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import random
+import re
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, namedtuple
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+from .asgi_vs_wsgi import copy_database, percentile
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+Step = namedtuple('Step', 'name method path data')
+
+CART_ITEM = re.compile(r'/cart/update/(\d+)/')
+
+
+# 🗺 Catalog sample (what the journeys click on)
+# ----------------------------------------------
+
+def load_catalog(db_path, rng, size=1000):
+    """Product ids and brand / category slugs that have products, sampled with ``rng``."""
+    db = sqlite3.connect(db_path)
+    try:
+        products = [pk for (pk,) in db.execute('SELECT id FROM store_product ORDER BY id')]
+        brands = [slug for (slug,) in db.execute(
+            'SELECT slug FROM store_brand b WHERE EXISTS '
+            '(SELECT 1 FROM store_product p WHERE p.brand_id = b.id) ORDER BY id')]
+        categories = [slug for (slug,) in db.execute(
+            'SELECT slug FROM store_category c WHERE EXISTS '
+            '(SELECT 1 FROM store_product p WHERE p.category_id = c.id) ORDER BY id')]
+    finally:
+        db.close()
+    if not products or not brands or not categories:
+        raise SystemExit(f'{db_path}: no products with brands and categories to browse '
+                         f'(fill a copy with manage.py generate_fake_data and pass --database)')
+    return {
+        'products': rng.sample(products, min(size, len(products))),
+        'brands': rng.sample(brands, min(size, len(brands))),
+        'categories': rng.sample(categories, min(size, len(categories))),
+    }
+
+
+# 🧭 Journeys
+# -----------
+# Generators: ``yield Step(...)`` sends a request, the response body comes
+# back from the yield. A failed request ends the journey.
+
+def browse(catalog, rng):
+    yield Step('home', 'GET', '/', None)
+    brand = rng.choice(catalog['brands'])
+    yield Step('product_list', 'GET', f'/products/?brand={brand}', None)
+    yield Step('product_list', 'GET', f"/products/?brand={brand}&category={rng.choice(catalog['categories'])}", None)
+    for _ in range(rng.randint(1, 3)):
+        yield Step('product_detail', 'GET', f"/products/{rng.choice(catalog['products'])}/", None)
+
+
+def buy(catalog, rng):
+    yield Step('home', 'GET', '/', None)
+    yield Step('product_list', 'GET', f"/products/?category={rng.choice(catalog['categories'])}", None)
+    product = rng.choice(catalog['products'])
+    yield Step('product_detail', 'GET', f'/products/{product}/', None)
+    yield Step('add_to_cart', 'POST', f'/cart/add/{product}/', {'quantity': rng.randint(1, 3)})
+    page = yield Step('cart_detail', 'GET', '/cart/', None)
+    items = CART_ITEM.findall(page)
+    if items:
+        yield Step('update_cart_item', 'POST', f'/cart/update/{items[0]}/', {'quantity': rng.randint(1, 5)})
+    # "Checkout": review the cart, then empty it
+    page = yield Step('cart_detail', 'GET', '/cart/', None)
+    for item in dict.fromkeys(CART_ITEM.findall(page)):
+        yield Step('remove_cart_item', 'POST', f'/cart/remove/{item}/', {})
+
+
+# name ➝ (weight, needs a logged-in customer, journey)
+JOURNEYS = {
+    'browse': (3, False, browse),
+    'buy': (1, True, buy),
+}
+
+
+# 📊 Recording
+# ------------
+
+class Recorder:
+    """One per virtual user (no locking); merged at the end."""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = Counter()
+        self.journeys = Counter()
+
+    def add(self, name, seconds, ok):
+        self.latencies.setdefault(name, []).append(seconds)
+        if not ok:
+            self.errors[name] += 1
+
+    def merge(self, other):
+        for name, values in other.latencies.items():
+            self.latencies.setdefault(name, []).extend(values)
+        self.errors.update(other.errors)
+        self.journeys.update(other.journeys)
+
+
+def _stats(values, errors, elapsed):
+    values = sorted(values)
+    return {
+        'requests': len(values),
+        'errors': errors,
+        'error_rate': round(errors / len(values), 4) if values else 0.0,
+        'rps': round(len(values) / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+        'p50_ms': round(percentile(values, 50) * 1000, 2),
+        'p95_ms': round(percentile(values, 95) * 1000, 2),
+        'p99_ms': round(percentile(values, 99) * 1000, 2),
+        'max_ms': round(values[-1] * 1000, 2) if values else 0.0,
+    }
+
+
+def report(recorder, elapsed, config):
+    everything = [v for values in recorder.latencies.values() for v in values]
+    return {
+        'config': config,
+        'seconds': round(elapsed, 2),
+        'journeys': dict(recorder.journeys),
+        'total': _stats(everything, sum(recorder.errors.values()), elapsed),
+        'endpoints': {
+            name: _stats(values, recorder.errors[name], elapsed)
+            for name, values in sorted(recorder.latencies.items())
+        },
+    }
+
+
+# 🔌 Transports
+# -------------
+
+class ClientSession:
+    """In-process: Django's test client, full middleware stack, no sockets."""
+
+    def __init__(self, user=None):
+        from django.test import Client
+
+        # A view error is a 500 to count, like over HTTP, not an exception
+        self.client = Client(raise_request_exception=False)
+        if user is not None:
+            self.client.force_login(user)
+
+    def send(self, step):
+        if step.method == 'POST':
+            response = self.client.post(step.path, step.data)
+        else:
+            response = self.client.get(step.path)
+        return response.status_code, response.content.decode('utf-8', 'replace')
+
+
+class AsyncClientSession:
+    """In-process through the ASGI handler (async views run natively)."""
+
+    def __init__(self):
+        from django.test import AsyncClient
+
+        self.client = AsyncClient(raise_request_exception=False)
+
+    async def login(self, user):
+        await self.client.aforce_login(user)
+
+    async def send(self, step):
+        if step.method == 'POST':
+            response = await self.client.post(step.path, step.data)
+        else:
+            response = await self.client.get(step.path)
+        return response.status_code, response.content.decode('utf-8', 'replace')
+
+
+class HttpSession:
+    """Keep-alive HTTP/1.1 with a cookie jar and Django's CSRF token handling."""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        self.cookies = {}
+
+    def login(self, username, password):
+        self.send(Step('login', 'GET', '/login/', None))   # sets the csrftoken cookie
+        status, _ = self.send(Step('login', 'POST', '/login/', {'username': username, 'password': password}))
+        if status != 302 or 'sessionid' not in self.cookies:
+            raise SystemExit(f'login failed for {username!r} (HTTP {status})')
+
+    def send(self, step):
+        headers = {'Host': self.host}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+        body = None
+        if step.method == 'POST':
+            body = urlencode({**step.data, 'csrfmiddlewaretoken': self.cookies.get('csrftoken', '')})
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        try:
+            self.conn.request(step.method, step.path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            content = response.read()
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            return 0, ''
+        for cookie in response.headers.get_all('Set-Cookie') or ():
+            name, _, value = cookie.split(';', 1)[0].partition('=')
+            self.cookies[name.strip()] = value.strip()
+        return response.status, content.decode('utf-8', 'replace')
+
+    def close(self):
+        self.conn.close()
+
+
+# 🏃 Virtual users
+# ----------------
+
+def _pick_journey(rng):
+    names = list(JOURNEYS)
+    return rng.choices(names, weights=[JOURNEYS[name][0] for name in names])[0]
+
+
+def run_journey(journey, send, recorder, catalog, rng):
+    steps = journey(catalog, rng)
+    body = None
+    while True:
+        try:
+            step = steps.send(body)
+        except StopIteration:
+            return
+        start = time.perf_counter()
+        status, body = send(step)
+        ok = 0 < status < 400
+        recorder.add(step.name, time.perf_counter() - start, ok)
+        if not ok:
+            steps.close()
+            return
+
+
+async def run_journey_async(journey, send, recorder, catalog, rng):
+    steps = journey(catalog, rng)
+    body = None
+    while True:
+        try:
+            step = steps.send(body)
+        except StopIteration:
+            return
+        start = time.perf_counter()
+        status, body = await send(step)
+        ok = 0 < status < 400
+        recorder.add(step.name, time.perf_counter() - start, ok)
+        if not ok:
+            steps.close()
+            return
+
+
+def thread_users(sessions, catalog, seed, stop_at):
+    """One thread per ``(anonymous, customer)`` session pair until ``stop_at``."""
+    recorders = [Recorder() for _ in sessions]
+
+    def user(n):
+        anonymous, customer = sessions[n]
+        rng = random.Random(seed * 1000 + n)
+        while time.perf_counter() < stop_at:
+            name = _pick_journey(rng)
+            _weight, needs_login, journey = JOURNEYS[name]
+            session = customer if needs_login else anonymous
+            run_journey(journey, session.send, recorders[n], catalog, rng)
+            recorders[n].journeys[name] += 1
+
+    threads = [threading.Thread(target=user, args=(n,)) for n in range(len(sessions))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return recorders
+
+
+async def async_users(sessions, catalog, seed, stop_at):
+    recorders = [Recorder() for _ in sessions]
+
+    async def user(n):
+        anonymous, customer = sessions[n]
+        rng = random.Random(seed * 1000 + n)
+        while time.perf_counter() < stop_at:
+            name = _pick_journey(rng)
+            _weight, needs_login, journey = JOURNEYS[name]
+            session = customer if needs_login else anonymous
+            await run_journey_async(journey, session.send, recorders[n], catalog, rng)
+            recorders[n].journeys[name] += 1
+
+    await asyncio.gather(*(user(n) for n in range(len(sessions))))
+    return recorders
+
+
+# 🧪 Runs
+# -------
+
+def _setup_django(db_path):
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'Ecom.settings'
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    sys.path.insert(0, str(BASE_DIR))
+
+    import django
+    django.setup()
+
+    # The test clients send Host: testserver (the test runner allows it the same way)
+    from django.conf import settings
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+
+
+def _customers(count):
+    from django.contrib.auth.models import User
+
+    users = []
+    for n in range(count):
+        user, created = User.objects.get_or_create(username=f'loadtest-{n}')
+        if created:
+            user.set_unusable_password()
+            user.save(update_fields=['password'])
+        users.append(user)
+    return users
+
+
+def _phases(run, args):
+    """Warm-up (discarded), then the measured run: ``(recorder, seconds)``."""
+    if args.warmup:
+        run(time.perf_counter() + args.warmup)
+    started = time.perf_counter()
+    recorders = run(started + args.duration)
+    elapsed = time.perf_counter() - started
+    total = Recorder()
+    for recorder in recorders:
+        total.merge(recorder)
+    return total, elapsed
+
+
+def run_in_process(args, catalog):
+    db_path = copy_database(args.database)
+    try:
+        _setup_django(db_path)
+        customers = _customers(args.users)
+        if args.runner == 'asyncio':
+            async def make_sessions():
+                sessions = []
+                for user in customers:
+                    anonymous, customer = AsyncClientSession(), AsyncClientSession()
+                    await customer.login(user)
+                    sessions.append((anonymous, customer))
+                return sessions
+
+            sessions = asyncio.run(make_sessions())
+            return _phases(lambda stop_at: asyncio.run(async_users(sessions, catalog, args.seed, stop_at)), args)
+
+        sessions = [(ClientSession(), ClientSession(user)) for user in customers]
+        return _phases(lambda stop_at: thread_users(sessions, catalog, args.seed, stop_at), args)
+    finally:
+        from django.db import connections
+
+        connections.close_all()
+        shutil.rmtree(os.path.dirname(db_path), ignore_errors=True)
+
+
+def run_http(args, catalog):
+    sessions = []
+    for n in range(args.users):
+        customer = HttpSession(args.target)
+        customer.login(args.username.format(n=n), args.password)
+        sessions.append((HttpSession(args.target), customer))
+    try:
+        return _phases(lambda stop_at: thread_users(sessions, catalog, args.seed, stop_at), args)
+    finally:
+        for pair in sessions:
+            for session in pair:
+                session.close()
+
+
+# 📐 Baseline comparison
+# ----------------------
+
+def compare(current, baseline, max_regression):
+    """
+    ``[(endpoint, metric, before, after, change %, regressed)]``: p50/p95/p99
+    per endpoint plus the overall rps and error rate. Only p95, rps and an
+    error rate up by more than one point can fail the run (p99 of a short
+    run is too noisy to gate on).
+    """
+    rows = []
+    for name, after in current['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if not before:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+            change = (after[metric] - before[metric]) / before[metric] * 100 if before[metric] else 0.0
+            rows.append((name, metric, before[metric], after[metric], change,
+                         metric == 'p95_ms' and change > max_regression))
+    before, after = baseline['total']['rps'], current['total']['rps']
+    change = (after - before) / before * 100 if before else 0.0
+    rows.append(('(total)', 'rps', before, after, change, -change > max_regression))
+    before, after = baseline['total'].get('error_rate', 0.0) * 100, current['total']['error_rate'] * 100
+    rows.append(('(total)', 'errors%', before, after, after - before, after - before > 1))
+    return rows
+
+
+def print_report(result):
+    total = result['total']
+    print(f"{total['requests']} requests in {result['seconds']:.1f}s: {total['rps']:.1f} req/s, "
+          f"{total['errors']} error(s), journeys {result['journeys']}")
+    print(f"{'endpoint':<18} {'req':>7} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, r in result['endpoints'].items():
+        print(f"{name:<18} {r['requests']:>7} {r['errors']:>5} {r['rps']:>8.1f} "
+              f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--target', default='client',
+                        help='"client" (in-process) or a server URL such as http://127.0.0.1:8000')
+    parser.add_argument('--runner', choices=('threads', 'asyncio'), default='threads',
+                        help='concurrency model (asyncio: in-process only)')
+    parser.add_argument('--users', type=int, default=8, help='concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=30, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=5, help='unmeasured seconds first')
+    parser.add_argument('--seed', type=int, default=1, help='journey / catalog sampling seed')
+    parser.add_argument('--database', default=str(BASE_DIR / 'db.sqlite3'),
+                        help='SQLite file to sample the catalog from (and to copy, in-process)')
+    parser.add_argument('--username', default='gen-user{n:07d}',
+                        help='HTTP target: customer username pattern, {n} = 0..users-1')
+    parser.add_argument('--password', default='fake-pass', help='HTTP target: customer password')
+    parser.add_argument('--output', help='write the JSON report here (default: stdout)')
+    parser.add_argument('--baseline', help='earlier JSON report to compare against')
+    parser.add_argument('--max-regression', type=float, default=10.0,
+                        help='percent p95 / throughput change that fails the comparison')
+    args = parser.parse_args(argv)
+
+    in_process = args.target == 'client'
+    if args.runner == 'asyncio' and not in_process:
+        parser.error('--runner asyncio needs --target client')
+
+    catalog = load_catalog(args.database, random.Random(args.seed))
+    recorder, elapsed = (run_in_process if in_process else run_http)(args, catalog)
+    config = {key: getattr(args, key) for key in ('target', 'runner', 'users', 'duration', 'warmup', 'seed')}
+    config['database'] = os.path.basename(args.database)
+    result = report(recorder, elapsed, config)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2) + '\n')
+        print_report(result)
+    else:
+        print(json.dumps(result, indent=2))
+
+    if args.baseline:
+        rows = compare(result, json.loads(Path(args.baseline).read_text()), args.max_regression)
+        print(f"\nvs {args.baseline}:", file=sys.stderr)
+        for name, metric, before, after, change, regressed in rows:
+            flag = '  ⚠ regression' if regressed else ''
+            print(f"  {name:<18} {metric:<7} {before:>9.1f} ➝ {after:>9.1f} ({change:+.1f}%){flag}", file=sys.stderr)
+        if any(row[-1] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
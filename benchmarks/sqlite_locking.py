@@ -0,0 +1,146 @@
+"""
+🔒 SQLite lock-contention benchmark
+
+Simulates several gunicorn workers adding items to their carts at the same
+time, once with the default SQLite settings and once with DB_PROFILE=production
+(WAL + busy_timeout + BEGIN IMMEDIATE), and reports the "database is locked"
+error rate of each.
+
+Each run uses a fresh throw-away database under a temp directory, so the real
+db.sqlite3 is never touched.
+
+    python -m benchmarks.sqlite_locking --workers 8 --ops 300
+"""
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PROFILES = ('development', 'production')
+
+
+def _setup_django(db_path, profile):
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'Ecom.settings'
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['DB_PROFILE'] = profile
+    sys.path.insert(0, str(BASE_DIR))
+
+    import django
+    django.setup()
+
+
+def _seed(db_path, profile, workers):
+    """Create one user per worker and a handful of products."""
+    _setup_django(db_path, profile)
+    from django.contrib.auth.models import User
+    from store.models import Product
+
+    User.objects.bulk_create([User(username=f'bench{i}') for i in range(workers)])
+    Product.objects.bulk_create([
+        Product(sku=f'BENCH{i}', upc=f'999{i:05d}', name=f'Bench {i}',
+                description='', price='1.000', stock=1000)
+        for i in range(20)
+    ])
+
+
+def _worker(db_path, profile, worker_id, ops, start_at, results):
+    """
+    Repeats the add_to_cart write path: read the cart, then create or bump
+    a CartItem, all inside one transaction.
+    """
+    _setup_django(db_path, profile)
+    from django.contrib.auth.models import User
+    from django.db import OperationalError, transaction
+    from store.models import Cart, CartItem, Product
+
+    user = User.objects.get(username=f'bench{worker_id}')
+    product_ids = list(Product.objects.values_list('id', flat=True))
+
+    ok = locked = 0
+    while time.time() < start_at:   # start every worker at the same moment
+        time.sleep(0.001)
+
+    begin = time.perf_counter()
+    for i in range(ops):
+        try:
+            with transaction.atomic():
+                cart, _ = Cart.objects.get_or_create(user=user)
+                item, created = CartItem.objects.get_or_create(
+                    cart=cart,
+                    product_id=product_ids[i % len(product_ids)],
+                    defaults={'quantity': 1},
+                )
+                if not created:
+                    item.quantity += 1
+                    item.save()
+            ok += 1
+        except OperationalError as exc:
+            if 'locked' not in str(exc):
+                raise
+            locked += 1
+    results.put((ok, locked, time.perf_counter() - begin))
+
+
+def run_profile(profile, workers, ops):
+    tmp = tempfile.mkdtemp(prefix='ecom-lockbench-')
+    db_path = os.path.join(tmp, 'bench.sqlite3')
+
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}', DB_PROFILE=profile)
+    subprocess.run(
+        [sys.executable, 'manage.py', 'migrate', '--verbosity', '0', '--skip-checks'],
+        cwd=BASE_DIR, env=env, check=True,
+    )
+
+    ctx = multiprocessing.get_context('spawn')
+    seeder = ctx.Process(target=_seed, args=(db_path, profile, workers))
+    seeder.start()
+    seeder.join()
+
+    results = ctx.Queue()
+    start_at = time.time() + 3   # leave time for every process to import Django
+    procs = [
+        ctx.Process(target=_worker, args=(db_path, profile, n, ops, start_at, results))
+        for n in range(workers)
+    ]
+    for proc in procs:
+        proc.start()
+    rows = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+
+    ok = sum(r[0] for r in rows)
+    locked = sum(r[1] for r in rows)
+    elapsed = max(r[2] for r in rows)
+    total = ok + locked
+    return {
+        'profile': profile,
+        'attempts': total,
+        'committed': ok,
+        'locked_errors': locked,
+        'error_rate': locked / total if total else 0.0,
+        'commits_per_sec': ok / elapsed if elapsed else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=8, help='concurrent processes')
+    parser.add_argument('--ops', type=int, default=300, help='cart writes per process')
+    parser.add_argument('--profile', choices=PROFILES, action='append',
+                        help='only run this profile (default: both)')
+    args = parser.parse_args(argv)
+
+    print(f"{'profile':<12} {'attempts':>9} {'locked':>7} {'error rate':>11} {'commits/s':>10}")
+    for profile in args.profile or PROFILES:
+        r = run_profile(profile, args.workers, args.ops)
+        print(f"{r['profile']:<12} {r['attempts']:>9} {r['locked_errors']:>7} "
+              f"{r['error_rate']:>10.1%} {r['commits_per_sec']:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
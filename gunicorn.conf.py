@@ -0,0 +1,74 @@
+"""
+🦄 gunicorn settings (picked up automatically from this directory)
+
+    gunicorn                              # same as: gunicorn -c gunicorn.conf.py Ecom.wsgi:application
+    WEB_CONCURRENCY=8 gunicorn
+
+The app is imported once in the master (``preload_app``) and warmed up
+there (store/warmup.py): templates compiled, catalog indexes built, each hot
+view called once. Workers are forked from that state, so a new or recycled
+worker answers its first request as fast as its thousandth, and shares
+those pages with its siblings until it writes to them (``gc.freeze()``
+keeps the garbage collector from doing that).
+
+Measure it with ``python -m benchmarks.gunicorn_startup``.
+"""
+import gc
+import multiprocessing
+
+import environ
+
+
+env = environ.Env()
+
+wsgi_app = 'Ecom.wsgi:application'
+bind = env('GUNICORN_BIND', default='0.0.0.0:8000')
+workers = env.int('WEB_CONCURRENCY', default=multiprocessing.cpu_count() * 2 + 1)
+timeout = env.int('GUNICORN_TIMEOUT', default=30)
+
+# Recycle workers now and then (leaks); cheap, since they fork warm
+max_requests = env.int('GUNICORN_MAX_REQUESTS', default=1000)
+max_requests_jitter = env.int('GUNICORN_MAX_REQUESTS_JITTER', default=100)
+
+# 🔥 Preload + warm-up
+# GUNICORN_PRELOAD=False: every worker imports and warms up on its own
+# (slower start, no sharing, but code changes load on `kill -HUP`).
+preload_app = env.bool('GUNICORN_PRELOAD', default=True)
+WARMUP = env.bool('GUNICORN_WARMUP', default=True)
+
+
+def _warm_up(log, where):
+    from store.warmup import warm_up
+
+    report = warm_up()
+    slow = max(report['requests'], key=lambda r: r[2], default=None)
+    log.info(
+        "warm-up (%s): %d templates, catalog caches %s ms, %d requests%s in %.2fs",
+        where, report['templates'], report['caches_ms'], len(report['requests']),
+        f" (slowest {slow[0]} {slow[2]} ms)" if slow else "", report['seconds'],
+    )
+
+
+def when_ready(server):
+    """Master, app loaded (with preload), before the first fork."""
+    if not preload_app:
+        return
+    if WARMUP:
+        _warm_up(server.log, 'master')
+
+    # SQLite handles must not be shared with the children
+    from django.db import connections
+    connections.close_all()
+
+    # Everything allocated so far stays put: the workers' GC never touches
+    # (and so never un-shares) these pages
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    """Each worker, before it accepts connections."""
+    if WARMUP and not preload_app:
+        _warm_up(worker.log, f'worker {worker.pid}')
+
+    from store.warmup import connect
+    connect()
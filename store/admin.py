@@ -1,59 +1,205 @@
-from django.contrib import admin
-from import_export import resources
+from collections import Counter
+
+from django.contrib import admin, messages
 from import_export.admin import ImportExportModelAdmin
 from .models import (
     Product,
     Order,
     OrderItem,
+    OrderEvent,
+    ArchivedOrder,
+    ArchivedOrderItem,
     Cart,
     CartItem,
     Category,
     Brand,
     Profile,
 )
+from .bulk import delete_products, transition_orders
+from .orders import with_totals
+from .resources import BrandResource, CategoryResource, ProductResource
+
+# ⚡ Admin built for big tables:
+# - list_select_related on every changelist that shows a related object
+# - autocomplete widgets instead of <select> with every Product / Order / User
+# - text-box filters instead of dropdowns listing every row of a table
+# - no full COUNT(*) of the unfiltered table on each page
+# - catalog import / export in bulk mode (store/resources.py)
+
+
+# 🔎 Text-box list filters
+# ------------------------
+
+class InputFilter(admin.SimpleListFilter):
+    """
+    List filter rendered as a small text box ("type a SKU / username / id")
+    instead of one link per row of the related table.
+    Subclasses set ``title``, ``parameter_name`` and ``lookup``.
+    """
+    template = 'admin/store/input_filter.html'
+    lookup = None
+
+    def lookups(self, request, model_admin):
+        # Must be non-empty, otherwise Django hides the filter
+        return (('', ''),)
+
+    def queryset(self, request, queryset):
+        value = (self.value() or '').strip()
+        if not value:
+            return queryset
+        return queryset.filter(**{self.lookup: value})
+
+    def choices(self, changelist):
+        # Keep the other active filters / search / ordering when submitting
+        yield {
+            'value': self.value() or '',
+            'query_parts': [
+                (key, value) for key, value in changelist.params.items()
+                if key != self.parameter_name
+            ],
+        }
+
+
+class BrandSlugFilter(InputFilter):
+    title = 'brand (slug)'
+    parameter_name = 'brand_slug'
+    lookup = 'brand__slug'
+
+
+class CategorySlugFilter(InputFilter):
+    title = 'category (slug)'
+    parameter_name = 'category_slug'
+    lookup = 'category__slug'
+
+
+class UsernameFilter(InputFilter):
+    title = 'username'
+    parameter_name = 'username'
+    lookup = 'user__username'
+
+
+class OrderIdFilter(InputFilter):
+    title = 'order #'
+    parameter_name = 'order_id'
+    lookup = 'order_id'
+
+    def queryset(self, request, queryset):
+        if self.value() and not self.value().strip().isdigit():
+            return queryset.none()
+        return super().queryset(request, queryset)
+
+
+class ProductSkuFilter(InputFilter):
+    title = 'product SKU'
+    parameter_name = 'sku'
+    lookup = 'product__sku'
+
+
+class CartUserFilter(InputFilter):
+    title = 'cart owner'
+    parameter_name = 'cart_user'
+    lookup = 'cart__user__username'
+
 
 # 🏷️ Category Admin
 @admin.register(Category)
-class CategoryAdmin(admin.ModelAdmin):
+class CategoryAdmin(ImportExportModelAdmin):
+    resource_classes = [CategoryResource]
     list_display = ('id', 'name', 'slug')
     search_fields = ('name', 'slug')
 
 
 # ⭐ Brand Admin
 @admin.register(Brand)
-class BrandAdmin(admin.ModelAdmin):
+class BrandAdmin(ImportExportModelAdmin):
+    resource_classes = [BrandResource]
     list_display = ('id', 'name', 'slug')
     search_fields = ('name', 'slug')
 
 
 # 🧾 Product Admin
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(ImportExportModelAdmin):
+    resource_classes = [ProductResource]
     list_display = ('id', 'name', 'sku', 'price', 'stock', 'category', 'brand')
+    list_select_related = ('category', 'brand')
     search_fields = ('name', 'sku', 'upc')
-    list_filter = ('category', 'brand')
+    list_filter = (CategorySlugFilter, BrandSlugFilter)
+    autocomplete_fields = ('category', 'brand')
+    show_full_result_count = False
+    actions = ['delete_in_chunks']
+
+    @admin.action(description='Delete selected products (chunked, no confirmation page)')
+    def delete_in_chunks(self, request, queryset):
+        summary = delete_products(queryset.values_list('id', flat=True))
+        self.message_user(
+            request,
+            f"{summary['deleted']} products deleted; cascaded: {summary['cascaded'] or 'nothing'}.",
+            messages.SUCCESS,
+        )
 
 
 # 🔗 OrderItem inline inside Order
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 1
+    autocomplete_fields = ('product',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product')
 
 
 # 📦 Order Admin
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'order_date', 'get_total_items', 'get_total_amount')
-    list_filter = ('order_date', 'user')
+    list_display = ('id', 'user', 'status', 'order_date', 'get_total_items', 'get_total_amount')
+    list_select_related = ('user',)
+    list_filter = ('status', 'order_date', UsernameFilter)
     search_fields = ('user__username',)
+    autocomplete_fields = ('user',)
+    show_full_result_count = False
     inlines = [OrderItemInline]
+    actions = ['mark_shipped', 'mark_delivered', 'mark_cancelled']
+
+    def _transition(self, request, queryset, status):
+        summary = transition_orders(queryset.values_list('id', flat=True), status, actor=request.user)
+        self.message_user(
+            request,
+            f"{summary['updated']} of {summary['requested']} orders moved to {status}"
+            f" (from {summary['from'] or 'nothing'}).",
+            messages.SUCCESS if summary['updated'] else messages.WARNING,
+        )
+        if summary['skipped']:
+            self.message_user(
+                request,
+                f"{len(summary['skipped'])} skipped, status doesn't allow it: "
+                f"{dict(Counter(summary['skipped'].values()))}",
+                messages.WARNING,
+            )
+
+    @admin.action(description='Mark selected orders as shipped')
+    def mark_shipped(self, request, queryset):
+        self._transition(request, queryset, 'shipped')
+
+    @admin.action(description='Mark selected orders as delivered')
+    def mark_delivered(self, request, queryset):
+        self._transition(request, queryset, 'delivered')
+
+    @admin.action(description='Cancel selected orders')
+    def mark_cancelled(self, request, queryset):
+        self._transition(request, queryset, 'cancelled')
+
+    def get_queryset(self, request):
+        # Totals as correlated subqueries: computed only for the rows on the
+        # current page, in the same query (no per-row items / product lookups)
+        return with_totals(super().get_queryset(request))
 
     def get_total_items(self, obj):
-        return obj.total_items
+        return obj.items_total or 0
     get_total_items.short_description = 'Total Items'
 
     def get_total_amount(self, obj):
-        return obj.total_amount
+        return obj.amount_total or 0
     get_total_amount.short_description = 'Total Amount'
 
 
@@ -61,24 +207,91 @@ class OrderAdmin(admin.ModelAdmin):
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
     list_display = ('id', 'order', 'product', 'quantity')
-    list_filter = ('order', 'product')
+    list_select_related = ('order__user', 'product')
+    list_filter = (OrderIdFilter, ProductSkuFilter)
+    autocomplete_fields = ('order', 'product')
+    show_full_result_count = False
 
 
 # 🛒 Cart Admin
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'created_at', 'updated_at')
+    list_select_related = ('user',)
+    search_fields = ('user__username',)
+    autocomplete_fields = ('user',)
+    show_full_result_count = False
 
 
 # 🛒 CartItem Admin
 @admin.register(CartItem)
 class CartItemAdmin(admin.ModelAdmin):
     list_display = ('id', 'cart', 'product', 'quantity')
-    list_filter = ('cart', 'product')
+    list_select_related = ('cart__user', 'product')
+    list_filter = (CartUserFilter, ProductSkuFilter)
+    autocomplete_fields = ('cart', 'product')
+    show_full_result_count = False
 
 
 # 👤 Profile Admin
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'phone')
+    list_select_related = ('user',)
     search_fields = ('user__username', 'phone')
+    autocomplete_fields = ('user',)
+
+
+# 🕓 OrderEvent Admin (read-only history)
+@admin.register(OrderEvent)
+class OrderEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'order', 'from_status', 'to_status', 'actor', 'created_at')
+    list_select_related = ('order__user', 'actor')
+    list_filter = ('to_status', OrderIdFilter)
+    raw_id_fields = ('order', 'actor')
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+# 🗄 Archived orders (read-only, moved here by store/archive.py)
+class ArchivedOrderItemInline(admin.TabularInline):
+    model = ArchivedOrderItem
+    extra = 0
+    can_delete = False
+    readonly_fields = ('product', 'product_name', 'product_sku', 'unit_price', 'quantity')
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'status', 'order_date', 'get_total_items', 'get_total_amount', 'archived_at')
+    list_select_related = ('user',)
+    list_filter = ('status', 'order_date', UsernameFilter)
+    search_fields = ('user__username',)
+    readonly_fields = ('id', 'user', 'status', 'order_date', 'archived_at')
+    show_full_result_count = False
+    inlines = [ArchivedOrderItemInline]
+
+    def get_queryset(self, request):
+        return with_totals(super().get_queryset(request))
+
+    def get_total_items(self, obj):
+        return obj.items_total or 0
+    get_total_items.short_description = 'Total Items'
+
+    def get_total_amount(self, obj):
+        return obj.amount_total or 0
+    get_total_amount.short_description = 'Total Amount'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
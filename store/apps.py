@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class StoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'store'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from .db import apply_sqlite_pragmas
+
+        # 🗄️ Per-connection SQLite tuning (WAL, busy_timeout, ...)
+        connection_created.connect(apply_sqlite_pragmas)
+
+        # 📡 Order → sales rollup signals
+        from . import signals  # noqa: F401
@@ -0,0 +1,167 @@
+# store/archive.py
+"""
+🗄 Order archive
+
+Finished orders (delivered / cancelled) older than
+``settings.ORDER_ARCHIVE_AFTER_DAYS`` are moved from Order / OrderItem /
+OrderEvent into the ``Archived*`` tables, so the hot tables only hold
+recent and open orders.
+
+- ``archive_orders()`` works in batches of ``ORDER_ARCHIVE_BATCH_SIZE``
+  orders. Each batch is one transaction: copy (keeping the original ids),
+  then delete. Stop it at any point and the next run picks up where it
+  left off; running it twice is harmless (copies use ``ignore_conflicts``).
+- ``get_order(id)`` / ``order_history(user, ...)`` read live and archived
+  orders as one history, for the order pages.
+
+Sales rollups and the Profile order summary keep counting archived orders,
+and archiving doesn't change any total, so those refreshes are skipped
+while a batch is moved.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404
+from django.utils import timezone
+
+from .models import (
+    ArchivedOrder,
+    ArchivedOrderEvent,
+    ArchivedOrderItem,
+    Order,
+    OrderEvent,
+    OrderItem,
+)
+from .orders import keyset_page, with_totals
+from .signals import muted
+
+
+ARCHIVABLE_STATUSES = ('delivered', 'cancelled')
+
+
+def archive_cutoff(older_than_days=None):
+    days = settings.ORDER_ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    return timezone.now() - datetime.timedelta(days=days)
+
+
+def archivable_orders(cutoff):
+    # Served by the (status, order_date) index
+    return Order.objects.filter(status__in=ARCHIVABLE_STATUSES, order_date__lt=cutoff)
+
+
+# 📦 Moving orders
+# ----------------
+
+@transaction.atomic
+def archive_batch(order_ids):
+    """
+    Copy the given orders with their items and events to the archive, then
+    delete the originals. Returns the number of orders archived.
+    """
+    orders = list(Order.objects.filter(id__in=order_ids))
+    if not orders:
+        return 0
+    ids = [order.id for order in orders]
+
+    ArchivedOrder.objects.bulk_create(
+        [
+            ArchivedOrder(id=o.id, status=o.status, user_id=o.user_id, order_date=o.order_date)
+            for o in orders
+        ],
+        ignore_conflicts=True,
+    )
+    ArchivedOrderItem.objects.bulk_create(
+        [
+            ArchivedOrderItem(
+                id=item.id,
+                order_id=item.order_id,
+                product_id=item.product_id,
+                product_name=item.product.name,
+                product_sku=item.product.sku,
+                unit_price=item.unit_price,
+                quantity=item.quantity,
+            )
+            for item in OrderItem.objects.filter(order_id__in=ids).select_related('product')
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    ArchivedOrderEvent.objects.bulk_create(
+        [
+            ArchivedOrderEvent(
+                id=event.id,
+                order_id=event.order_id,
+                from_status=event.from_status,
+                to_status=event.to_status,
+                actor_id=event.actor_id,
+                created_at=event.created_at,
+            )
+            for event in OrderEvent.objects.filter(order_id__in=ids)
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+    # Totals are unchanged (same lines, same prices), no refresh needed
+    with muted():
+        Order.objects.filter(id__in=ids).delete()
+    return len(ids)
+
+
+def archive_orders(older_than_days=None, batch_size=None, max_batches=None):
+    """
+    Archive every finished order older than the cutoff, one batch at a
+    time. ``max_batches`` bounds a single run (e.g. from cron).
+    Returns ``(orders_archived, batches)``.
+    """
+    cutoff = archive_cutoff(older_than_days)
+    batch_size = batch_size or settings.ORDER_ARCHIVE_BATCH_SIZE
+
+    archived = batches = 0
+    while max_batches is None or batches < max_batches:
+        ids = list(
+            archivable_orders(cutoff)
+            .order_by('order_date', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        archived += archive_batch(ids)
+        batches += 1
+    return archived, batches
+
+
+# 📖 Reading the whole history
+# ----------------------------
+
+def get_order(order_id):
+    """The live Order with this id, else the archived one, else 404."""
+    order = Order.objects.select_related('user').filter(id=order_id).first()
+    if order is None:
+        order = ArchivedOrder.objects.select_related('user').filter(id=order_id).first()
+    if order is None:
+        raise Http404("No order found.")
+    return order
+
+
+def order_items(order):
+    """Items of a live or archived order, with their products."""
+    return order.items.select_related('product')
+
+
+def order_history(user, after=None, before=None, size=20):
+    """
+    One newest-first page of a user's live *and* archived orders, with
+    ``items_total`` / ``amount_total``. Same return value as
+    ``orders.keyset_page``.
+    """
+    return keyset_page(
+        [
+            with_totals(Order.objects.filter(user=user)),
+            with_totals(ArchivedOrder.objects.filter(user=user)),
+        ],
+        after=after,
+        before=before,
+        size=size,
+    )
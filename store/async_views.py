@@ -0,0 +1,161 @@
+# store/async_views.py
+"""
+⚡ Async versions of the read-heavy catalog views
+
+Used instead of the views in ``views.py`` when ``settings.ASYNC_CATALOG_VIEWS``
+is on (the default under ``Ecom/asgi.py``). Same templates, same context, but:
+
+- queries go through the async ORM (``aget``, ``async for``), so the event loop
+  is free while the database works
+- independent queries (e.g. the home page sections) are awaited together with
+  ``asyncio.gather``
+- the session is read / written with ``aget`` / ``aset``
+- templates are rendered in a worker thread, because context processors
+  (brand & category menus) and ``request.user`` are evaluated lazily there
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404, render
+
+from .models import Brand, Category, Product
+from .routers import catalog_view
+from .views import _featured_sections
+
+
+# Rendering may touch the database (context processors), so it runs in the
+# request's sync thread like any other ORM call.
+arender = sync_to_async(render)
+
+# The home page sections: one ROW_NUMBER() query per kind, shared with views.py
+afeatured_sections = sync_to_async(_featured_sections)
+
+
+async def _alist(queryset):
+    """Evaluate a queryset with the async ORM."""
+    return [obj async for obj in queryset]
+
+
+async def _recently_viewed(rv_ids, exclude_id=None):
+    """
+    Products from the session's recently-viewed list, most recent first.
+    """
+    if not rv_ids:
+        return []
+    qs = Product.objects.filter(id__in=rv_ids)
+    if exclude_id is not None:
+        qs = qs.exclude(id=exclude_id)
+    id_order = {pid: index for index, pid in enumerate(rv_ids)}
+    return sorted(await _alist(qs), key=lambda p: id_order.get(p.id, 999))
+
+
+# 🏠 HOME
+# -------
+
+@catalog_view
+async def home(request):
+    rv_ids = await request.session.aget('recently_viewed', [])
+
+    # Section headers first (two small queries, run together)
+    brands, categories = await asyncio.gather(
+        _alist(Brand.objects.all()[3:6]),
+        _alist(Category.objects.all()[2:6]),
+    )
+
+    # Then everything else at once: main row, recently viewed, the sections
+    products, recently_viewed, brand_sections, category_sections = await asyncio.gather(
+        _alist(Product.objects.select_related('brand')[:10]),
+        _recently_viewed(rv_ids),
+        afeatured_sections('brand', brands),
+        afeatured_sections('category', categories),
+    )
+
+    context = {
+        'products': products,
+        'recently_viewed': recently_viewed,
+        'brand_sections': brand_sections,
+        'category_sections': category_sections,
+    }
+    return await arender(request, 'store/home.html', context)
+
+
+# 🛒 PRODUCT LIST / DETAIL
+# ------------------------
+
+@catalog_view
+async def product_list(request):
+    """
+    🛒 Async product list with the same linked brand & category filters.
+    """
+    products = Product.objects.select_related('brand')
+
+    brand_slug = request.GET.get("brand")
+    category_slug = request.GET.get("category")
+
+    if brand_slug:
+        products = products.filter(brand__slug=brand_slug)
+
+    if category_slug:
+        products = products.filter(category__slug=category_slug)
+
+    product_rows, brands, categories = await asyncio.gather(
+        _alist(products),
+        _alist(Brand.objects.filter(id__in=products.values("brand_id").distinct())),
+        _alist(Category.objects.filter(id__in=products.values("category_id").distinct())),
+    )
+
+    return await arender(request, "store/product_list.html", {
+        "products": product_rows,
+        "brands": brands,
+        "categories": categories,
+        "current_brand_slug": brand_slug,
+        "current_category_slug": category_slug,
+    })
+
+
+@catalog_view
+async def product_detail(request, product_id):
+    product = await aget_object_or_404(Product.objects.select_related('brand'), id=product_id)
+
+    # Recently viewed: move this product to the front, keep 15
+    rv_ids = await request.session.aget("recently_viewed", [])
+    if product.id in rv_ids:
+        rv_ids.remove(product.id)
+    rv_ids.insert(0, product.id)
+    rv_ids = rv_ids[:15]
+    await request.session.aset("recently_viewed", rv_ids)
+
+    recently_viewed = await _recently_viewed(rv_ids, exclude_id=product.id)
+
+    return await arender(request, "store/product_detail.html", {
+        "product": product,
+        "recently_viewed": recently_viewed,
+    })
+
+
+# 🏷 BRAND / CATEGORY PAGES
+# -------------------------
+
+@catalog_view
+async def brand_products(request, slug):
+    """
+    🏷 Async brand page.
+    """
+    brand = await aget_object_or_404(Brand, slug=slug)
+    products = await _alist(Product.objects.filter(brand=brand))
+
+    return await arender(request, 'store/brand_products.html', {
+        'brand': brand,
+        'products': products,
+    })
+
+
+@catalog_view
+async def category_products(request, slug):
+    category = await aget_object_or_404(Category, slug=slug)
+    products = await _alist(Product.objects.filter(category=category))
+
+    return await arender(request, "store/category_products.html", {
+        "category": category,
+        "products": products,
+    })
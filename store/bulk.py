@@ -0,0 +1,181 @@
+# store/bulk.py
+"""
+📦 Bulk staff operations
+
+Shipping or cleaning up hundreds of rows should cost a handful of
+statements, not hundreds of requests:
+
+- ``transition_orders(ids, status)`` ➝ checks the move against
+  ``ALLOWED_TRANSITIONS``, applies it with one
+  ``UPDATE ... WHERE id IN (...) AND status IN (...)`` and writes one
+  OrderEvent per changed order with ``bulk_create``.
+- ``delete_products(ids)`` ➝ deletes in chunks, one short transaction per
+  chunk, so the database is never locked for the whole batch.
+
+Both return a plain dict summary (JSON friendly) of what changed.
+"""
+from collections import Counter
+
+from django.db import transaction
+
+from . import rollups
+from .models import Order, OrderEvent, Product
+from .orders import schedule_customer_refresh
+from .signals import muted
+
+
+# 🔀 Which status can move to which. Anything else is refused.
+# cancelled ➝ pending is on purpose: staff can reopen an order cancelled by
+# mistake (it counts as a sale again in the rollups). Delivered is final.
+ALLOWED_TRANSITIONS = {
+    'pending': {'shipped', 'cancelled'},
+    'shipped': {'delivered', 'cancelled'},
+    'delivered': set(),
+    'cancelled': {'pending'},
+}
+
+# Keeps every "id IN (...)" well below SQLite's bound-parameter limit
+CHUNK_SIZE = 500
+
+
+def _chunks(values, size):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _clean_ids(ids):
+    """Unique positive ints, in the order given; junk is dropped."""
+    seen = {}
+    for value in ids:
+        try:
+            pk = int(value)
+        except (TypeError, ValueError):
+            continue
+        if pk > 0:
+            seen.setdefault(pk, None)
+    return list(seen)
+
+
+# 🔀 Order status transitions
+# --------------------------
+
+def sources_for(status):
+    """Statuses an order may be in to be moved to ``status``."""
+    return sorted(src for src, targets in ALLOWED_TRANSITIONS.items() if status in targets)
+
+
+def transition_orders(order_ids, to_status, actor=None):
+    """
+    Move the given orders to ``to_status``.
+
+    Orders whose current status doesn't allow the move (or that don't
+    exist) are left alone and reported under ``skipped``.
+
+    Returns::
+
+        {'to_status': 'shipped', 'requested': 120, 'updated': 118,
+         'from': {'pending': 118}, 'skipped': {'77': 'delivered', '91': 'missing'}}
+    """
+    if to_status not in dict(Order.STATUS_CHOICES):
+        raise ValueError(f"Unknown status: {to_status!r}")
+
+    order_ids = _clean_ids(order_ids)
+    allowed_from = sources_for(to_status)
+    changed = {}
+    current = {}
+
+    with transaction.atomic():
+        for chunk in _chunks(order_ids, CHUNK_SIZE):
+            rows = (
+                Order.objects
+                .select_for_update()
+                .filter(id__in=chunk)
+                .values_list('id', 'status', 'order_date', 'user_id')
+            )
+            movable = []
+            for pk, status, order_date, user_id in rows:
+                current[pk] = status
+                if status in allowed_from:
+                    movable.append(pk)
+                    changed[pk] = (status, order_date, user_id)
+            if movable:
+                # update() fires no signals: move the rollup lines here
+                cancelled = to_status == 'cancelled'
+                before = [
+                    line for line in rollups.lines(order_id__in=movable, order__rolled_up=True)
+                    if line[4] != cancelled
+                ]
+                # The status guard repeats the check inside the statement
+                Order.objects.filter(id__in=movable, status__in=allowed_from).update(status=to_status)
+                rollups.apply(rollups.negated(before) + rollups.moved(before, cancelled=cancelled))
+
+        OrderEvent.objects.bulk_create(
+            [
+                OrderEvent(order_id=pk, from_status=status, to_status=to_status, actor=actor)
+                for pk, (status, _date, _user) in changed.items()
+            ],
+            batch_size=CHUNK_SIZE,
+        )
+
+        # ... nor customer summary refreshes
+        for _status, _date, user_id in changed.values():
+            schedule_customer_refresh(user_id)
+
+    return {
+        'to_status': to_status,
+        'requested': len(order_ids),
+        'updated': len(changed),
+        'from': dict(Counter(status for status, _date, _user in changed.values())),
+        'skipped': {
+            str(pk): current.get(pk, 'missing')
+            for pk in order_ids if pk not in changed
+        },
+    }
+
+
+# 🗑 Product deletes
+# -----------------
+
+def delete_products(product_ids, chunk_size=CHUNK_SIZE):
+    """
+    Delete products ``chunk_size`` at a time, each chunk in its own
+    transaction (cascades to order / cart lines like a single delete).
+
+    Returns::
+
+        {'requested': 900, 'deleted': 897, 'missing': [12, 13, 14],
+         'cascaded': {'store.OrderItem': 40, 'store.CartItem': 3}}
+    """
+    product_ids = _clean_ids(product_ids)
+    deleted, cascaded, found = 0, Counter(), set()
+
+    for chunk in _chunks(product_ids, chunk_size):
+        with transaction.atomic():
+            found.update(Product.objects.filter(id__in=chunk).values_list('id', flat=True))
+            # Order lines going with them, read once per chunk: the OrderItem
+            # signals would do it line by line
+            gone = rollups.lines(product_id__in=chunk, order__rolled_up=True)
+            customers = set(
+                Order.objects
+                .filter(items__product_id__in=chunk)
+                .values_list('user_id', flat=True)
+                .distinct()
+            )
+            with muted():
+                _total, per_model = Product.objects.filter(id__in=chunk).delete()
+            rollups.apply(gone, -1)
+            for user_id in customers:
+                schedule_customer_refresh(user_id)
+        for label, count in per_model.items():
+            if label == 'store.Product':
+                deleted += count
+            else:
+                cascaded[label] += count
+
+    return {
+        'requested': len(product_ids),
+        'deleted': deleted,
+        'missing': [pk for pk in product_ids if pk not in found],
+        'cascaded': dict(cascaded),
+    }
@@ -0,0 +1,201 @@
+# store/catalog.py
+"""
+📇 In-process catalog indexes
+
+Checkout scanners look products up by exact barcode (UPC) or SKU many times
+per second. Going to the database for every beep is wasteful, so each worker
+keeps a small hash map of the catalog in memory:
+
+- ``catalog_version()``  ➝ cheap "has anything changed?" check
+                           (row count + newest ``Product.updated_at``)
+- ``BarcodeIndex``       ➝ {upc: row} and {sku: row} dictionaries, loaded once
+                           and then refreshed incrementally with only the
+                           products changed since the last version seen.
+
+Lookups never touch the database unless the refresh interval has elapsed.
+"""
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .models import Product
+
+
+# How often (seconds) a worker re-checks the catalog version.
+# Between checks every lookup is a pure dictionary hit.
+REFRESH_SECONDS = getattr(settings, 'CATALOG_INDEX_REFRESH_SECONDS', 5)
+
+# Columns loaded into the index (no model instantiation).
+LOOKUP_FIELDS = ('id', 'sku', 'upc', 'name', 'price', 'stock', 'updated_at')
+
+
+def catalog_version():
+    """
+    🔢 Returns a ``(product_count, newest_updated_at)`` tuple.
+
+    Any create / update / delete of a product changes at least one half of it.
+    Both parts are answered from indexes, so the query stays cheap.
+    """
+    row = Product.objects.aggregate(count=Count('id'), latest=Max('updated_at'))
+    return row['count'], row['latest']
+
+
+def _as_dict(row):
+    """
+    Turns a ``values_list`` row into the JSON-friendly payload we return.
+    Price is kept as a string so "1.250" KD does not become 1.25.
+    """
+    pk, sku, upc, name, price, stock, _updated_at = row
+    return {
+        'id': pk,
+        'sku': sku,
+        'upc': upc,
+        'name': name,
+        'price': str(price),
+        'stock': stock,
+    }
+
+
+class BarcodeIndex:
+    """
+    🔎 Exact UPC / SKU → product hash map for one worker process.
+
+    - First lookup loads the whole catalog with a single ``values_list`` query.
+    - Afterwards, at most every ``REFRESH_SECONDS``, we compare the catalog
+      version. If it moved, only rows with a newer ``updated_at`` are fetched
+      and patched in. Deletions are detected via the row count and trigger a
+      full reload (they are rare).
+    """
+
+    def __init__(self, refresh_seconds=REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._by_upc = {}
+        self._by_sku = {}
+        self._by_id = {}
+        self._version = None
+        self._checked_at = 0.0
+
+    # 🧱 Loading
+    # ----------
+
+    def load(self):
+        """
+        Full (re)load of the index. Called on first use and after deletions.
+        """
+        with self._lock:
+            self._full_load()
+
+    def _full_load(self):
+        version = catalog_version()
+        by_upc, by_sku, by_id = {}, {}, {}
+        for row in Product.objects.values_list(*LOOKUP_FIELDS).iterator(chunk_size=5000):
+            item = _as_dict(row)
+            by_upc[item['upc']] = item
+            by_sku[item['sku']] = item
+            by_id[item['id']] = item
+
+        # Swap the dictionaries in one go so readers never see a half-built map
+        self._by_upc, self._by_sku, self._by_id = by_upc, by_sku, by_id
+        self._version = version
+        self._checked_at = time.monotonic()
+
+    def _apply_changes(self, since):
+        """
+        Patch in products updated at or after ``since``.
+        Old keys are dropped first in case the SKU / UPC itself was edited.
+        """
+        changed = Product.objects.filter(updated_at__gte=since).values_list(*LOOKUP_FIELDS)
+        for row in changed:
+            item = _as_dict(row)
+            old = self._by_id.get(item['id'])
+            if old:
+                self._by_upc.pop(old['upc'], None)
+                self._by_sku.pop(old['sku'], None)
+            self._by_upc[item['upc']] = item
+            self._by_sku[item['sku']] = item
+            self._by_id[item['id']] = item
+
+    def refresh(self, force=False):
+        """
+        ♻️ Bring the index up to date if the catalog version changed.
+        Cheap no-op while inside the refresh interval.
+        """
+        now = time.monotonic()
+        if not force and self._version is not None and now - self._checked_at < self.refresh_seconds:
+            return
+
+        with self._lock:
+            if self._version is None:
+                self._full_load()
+                return
+
+            version = catalog_version()
+            self._checked_at = now
+            if version == self._version:
+                return
+
+            _old_count, old_latest = self._version
+            if old_latest is not None:
+                self._apply_changes(old_latest)
+
+            # Fewer indexed rows than the DB reports (or more) means something
+            # was deleted / slipped past updated_at → rebuild from scratch.
+            if len(self._by_id) != version[0] or old_latest is None:
+                self._full_load()
+            else:
+                self._version = version
+
+    # 🔍 Lookups
+    # ----------
+
+    def get(self, code):
+        """
+        Returns the product payload for a UPC or SKU, or ``None``.
+        UPC wins when a code happens to match both.
+        """
+        self.refresh()
+        code = (code or '').strip()
+        return self._by_upc.get(code) or self._by_sku.get(code)
+
+    def resolve_basket(self, codes):
+        """
+        🧺 Resolve a whole scanned basket in one call.
+
+        ``codes`` is the raw scan sequence (duplicates = quantity).
+        Returns lines in first-scan order, the codes we could not resolve,
+        and the basket total.
+        """
+        self.refresh()
+        lines = {}
+        missing = []
+
+        for code in codes:
+            code = (code or '').strip()
+            item = self._by_upc.get(code) or self._by_sku.get(code)
+            if item is None:
+                missing.append(code)
+                continue
+            line = lines.get(item['id'])
+            if line is None:
+                line = lines[item['id']] = {**item, 'quantity': 0}
+            line['quantity'] += 1
+
+        total = Decimal('0')
+        for line in lines.values():
+            line_total = Decimal(line['price']) * line['quantity']
+            line['line_total'] = str(line_total)
+            total += line_total
+
+        return {
+            'items': list(lines.values()),
+            'missing': missing,
+            'total': str(total),
+        }
+
+
+# One shared index per worker process
+barcode_index = BarcodeIndex()
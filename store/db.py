@@ -0,0 +1,60 @@
+# store/db.py
+"""
+🗄️ Database connection hooks
+
+Django fires ``connection_created`` once per new DB connection. With
+persistent connections (``CONN_MAX_AGE``) that is once per worker, so this is
+the cheapest place to apply per-connection SQLite PRAGMAs.
+
+``on_commit_batched()`` is the other per-connection helper: it collects the
+work of a transaction (days to roll up, customers to summarise) and runs it
+once, after the commit.
+"""
+from django.conf import settings
+from django.db import transaction
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    Apply ``settings.SQLITE_PRAGMAS`` to a freshly opened SQLite connection.
+    Does nothing for other database vendors or when no PRAGMAs are configured.
+    """
+    if connection.vendor != 'sqlite':
+        return
+
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if not pragmas:
+        return
+
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+# ⏳ Once per transaction
+# ----------------------
+
+def on_commit_batched(flush, item):
+    """
+    Call ``flush(items)`` once the current transaction commits, with every
+    ``item`` passed for the same ``flush`` during it. Outside a transaction
+    ``flush`` runs straight away.
+
+    The items wait on the connection. Each call registers its own (cheap)
+    ``transaction.on_commit`` callback and the first one to run takes all
+    the items, so a rolled-back savepoint never loses any. Items of a
+    rolled-back transaction are flushed with the next one: only fine for
+    work that recomputes from the database, like the callers do.
+    """
+    conn = transaction.get_connection()
+    pending = conn.__dict__.setdefault('pending_on_commit', {})
+    if not conn.in_atomic_block:
+        flush(pending.pop(flush, set()) | {item})
+        return
+    pending.setdefault(flush, set()).add(item)
+
+    def run():
+        items = pending.pop(flush, None)
+        if items:
+            flush(items)
+    transaction.on_commit(run)
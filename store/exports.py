@@ -0,0 +1,148 @@
+# store/exports.py
+"""
+📤 Streaming exports (CSV / JSONL)
+
+Products, orders and order items, streamed row by row:
+
+- rows come from ``values_list(...).iterator(chunk_size=...)``: plain tuples
+  fetched a chunk at a time, no model instances, no full result in memory
+- each row is encoded and handed on as soon as it is read, so the staff
+  endpoint (``StreamingHttpResponse``) and ``manage.py export_data`` run in
+  constant memory whatever the table size
+
+Orders and order items include the archived ones (``archived`` column).
+"""
+import csv
+import json
+from itertools import chain
+
+from django.db.models import DecimalField, ExpressionWrapper, F
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem, Product
+from .orders import with_totals
+from .rollups import day_bounds
+
+
+CHUNK_SIZE = 2000
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+LINE_TOTAL = DecimalField(max_digits=14, decimal_places=3)
+
+
+def _date_range(queryset, field, filters):
+    """Apply ``from`` / ``to`` (dates, inclusive) to a datetime field."""
+    if filters.get('from'):
+        queryset = queryset.filter(**{f'{field}__gte': day_bounds(filters['from'])[0]})
+    if filters.get('to'):
+        queryset = queryset.filter(**{f'{field}__lt': day_bounds(filters['to'])[1]})
+    return queryset
+
+
+def _rows(queryset, fields):
+    return queryset.order_by('id').values_list(*fields).iterator(chunk_size=CHUNK_SIZE)
+
+
+# 📚 Datasets: each returns (columns, row iterator)
+# ------------------------------------------------
+
+def product_rows(filters):
+    products = _date_range(Product.objects.all(), 'updated_at', filters)
+    if filters.get('brand'):
+        products = products.filter(brand__slug=filters['brand'])
+    if filters.get('category'):
+        products = products.filter(category__slug=filters['category'])
+
+    columns = ('id', 'sku', 'upc', 'name', 'price', 'stock', 'brand', 'category', 'updated_at')
+    fields = ('id', 'sku', 'upc', 'name', 'price', 'stock', 'brand__slug', 'category__slug', 'updated_at')
+    return columns, _rows(products, fields)
+
+
+def order_rows(filters):
+    columns = ('id', 'user_id', 'username', 'status', 'order_date', 'items', 'amount', 'archived')
+    fields = ('id', 'user_id', 'user__username', 'status', 'order_date', 'items_total', 'amount_total')
+
+    def source(model, archived):
+        orders = _date_range(model.objects.all(), 'order_date', filters)
+        if filters.get('status'):
+            orders = orders.filter(status=filters['status'])
+        return (row + (archived,) for row in _rows(with_totals(orders), fields))
+
+    return columns, chain(source(ArchivedOrder, True), source(Order, False))
+
+
+def order_item_rows(filters):
+    columns = ('id', 'order_id', 'order_date', 'status', 'product_id', 'sku', 'name',
+               'quantity', 'unit_price', 'line_total', 'archived')
+
+    def source(model, sku, name, price, archived):
+        items = _date_range(model.objects.all(), 'order__order_date', filters)
+        if filters.get('status'):
+            items = items.filter(order__status=filters['status'])
+        items = items.annotate(
+            _sku=F(sku), _name=F(name), _price=F(price),
+            _line_total=ExpressionWrapper(F('quantity') * F(price), output_field=LINE_TOTAL),
+        )
+        fields = ('id', 'order_id', 'order__order_date', 'order__status', 'product_id',
+                  '_sku', '_name', 'quantity', '_price', '_line_total')
+        return (row + (archived,) for row in _rows(items, fields))
+
+    return columns, chain(
+        source(ArchivedOrderItem, 'product_sku', 'product_name', 'unit_price', True),
+        source(OrderItem, 'product__sku', 'product__name', 'unit_price', False),
+    )
+
+
+DATASETS = {
+    'products': product_rows,
+    'orders': order_rows,
+    'order_items': order_item_rows,
+}
+
+
+# ✍️ Encoding
+# -----------
+
+class _Echo:
+    """File-like object whose write() just returns the line (for csv.writer)."""
+
+    def write(self, value):
+        return value
+
+
+def _plain(value):
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return f"{value:.3f}"   # Decimal money, always 3 places (fils)
+
+
+def encode(columns, rows, fmt):
+    """Yield the export as text lines, header first (CSV only)."""
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow([_plain(v) for v in row])
+    elif fmt == 'jsonl':
+        for row in rows:
+            yield json.dumps(dict(zip(columns, map(_plain, row))), ensure_ascii=False) + '\n'
+    else:
+        raise ValueError(f"Unknown format: {fmt!r}")
+
+
+def export_lines(dataset, fmt='csv', filters=None):
+    """
+    Text lines of ``dataset`` (see ``DATASETS``) in ``fmt`` (see ``FORMATS``).
+    ``filters``: from / to (date objects), status, brand, category.
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown dataset: {dataset!r}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt!r}")
+    columns, rows = DATASETS[dataset](filters or {})
+    return encode(columns, rows, fmt)
@@ -0,0 +1,236 @@
+# store/feeds.py
+"""
+🚚 Supplier price / stock feeds
+
+Suppliers send the *whole* catalog every night, but only a few rows really
+change. ``sync_feed()`` applies just the difference:
+
+1. the current ``price`` / ``stock`` of every product is read once, as a
+   short hash per SKU (``{sku: (id, hash)}``, no model instances)
+2. the feed is streamed row by row; each row's hash is compared with the
+   stored one, equal rows are counted and dropped straight away
+3. changed rows are written with ``bulk_update`` and new SKUs with
+   ``bulk_create``, ``BATCH_SIZE`` at a time, each batch in its own
+   transaction
+
+So the writes follow the real change volume, not the size of the file.
+SKUs in the catalog that the feed doesn't mention are reported as
+``missing`` (never deleted).
+
+Feed columns (CSV header or JSONL keys)::
+
+    sku,price,stock[,upc,name,description,brand,category]
+
+``upc`` and ``name`` are only needed for SKUs that don't exist yet;
+``brand`` / ``category`` are slugs.
+"""
+import csv
+import hashlib
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Brand, Category, Product
+
+
+BATCH_SIZE = 1000
+
+PRICE_PLACES = Decimal('0.001')
+
+# Bad rows kept in the report (the counts are always complete)
+MAX_REPORTED = 50
+
+
+class FeedRowError(ValueError):
+    pass
+
+
+def row_hash(price, stock):
+    """Short digest of the values a feed can change."""
+    return hashlib.blake2b(f"{price}|{stock}".encode(), digest_size=8).digest()
+
+
+def _price(value):
+    try:
+        price = Decimal(str(value).strip()).quantize(PRICE_PLACES)
+    except (InvalidOperation, ValueError):
+        raise FeedRowError(f"bad price {value!r}")
+    if price < 0:
+        raise FeedRowError(f"negative price {value!r}")
+    return price
+
+
+def _stock(value):
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        raise FeedRowError(f"bad stock {value!r}")
+
+
+def _text(value):
+    """A feed value as stripped text: JSONL may give numbers (a UPC, a slug)."""
+    return '' if value is None else str(value).strip()
+
+
+# 📖 Reading feeds
+# ----------------
+
+def read_feed(stream, fmt='csv'):
+    """Yield ``(line_number, row_dict)`` from an open text stream."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for number, line in enumerate(stream, start=1):
+            if line.strip():
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    row = {'_error': str(exc)}
+                if not isinstance(row, dict):
+                    row = {'_error': f"expected a JSON object, got {type(row).__name__}"}
+                yield number, row
+    else:
+        raise ValueError(f"Unknown feed format: {fmt!r}")
+
+
+def load_current():
+    """``{sku: (id, row_hash(price, stock))}`` for the whole catalog, one query."""
+    return {
+        sku: (pk, row_hash(price, stock))
+        for pk, sku, price, stock in (
+            Product.objects.values_list('id', 'sku', 'price', 'stock').iterator(chunk_size=5000)
+        )
+    }
+
+
+# 🔁 Sync
+# -------
+
+class _Sync:
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.current = load_current()
+        self.seen = set()
+        self.brands = None
+        self.categories = None
+        self.to_update = []
+        self.to_create = []
+        self.report = {
+            'rows': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0,
+            'missing': 0, 'missing_skus': [], 'errors': 0, 'error_rows': [],
+        }
+
+    def error(self, line, sku, message):
+        self.report['errors'] += 1
+        if len(self.report['error_rows']) < MAX_REPORTED:
+            self.report['error_rows'].append({'line': line, 'sku': sku, 'error': message})
+
+    def _slug(self, model, value):
+        value = _text(value)
+        if not value:
+            return None
+        attr = 'brands' if model is Brand else 'categories'
+        if getattr(self, attr) is None:
+            setattr(self, attr, dict(model.objects.values_list('slug', 'id')))
+        try:
+            return getattr(self, attr)[value]
+        except KeyError:
+            raise FeedRowError(f"unknown {model._meta.verbose_name} {value!r}")
+
+    def add(self, line, row):
+        self.report['rows'] += 1
+        sku = _text(row.get('sku'))
+        if '_error' in row or not sku:
+            return self.error(line, sku, row.get('_error', "no sku"))
+        if sku in self.seen:
+            return self.error(line, sku, "duplicate sku in feed")
+        self.seen.add(sku)
+
+        try:
+            price, stock = _price(row.get('price')), _stock(row.get('stock'))
+            known = self.current.get(sku)
+            if known is None:
+                self.to_create.append((line, self._new_product(sku, row, price, stock)))
+            elif known[1] == row_hash(price, stock):
+                self.report['unchanged'] += 1
+            else:
+                self.to_update.append(Product(id=known[0], sku=sku, price=price, stock=stock))
+        except FeedRowError as exc:
+            return self.error(line, sku, str(exc))
+
+        if len(self.to_update) >= BATCH_SIZE:
+            self.flush_updates()
+        if len(self.to_create) >= BATCH_SIZE:
+            self.flush_creates()
+
+    def _new_product(self, sku, row, price, stock):
+        upc, name = _text(row.get('upc')), _text(row.get('name'))
+        if not upc or not name:
+            raise FeedRowError("new sku needs upc and name")
+        return Product(
+            sku=sku, upc=upc, name=name, description=_text(row.get('description')),
+            price=price, stock=stock,
+            brand_id=self._slug(Brand, row.get('brand')),
+            category_id=self._slug(Category, row.get('category')),
+        )
+
+    def flush_updates(self):
+        batch, self.to_update = self.to_update, []
+        if batch and not self.dry_run:
+            # bulk_update() skips auto_now; catalog indexes watch updated_at
+            now = timezone.now()
+            for product in batch:
+                product.updated_at = now
+            with transaction.atomic():
+                Product.objects.bulk_update(batch, ['price', 'stock', 'updated_at'])
+        self.report['updated'] += len(batch)
+
+    def flush_creates(self):
+        batch, self.to_create = self.to_create, []
+        if not batch:
+            return
+        if self.dry_run:
+            self.report['inserted'] += len(batch)
+            return
+        try:
+            with transaction.atomic():
+                Product.objects.bulk_create([product for _line, product in batch])
+            self.report['inserted'] += len(batch)
+        except IntegrityError:
+            # Usually a UPC that already belongs to another SKU: redo the
+            # batch row by row to find (and skip) the offending rows
+            for line, product in batch:
+                try:
+                    with transaction.atomic():
+                        product.save()
+                    self.report['inserted'] += 1
+                except IntegrityError as exc:
+                    self.error(line, product.sku, f"not inserted: {exc}")
+
+    def finish(self):
+        self.flush_updates()
+        self.flush_creates()
+        missing = sorted(set(self.current) - self.seen)
+        self.report['missing'] = len(missing)
+        self.report['missing_skus'] = missing[:MAX_REPORTED]
+        return self.report
+
+
+def sync_feed(rows, dry_run=False):
+    """
+    Apply a supplier feed (``(line_number, row_dict)`` pairs, see
+    ``read_feed``) to the catalog. ``dry_run`` counts without writing.
+
+    Returns::
+
+        {'rows': 120000, 'inserted': 12, 'updated': 340, 'unchanged': 119630,
+         'missing': 3, 'missing_skus': [...], 'errors': 18, 'error_rows': [...]}
+    """
+    sync = _Sync(dry_run)
+    for line, row in rows:
+        sync.add(line, row)
+    return sync.finish()
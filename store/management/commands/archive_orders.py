@@ -0,0 +1,48 @@
+"""
+🗄 Move old finished orders into the archive tables.
+
+    python manage.py archive_orders                        # settings.ORDER_ARCHIVE_AFTER_DAYS
+    python manage.py archive_orders --older-than-days 180 --batch-size 1000
+    python manage.py archive_orders --max-batches 20       # bounded run for cron
+    python manage.py archive_orders --dry-run              # just count
+
+Each batch commits on its own, so the command can be interrupted and simply
+run again; already archived orders are never copied twice.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from store import archive
+
+
+class Command(BaseCommand):
+    help = "Archive delivered / cancelled orders older than the configured age."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=None,
+                            help="Override settings.ORDER_ARCHIVE_AFTER_DAYS.")
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Orders per transaction (default: settings.ORDER_ARCHIVE_BATCH_SIZE).")
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help="Stop after this many batches (default: until done).")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only report how many orders would be archived.")
+
+    def handle(self, *args, **options):
+        cutoff = archive.archive_cutoff(options['older_than_days'])
+
+        if options['dry_run']:
+            count = archive.archivable_orders(cutoff).count()
+            self.stdout.write(f"{count} order(s) older than {cutoff:%Y-%m-%d %H:%M} would be archived")
+            return
+
+        started = time.perf_counter()
+        orders, batches = archive.archive_orders(
+            older_than_days=options['older_than_days'],
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {orders} order(s) in {batches} batch(es) in {(time.perf_counter() - started):.2f}s"
+        ))
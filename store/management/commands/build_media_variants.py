@@ -0,0 +1,43 @@
+"""
+🎨 Pre-build WebP / gzip variants of the uploaded media files.
+
+    python manage.py build_media_variants
+    python manage.py build_media_variants --quality 75 --force
+
+Variants are named after the content hash (MEDIA_ROOT/_variants), so only
+new or changed files are encoded on later runs. See store/media.py for how
+they are served.
+"""
+import json
+
+from django.core.management.base import BaseCommand
+
+from store.media import build_variants
+
+
+class Command(BaseCommand):
+    help = "Create WebP copies of PNG / JPEG uploads and gzip copies of compressible ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quality', type=int, default=80, help="WebP quality, 1-100 (default: 80).")
+        parser.add_argument('--force', action='store_true', help="Re-encode variants that already exist.")
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON.")
+
+    def handle(self, *args, **options):
+        verbose = options['verbosity'] > 0 and not options['json']
+        report = build_variants(
+            force=options['force'],
+            quality=options['quality'],
+            progress=(lambda message: self.stdout.write(f"  {message}")) if verbose else None,
+        )
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        saved = report['original_bytes'] - report['variant_bytes']
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['files']} file(s): {report['webp']} WebP, {report['gzip']} gzip written, "
+            f"{report['skipped']} skipped (variant not smaller) in {report['seconds']:.1f}s; "
+            f"{saved / 1e6:.1f} MB less for clients that accept them"
+        ))
@@ -0,0 +1,65 @@
+"""
+🧹 Delete uploaded files that no row points at any more.
+
+    python manage.py gc_media --dry-run        # what would go, and how much
+    python manage.py gc_media
+    python manage.py gc_media --rehash         # also dedupe files from before content addressing
+
+Covers the upload_to directories (media/products, media/brands,
+media/categories) and the WebP / gzip variants. See store/media.py.
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.media import MediaError, collect_garbage
+
+
+class Command(BaseCommand):
+    help = "Reference-counted garbage collection of media files, with a report of bytes reclaimed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report what would be deleted, delete nothing.")
+        parser.add_argument('--min-age', type=int, default=3600,
+                            help="Keep unreferenced files younger than this many seconds (default: 3600).")
+        parser.add_argument('--rehash', action='store_true',
+                            help="First move referenced files to content-addressed names (dedupes old uploads).")
+        parser.add_argument('--allow-empty', action='store_true',
+                            help="Delete even when no row references any file (empty or wrong database?).")
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON.")
+
+    def handle(self, *args, **options):
+        verbose = options['verbosity'] > 0 and not options['json']
+        try:
+            report = collect_garbage(
+                dry_run=options['dry_run'],
+                min_age=options['min_age'],
+                rehash_files=options['rehash'],
+                allow_empty=options['allow_empty'],
+                progress=(lambda message: self.stdout.write(f"  {message}")) if verbose else None,
+            )
+        except MediaError as exc:
+            raise CommandError(exc)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        prefix = "[dry run] " if report['dry_run'] else ""
+        verb = "would free" if report['dry_run'] else "freed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{report['orphan_files']} orphaned file(s) and {report['variants_deleted']} variant(s): "
+            f"{verb} {report['bytes_reclaimed'] / 1e6:.1f} MB ({report['seconds']:.1f}s)"
+        ))
+        self.stdout.write(
+            f"  {report['scanned_files']} file(s) scanned, {report['referenced_files']} referenced "
+            f"by {report['references']} row(s), {report['recent_files']} too recent to delete"
+        )
+        self.stdout.write(
+            f"  {report['shared_files']} file(s) shared by several rows: "
+            f"{report['shared_bytes'] / 1e6:.1f} MB not stored twice"
+        )
+        if report['rehashed_files']:
+            self.stdout.write(f"  {report['rehashed_files']} file(s) rehashed, {report['rehashed_rows']} row(s) updated")
+        if report['missing_files']:
+            self.stderr.write(f"  {report['missing_files']} referenced file(s) missing from disk")
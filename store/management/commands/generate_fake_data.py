@@ -0,0 +1,86 @@
+"""
+🧪 Fill the database with skewed, reproducible fake data for scale tests.
+
+    python manage.py generate_fake_data                      # small default set
+    python manage.py generate_fake_data --products 1000000 --brands 5000 \\
+        --categories 500 --users 200000 --order-items 10000000
+    python manage.py generate_fake_data --seed 7 --prefix B --end 2026-01-01
+
+Same options + same seed (+ same --end) = same rows. See store/fakedata.py
+for the distributions and how the rows are written. Afterwards run
+``manage.py update_sales_rollups`` to build the sales rollups.
+"""
+import json
+from datetime import datetime, time as dt_time, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store import fakedata
+
+
+def _end_date(value):
+    try:
+        day = datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"--end must look like 2026-01-31, got {value!r}")
+    return datetime.combine(day, dt_time.min, tzinfo=dt_timezone.utc)
+
+
+class Command(BaseCommand):
+    help = "Generate Zipf-skewed fake brands, products, users and orders (deterministic per seed)."
+
+    def add_arguments(self, parser):
+        for name, default in fakedata.DEFAULTS.items():
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=default,
+                                help=f"How many to create (default: {default}).")
+        parser.add_argument('--seed', type=int, default=1, help="Random seed (default: 1).")
+        parser.add_argument('--prefix', default='GEN',
+                            help="SKU / username / slug prefix, so runs can be told apart (default: GEN).")
+        parser.add_argument('--skew', type=float, default=1.1,
+                            help="Zipf exponent for brand sizes and product popularity (default: 1.1).")
+        parser.add_argument('--customer-skew', type=float, default=0.8,
+                            help="Zipf exponent for orders per customer (default: 0.8).")
+        parser.add_argument('--days', type=int, default=365, help="Spread orders over this many days (default: 365).")
+        parser.add_argument('--items-per-order', type=float, default=3.0,
+                            help="Average lines per order (default: 3).")
+        parser.add_argument('--end', help="Last day of the order history, YYYY-MM-DD (default: now).")
+        parser.add_argument('--password', default='fake-pass', help="Password of every fake customer.")
+        parser.add_argument('--skip-summaries', action='store_true',
+                            help="Don't refresh the customers' order summaries afterwards.")
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON.")
+
+    def handle(self, *args, **options):
+        verbose = options['verbosity'] > 0 and not options['json']
+        try:
+            report = fakedata.generate(
+                brands=options['brands'],
+                categories=options['categories'],
+                products=options['products'],
+                users=options['users'],
+                order_items=options['order_items'],
+                seed=options['seed'],
+                prefix=options['prefix'],
+                skew=options['skew'],
+                customer_skew=options['customer_skew'],
+                days=options['days'],
+                items_per_order=options['items_per_order'],
+                end=_end_date(options['end']) if options['end'] else None,
+                password=options['password'],
+                summaries=not options['skip_summaries'],
+                progress=(lambda message: self.stdout.write(f"  {message}")) if verbose else None,
+            )
+        except fakedata.FakeDataError as exc:
+            raise CommandError(exc)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['total_rows']} row(s) in {report['generate_seconds']:.1f}s "
+            f"({report['rows_per_second'] or 0:,} rows/s, {report['insert_seconds']:.1f}s in INSERTs)"
+        ))
+        for label, count in report['rows'].items():
+            self.stdout.write(f"  {label}: {count}")
+        if report['summaries_seconds'] is not None:
+            self.stdout.write(f"  customer summaries: {report['summaries_seconds']:.1f}s")
@@ -0,0 +1,46 @@
+"""
+🖨 Pre-render the catalog pages anonymous visitors get (store/prerender.py).
+
+    python manage.py render_catalog              # only what changed since the last run
+    python manage.py render_catalog --force      # everything
+    python manage.py render_catalog --jobs 4
+
+Served by store.middleware.PrerenderedPageMiddleware when PRERENDERED_PAGES
+is on. Run it after catalog imports, or every few minutes from cron.
+"""
+import json
+
+from django.core.management.base import BaseCommand
+
+from store.prerender import render_catalog
+
+
+class Command(BaseCommand):
+    help = "Render product, brand, category and product list pages to static HTML (changed pages only)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jobs', type=int, default=None,
+                            help="Worker processes (default: one per CPU).")
+        parser.add_argument('--force', action='store_true', help="Re-render every page, changed or not.")
+        parser.add_argument('--batch-size', type=int, default=200, help="Pages per task sent to a worker.")
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON.")
+
+    def handle(self, *args, **options):
+        verbose = options['verbosity'] > 0 and not options['json']
+        report = render_catalog(
+            jobs=options['jobs'],
+            force=options['force'],
+            batch_size=options['batch_size'],
+            progress=(lambda message: self.stdout.write(f"  {message}")) if verbose else None,
+        )
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['rendered']} page(s) rendered, {report['unchanged']} unchanged, "
+            f"{report['removed']} removed ({report['seconds']:.1f}s)"
+        ))
+        if report['failed']:
+            self.stderr.write(f"  {report['failed']} page(s) failed, see the log; they are served live")
@@ -0,0 +1,64 @@
+"""
+📸 Copy the primary SQLite database into the catalog read replica.
+
+    python manage.py snapshot_replica              # one snapshot
+    python manage.py snapshot_replica --every 30   # keep refreshing
+
+Uses SQLite's online backup API, so the primary stays writable during the
+copy and readers of the replica never see a half-written file.
+"""
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = "Snapshot the primary SQLite database into the read replica."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default=None,
+            help="Replica alias to refresh (default: settings.CATALOG_READ_DB).",
+        )
+        parser.add_argument(
+            '--every',
+            type=float,
+            default=0,
+            help="Repeat every N seconds until interrupted.",
+        )
+
+    def handle(self, *args, **options):
+        alias = options['database'] or settings.CATALOG_READ_DB
+        if not alias or alias not in settings.DATABASES:
+            raise CommandError("No replica configured. Set REPLICA_DB_PATH (and optionally CATALOG_READ_DB).")
+
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        replica = settings.DATABASES[alias]
+        for db in (primary, replica):
+            if db['ENGINE'] != 'django.db.backends.sqlite3':
+                raise CommandError("snapshot_replica only supports SQLite databases.")
+
+        while True:
+            started = time.perf_counter()
+            self.snapshot(str(primary['NAME']), str(replica['NAME']))
+            self.stdout.write(self.style.SUCCESS(
+                f"Snapshot {primary['NAME']} → {replica['NAME']} "
+                f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+            ))
+            if not options['every']:
+                break
+            time.sleep(options['every'])
+
+    def snapshot(self, source_path, target_path):
+        source = sqlite3.connect(source_path)
+        target = sqlite3.connect(target_path)
+        try:
+            # pages=-1 copies everything in one step under a single lock
+            source.backup(target, pages=-1)
+        finally:
+            target.close()
+            source.close()
@@ -0,0 +1,56 @@
+"""
+🚚 Apply a supplier price / stock feed, writing only the rows that changed.
+
+    python manage.py sync_catalog supplier.csv
+    python manage.py sync_catalog feed.jsonl --format jsonl --dry-run
+    zcat feed.csv.gz | python manage.py sync_catalog -
+
+See store/feeds.py for the feed columns and how rows are compared.
+"""
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.feeds import read_feed, sync_feed
+
+
+class Command(BaseCommand):
+    help = "Delta-sync product prices / stock from a supplier feed (CSV or JSONL)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('feed', help="Feed file, or - for stdin.")
+        parser.add_argument('--format', choices=('csv', 'jsonl'),
+                            help="Feed format (default: from the file extension, else csv).")
+        parser.add_argument('--dry-run', action='store_true', help="Report what would change, write nothing.")
+        parser.add_argument('--json', action='store_true', help="Print the full report as JSON.")
+
+    def handle(self, *args, **options):
+        path = options['feed']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+
+        try:
+            stream = sys.stdin if path == '-' else open(path, encoding='utf-8-sig', newline='')
+        except OSError as exc:
+            raise CommandError(exc)
+        try:
+            report = sync_feed(read_feed(stream, fmt), dry_run=options['dry_run'])
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        prefix = "[dry run] " if options['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{report['rows']} row(s): {report['inserted']} inserted, "
+            f"{report['updated']} updated, {report['unchanged']} unchanged, "
+            f"{report['missing']} missing from feed, {report['errors']} error(s)"
+        ))
+        if options['verbosity'] > 1:
+            for sku in report['missing_skus']:
+                self.stdout.write(f"  missing: {sku}")
+        for row in report['error_rows']:
+            self.stderr.write(f"  line {row['line']} [{row['sku'] or '?'}]: {row['error']}")
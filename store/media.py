@@ -0,0 +1,536 @@
+# store/media.py
+"""
+🖼 Media storage and serving
+
+Storage (``ContentAddressedStorage``, the default storage): an upload is
+named after its content, ``products/3f/3fa1c0d2e4b5a6970c1d2e3f4a5b6c7d.png``
+(first 32 hex chars of its SHA-256, under the field's ``upload_to``). The
+same picture uploaded for 50 products is written once and shared by all 50
+rows. Files no row points at any more (replaced images, deleted products)
+are removed by ``manage.py gc_media``, see "Garbage collection" below.
+
+Serving: uploaded images (``MEDIA_ROOT``) are served by Django itself, DEBUG or not,
+through ``store.views.media_file``:
+
+- ``HashedMediaStorage.url()`` puts a content hash in every image URL:
+  ``/media/3fa1c0d2e4b5a697/products/rice.png``. Such a response is cached
+  for a year with ``Cache-Control: immutable``; a changed image gets a new
+  URL, so repeat visits never even revalidate. A stale hash redirects to
+  the current URL (old HTML still works).
+- plain ``/media/products/rice.png`` keeps working and revalidates
+  (``no-cache`` + ETag / Last-Modified ➝ 304)
+- ``If-None-Match`` / ``If-Modified-Since`` / ``If-Range`` and single
+  ``Range: bytes=...`` requests (206 / 416) are handled
+- behind nginx (``MEDIA_ACCEL_REDIRECT``) or Apache / lighttpd
+  (``MEDIA_X_SENDFILE``) Django only checks and sets headers; the proxy
+  sends the bytes. Otherwise ``FileResponse`` lets the WSGI server use
+  ``sendfile()``.
+- variants made by ``manage.py build_media_variants`` are picked when the
+  client accepts them: a WebP copy of PNG / JPEG images, a gzip copy of
+  compressible files (SVG, ...). They live in ``MEDIA_ROOT/_variants``,
+  named after the content hash, so an edited image never gets a stale
+  variant.
+
+Content-addressed names carry their hash, so their URLs cost no I/O at
+all. Other files (uploaded before, or placed by hand) are hashed once per
+process and cached by (size, mtime): later ``url()`` calls cost a ``stat()``.
+"""
+import gzip
+import hashlib
+import io
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+import time
+from collections import Counter
+from email.utils import formatdate
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import models, transaction
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotAllowed, HttpResponseRedirect, StreamingHttpResponse,
+)
+from django.utils.cache import get_conditional_response
+from django.utils.encoding import filepath_to_uri
+from django.utils.http import parse_http_date_safe
+
+
+DIGEST_LENGTH = 16
+VARIANTS_DIR = '_variants'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, no-cache'
+CHUNK_SIZE = 64 * 1024
+
+WEBP_SOURCES = {'image/png', 'image/jpeg'}
+GZIP_TYPES = {'image/svg+xml', 'image/bmp', 'image/x-icon', 'text/plain', 'text/csv', 'application/json'}
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# ".../3f/3fa1...7d.png": the shard directory repeats the first two hex chars
+NAME_HASH_LENGTH = 32
+_CONTENT_NAME = re.compile(r'(?:^|/)([0-9a-f]{2})/(\1[0-9a-f]{%d})(?:\.[A-Za-z0-9]+)?$' % (NAME_HASH_LENGTH - 2))
+
+
+class MediaError(ValueError):
+    pass
+
+
+# 🔑 Content hashes
+# ----------------
+
+_digests = {}   # path ➝ (size, mtime_ns, digest)
+
+
+def file_digest(path, stat=None):
+    """First DIGEST_LENGTH hex chars of the file's SHA-256, cached until it changes."""
+    stat = stat or os.stat(path)
+    cached = _digests.get(path)
+    if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+        return cached[2]
+    with open(path, 'rb') as handle:
+        digest = hashlib.file_digest(handle, 'sha256').hexdigest()[:DIGEST_LENGTH]
+    _digests[path] = (stat.st_size, stat.st_mtime_ns, digest)
+    return digest
+
+
+def name_digest(name):
+    """The URL digest of a content-addressed name, without touching the file (else None)."""
+    match = _CONTENT_NAME.search(name)
+    return match.group(2)[:DIGEST_LENGTH] if match else None
+
+
+def content_name(name, sha256):
+    """``products/KW1.png`` + hash ➝ ``products/3f/3fa1...7d.png``"""
+    directory, ext = posixpath.dirname(name), posixpath.splitext(name)[1].lower()
+    return posixpath.join(directory, sha256[:2], sha256[:NAME_HASH_LENGTH] + ext)
+
+
+class HashedMediaStorage(FileSystemStorage):
+    """``FileSystemStorage`` whose URLs carry the file's content hash."""
+
+    def url(self, name):
+        url = super().url(name)
+        if not settings.MEDIA_HASHED_URLS or not name:
+            return url
+        digest = name_digest(name)
+        if digest is None:
+            try:
+                digest = file_digest(self.path(name))
+            except (OSError, SuspiciousFileOperation):
+                return url   # missing file: the plain URL 404s like before
+        return f'{self.base_url}{digest}/{filepath_to_uri(name)}'
+
+
+class ContentAddressedStorage(HashedMediaStorage):
+    """
+    Saves every upload under its content hash (see ``content_name``); a file
+    that is already stored is not written again.
+    """
+
+    def _save(self, name, content):
+        sha256 = hashlib.sha256()
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        content.seek(0)
+        name = content_name(name, sha256.hexdigest())
+        if self.exists(name):
+            # Shared from now on: a fresh mtime keeps gc_media's grace
+            # period from deleting it before the new row is committed
+            os.utime(self.path(name))
+            return name
+        return super()._save(name, content)
+
+
+# 🎨 Variants
+# -----------
+
+def variant_path(digest, kind):
+    return os.path.join(settings.MEDIA_ROOT, VARIANTS_DIR, f'{digest}.{kind}')
+
+
+def _accepts(request, header, token):
+    return token in request.META.get(header, '')
+
+
+def choose_variant(request, path, digest, content_type):
+    """
+    ``(path, content type, content encoding, etag suffix, vary)`` of the best
+    representation this client accepts: the WebP or gzip variant when one
+    was built, else the original file.
+    """
+    if content_type in WEBP_SOURCES:
+        webp = variant_path(digest, 'webp')
+        if os.path.exists(webp):
+            if _accepts(request, 'HTTP_ACCEPT', 'image/webp'):
+                return webp, 'image/webp', None, '-webp', 'Accept'
+            return path, content_type, None, '', 'Accept'
+    elif content_type in GZIP_TYPES:
+        gz = variant_path(digest, 'gz')
+        if os.path.exists(gz):
+            if _accepts(request, 'HTTP_ACCEPT_ENCODING', 'gzip'):
+                return gz, content_type, 'gzip', '-gz', 'Accept-Encoding'
+            return path, content_type, None, '', 'Accept-Encoding'
+    return path, content_type, None, '', None
+
+
+def build_variants(force=False, quality=80, progress=None):
+    """
+    Create the WebP / gzip variants of every file under MEDIA_ROOT. A WebP
+    copy is only kept when it is smaller than the original. Returns::
+
+        {'files': 365, 'webp': 340, 'gzip': 0, 'skipped': 25,
+         'original_bytes': 194000000, 'variant_bytes': 21000000, 'seconds': 80.1}
+    """
+    from PIL import Image
+
+    started = time.perf_counter()
+    root = str(settings.MEDIA_ROOT)
+    os.makedirs(os.path.join(root, VARIANTS_DIR), exist_ok=True)
+    report = {'files': 0, 'webp': 0, 'gzip': 0, 'skipped': 0, 'original_bytes': 0, 'variant_bytes': 0}
+
+    for directory, subdirs, files in os.walk(root):
+        if directory == root:
+            subdirs[:] = [d for d in subdirs if d != VARIANTS_DIR and not d.startswith('.')]
+        for filename in files:
+            path = os.path.join(directory, filename)
+            content_type = mimetypes.guess_type(filename)[0]
+            if content_type not in WEBP_SOURCES and content_type not in GZIP_TYPES:
+                continue
+            report['files'] += 1
+            digest = file_digest(path)
+            kind = 'webp' if content_type in WEBP_SOURCES else 'gz'
+            target = variant_path(digest, kind)
+            if os.path.exists(target) and not force:
+                continue
+
+            with open(path, 'rb') as handle:
+                original = handle.read()
+            if kind == 'webp':
+                try:
+                    with Image.open(io.BytesIO(original)) as image:
+                        if getattr(image, 'is_animated', False):
+                            report['skipped'] += 1
+                            continue
+                        buffer = io.BytesIO()
+                        image.save(buffer, 'WEBP', quality=quality, method=4)
+                except OSError:   # not really an image
+                    report['skipped'] += 1
+                    continue
+                data = buffer.getvalue()
+            else:
+                data = gzip.compress(original, compresslevel=9, mtime=0)
+
+            if len(data) >= len(original):
+                report['skipped'] += 1
+                continue
+            with open(target + '.tmp', 'wb') as handle:
+                handle.write(data)
+            os.replace(target + '.tmp', target)
+            report['webp' if kind == 'webp' else 'gzip'] += 1
+            report['original_bytes'] += len(original)
+            report['variant_bytes'] += len(data)
+            if progress and (report['webp'] + report['gzip']) % 100 == 0:
+                progress(f"{report['webp'] + report['gzip']} variant(s) written")
+
+    report['seconds'] = round(time.perf_counter() - started, 2)
+    return report
+
+
+# 📤 Serving
+# ----------
+
+def _byte_range(request, size, etag, last_modified):
+    """
+    ``(start, end)`` (inclusive) for a single satisfiable ``Range``,
+    ``'unsatisfiable'``, or None to send the whole file (no / invalid /
+    multi-part range, or an ``If-Range`` that no longer matches).
+    """
+    header = request.META.get('HTTP_RANGE', '').replace(' ', '')
+    if not header:
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range:
+        if if_range.startswith(('"', 'W/')):
+            if if_range != etag:
+                return None
+        elif parse_http_date_safe(if_range) != int(last_modified):
+            return None
+    match = _RANGE.match(header)
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:   # "bytes=-500": the last 500 bytes
+        length = int(last)
+        if length == 0:
+            return 'unsatisfiable'
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        return 'unsatisfiable'
+    if end < start:
+        return None
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as handle:
+        handle.seek(start)
+        while length > 0:
+            chunk = handle.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def _set_headers(response, content_type, encoding, etag, last_modified, cache_control, vary):
+    response['Content-Type'] = content_type
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Last-Modified'] = formatdate(last_modified, usegmt=True)
+    response['Cache-Control'] = cache_control
+    response['Accept-Ranges'] = 'bytes'
+    if vary:
+        response['Vary'] = vary
+    return response
+
+
+def serve(request, name, digest=None):
+    """Response for ``/media/<name>`` or ``/media/<digest>/<name>``."""
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    if name.startswith((VARIANTS_DIR + '/', '.')) or '/.' in name:
+        raise Http404("No such file.")
+    try:
+        path = default_storage.path(name)
+        stat = os.stat(path)
+    except (OSError, SuspiciousFileOperation, NotImplementedError):
+        raise Http404("No such file.")
+    if not os.path.isfile(path):
+        raise Http404("No such file.")
+
+    current = name_digest(name) or file_digest(path, stat)
+    if digest is not None and digest != current:
+        return HttpResponseRedirect(f'{settings.MEDIA_URL}{current}/{filepath_to_uri(name)}')
+
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    path, content_type, encoding, suffix, vary = choose_variant(request, path, current, content_type)
+    if suffix:
+        stat = os.stat(path)
+    etag = f'"{current}{suffix}"'
+    last_modified = stat.st_mtime
+    cache_control = IMMUTABLE if digest else REVALIDATE
+
+    def headers(response):
+        return _set_headers(response, content_type, encoding, etag, last_modified, cache_control, vary)
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if conditional is not None:   # 304 / 412
+        return headers(conditional)
+
+    relative = os.path.relpath(path, settings.MEDIA_ROOT)
+    if settings.MEDIA_ACCEL_REDIRECT:
+        response = headers(HttpResponse())
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT + filepath_to_uri(relative.replace(os.sep, '/'))
+        return response
+    if settings.MEDIA_X_SENDFILE:
+        response = headers(HttpResponse())
+        response['X-Sendfile'] = path
+        return response
+
+    size = stat.st_size
+    byte_range = _byte_range(request, size, etag, last_modified)
+    if byte_range == 'unsatisfiable':
+        response = headers(HttpResponse(status=416))
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        start, length, status = 0, size, 200
+        if request.method == 'HEAD':
+            response = HttpResponse()
+        else:
+            response = FileResponse(open(path, 'rb'))
+    else:
+        start, end = byte_range
+        length, status = end - start + 1, 206
+        response = HttpResponse() if request.method == 'HEAD' else StreamingHttpResponse(_read_range(path, start, length))
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response.status_code = status
+    headers(response)
+    response['Content-Length'] = str(length)
+    return response
+
+
+# 🧹 Garbage collection
+# ---------------------
+# A stored file is live while at least one row points at it: its reference
+# count is the number of FileField values (any model) equal to its name.
+# Files under the upload_to directories with no reference, and variants
+# whose content no live file has, are deleted. Files younger than
+# ``min_age`` seconds are left alone: an upload is written before its row
+# is committed.
+
+def file_fields():
+    """``[(model, field)]`` for every concrete FileField / ImageField."""
+    return [
+        (model, field)
+        for model in apps.get_models()
+        for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField)
+    ]
+
+
+def upload_dirs():
+    """The ``upload_to`` directories: products, brands, categories."""
+    return sorted({
+        field.upload_to.strip('/').split('/')[0]
+        for _model, field in file_fields()
+        if isinstance(field.upload_to, str) and field.upload_to.strip('/')
+    })
+
+
+def reference_counts():
+    """``Counter({name: rows pointing at it})``"""
+    counts = Counter()
+    for model, field in file_fields():
+        names = model._base_manager.exclude(**{field.attname: ''}).exclude(**{f'{field.attname}__isnull': True})
+        counts.update(names.values_list(field.attname, flat=True).iterator(chunk_size=10_000))
+    return counts
+
+
+def rehash(dry_run=False, progress=None):
+    """
+    Move files referenced under their old upload names to content-addressed
+    names (identical pictures end up as one file) and point the rows at
+    them. The old files become orphans for the GC pass. Returns
+    ``(files rehashed, rows updated)``.
+    """
+    storage = ContentAddressedStorage()
+    fields = file_fields()
+    files = rows = 0
+    for name in sorted(reference_counts()):
+        if name_digest(name) is not None:
+            continue
+        try:
+            path = storage.path(name)
+            with open(path, 'rb') as handle:
+                target = content_name(name, hashlib.file_digest(handle, 'sha256').hexdigest())
+        except (OSError, SuspiciousFileOperation):
+            continue   # missing file: nothing to move
+        files += 1
+        if dry_run:
+            continue
+        target_path = storage.path(target)
+        if not os.path.exists(target_path):
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            try:
+                os.link(path, target_path)
+            except OSError:   # no hard links here (other file system, Windows share...)
+                shutil.copy2(path, target_path)
+        with transaction.atomic():
+            for model, field in fields:
+                rows += model._base_manager.filter(**{field.attname: name}).update(**{field.attname: target})
+        if progress and files % 100 == 0:
+            progress(f"{files} file(s) rehashed")
+    return files, rows
+
+
+def collect_garbage(dry_run=False, min_age=3600, rehash_files=False, allow_empty=False, progress=None):
+    """
+    Delete orphaned uploads and variants. Returns::
+
+        {'references': 1200, 'referenced_files': 350, 'missing_files': 0,
+         'shared_files': 40, 'shared_bytes': 9000000,
+         'rehashed_files': 0, 'rehashed_rows': 0,
+         'scanned_files': 365, 'recent_files': 2, 'orphan_files': 13,
+         'variants_deleted': 4, 'bytes_reclaimed': 3400000,
+         'dry_run': False, 'seconds': 1.2}
+
+    ``shared_bytes``: what the shared files would take again if each row
+    had its own copy (the deduplication saving).
+    """
+    started = time.perf_counter()
+    report = {'rehashed_files': 0, 'rehashed_rows': 0}
+    if rehash_files:
+        report['rehashed_files'], report['rehashed_rows'] = rehash(dry_run, progress)
+
+    counts = reference_counts()
+    root = str(settings.MEDIA_ROOT)
+    directories = upload_dirs()
+    scanned = [
+        os.path.join(directory, filename)
+        for top in directories
+        for directory, _subdirs, filenames in os.walk(os.path.join(root, top))
+        for filename in filenames
+    ]
+    if scanned and not counts and not allow_empty and not dry_run:
+        raise MediaError(
+            f"No row references any of the {len(scanned)} file(s) under {', '.join(directories)}: "
+            "wrong database? Pass allow_empty (--allow-empty) to delete them anyway."
+        )
+
+    now = time.time()
+    live_digests, shared_bytes, missing = set(), 0, 0
+    for name, refs in counts.items():
+        path = os.path.join(root, name)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            missing += 1
+            continue
+        live_digests.add(name_digest(name) or file_digest(path))
+        shared_bytes += size * (refs - 1)
+
+    recent = orphans = variants = reclaimed = 0
+    for path in scanned:
+        name = os.path.relpath(path, root).replace(os.sep, '/')
+        if counts.get(name):
+            continue
+        stat = os.stat(path)
+        if now - stat.st_mtime < min_age:
+            recent += 1
+            continue
+        orphans += 1
+        reclaimed += stat.st_size
+        if not dry_run:
+            os.remove(path)
+
+    variants_dir = os.path.join(root, VARIANTS_DIR)
+    for filename in (os.listdir(variants_dir) if os.path.isdir(variants_dir) else ()):
+        path = os.path.join(variants_dir, filename)
+        if filename.split('.', 1)[0] in live_digests or now - os.stat(path).st_mtime < min_age:
+            continue
+        variants += 1
+        reclaimed += os.path.getsize(path)
+        if not dry_run:
+            os.remove(path)
+
+    if not dry_run:   # empty shard directories
+        for top in directories:
+            for directory, subdirs, filenames in os.walk(os.path.join(root, top), topdown=False):
+                if not subdirs and not filenames and directory != os.path.join(root, top):
+                    os.rmdir(directory)
+
+    report.update({
+        'references': sum(counts.values()),
+        'referenced_files': len(counts) - missing,
+        'missing_files': missing,
+        'shared_files': sum(1 for refs in counts.values() if refs > 1),
+        'shared_bytes': shared_bytes,
+        'scanned_files': len(scanned),
+        'recent_files': recent,
+        'orphan_files': orphans,
+        'variants_deleted': variants,
+        'bytes_reclaimed': reclaimed,
+        'dry_run': dry_run,
+        'seconds': round(time.perf_counter() - started, 2),
+    })
+    return report
@@ -0,0 +1,290 @@
+# store/metrics.py
+"""
+📈 Per-view request metrics
+
+``store.middleware.MetricsMiddleware`` measures every request and hands the
+numbers to ``record()``:
+
+- wall time, DB time and query count (``execute_wrapper``)
+- template render time (``TimedDjangoTemplates`` backend, see settings)
+- response size
+
+Each worker keeps Prometheus-style histograms per view name in memory.
+With ``settings.METRICS_DB`` set, the counts are added to a small SQLite
+file every ``METRICS_FLUSH_SECONDS``, so ``/metrics`` shows the totals of
+*all* gunicorn workers, not just the one that answers the scrape.
+(A separate file on purpose: metrics writes never touch the shop database
+or its locks.)
+"""
+import atexit
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates
+
+
+PREFIX = 'ecom'
+
+# name ➝ (help text, bucket upper bounds)
+HISTOGRAMS = {
+    'request_duration_seconds': (
+        "Wall time of the request",
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ),
+    'request_db_seconds': (
+        "Time spent in SQL queries",
+        (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+    ),
+    'request_queries': (
+        "SQL queries run",
+        (0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+    ),
+    'request_template_seconds': (
+        "Template render time",
+        (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+    ),
+    'response_size_bytes': (
+        "Response body size (streamed responses not included)",
+        (1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+    ),
+}
+
+
+# ⏱ Per-request measurements
+# --------------------------
+
+class RequestTimings:
+    """What one request spent, filled in while it runs."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_seconds = 0.0
+        self.queries = 0
+        self.template_seconds = 0.0
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - start
+            self.queries += 1
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+current = ContextVar('request_timings', default=None)
+
+
+class _TimedTemplate:
+    def __init__(self, template):
+        self._template = template
+
+    def __getattr__(self, name):
+        return getattr(self._template, name)
+
+    def render(self, context=None, request=None):
+        timings = current.get()
+        if timings is None:
+            return self._template.render(context, request)
+        start = time.perf_counter()
+        try:
+            return self._template.render(context, request)
+        finally:
+            timings.template_seconds += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    The regular Django template engine, timing each top-level render
+    (``{% include %}`` / ``{% extends %}`` are part of their parent's time).
+    """
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name))
+
+
+def server_timing(timings, total, queries=False):
+    """
+    ``Server-Timing`` header value (durations in ms). The query count
+    (``queries=True``) is for DEBUG / staff only, like ``X-DB-Queries``.
+    """
+    desc = f';desc="{timings.queries} queries"' if queries else ''
+    return (
+        f'app;dur={total * 1000:.1f}, '
+        f'db;dur={timings.db_seconds * 1000:.1f}{desc}, '
+        f'tpl;dur={timings.template_seconds * 1000:.1f}'
+    )
+
+
+# 📊 Histograms
+# -------------
+
+class Registry:
+    """
+    ``{(view, metric): [bucket counts..., +Inf count, sum]}`` since the last
+    flush. Without a sink nothing is flushed, so it holds the worker's totals.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.last_flush = time.monotonic()
+
+    def observe(self, view, values):
+        with self.lock:
+            for name, value in values.items():
+                bounds = HISTOGRAMS[name][1]
+                row = self.pending.get((view, name))
+                if row is None:
+                    row = self.pending[(view, name)] = [0] * (len(bounds) + 2)
+                for i, bound in enumerate(bounds):
+                    if value <= bound:
+                        row[i] += 1
+                        break
+                else:
+                    row[len(bounds)] += 1
+                row[-1] += value
+
+    def take(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.last_flush = time.monotonic()
+        return pending
+
+    def snapshot(self):
+        with self.lock:
+            return {key: list(row) for key, row in self.pending.items()}
+
+
+registry = Registry()
+
+
+# 🗃 Shared SQLite sink
+# --------------------
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS histogram (
+    view   TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    slot   INTEGER NOT NULL,   -- bucket index; len(bounds) = +Inf, -1 = sum
+    value  REAL NOT NULL,
+    PRIMARY KEY (view, metric, slot)
+)
+"""
+
+
+def connect_sink(schema=SCHEMA):
+    """Autocommit connection to ``settings.METRICS_DB`` with ``schema`` in place."""
+    conn = sqlite3.connect(settings.METRICS_DB, timeout=5, isolation_level=None)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.executescript(schema)
+    return conn
+
+
+def flush():
+    """Add this worker's pending counts to the shared sink."""
+    if not settings.METRICS_DB:
+        return
+    pending = registry.take()
+    if not pending:
+        return
+    rows = []
+    for (view, name), row in pending.items():
+        rows.extend((view, name, slot, value) for slot, value in enumerate(row[:-1]) if value)
+        rows.append((view, name, -1, row[-1]))
+    try:
+        conn = connect_sink()
+        try:
+            with conn:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.executemany(
+                    'INSERT INTO histogram (view, metric, slot, value) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT (view, metric, slot) DO UPDATE SET value = value + excluded.value',
+                    rows,
+                )
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        # Keep the counts for the next attempt rather than losing them
+        with registry.lock:
+            for key, row in pending.items():
+                mine = registry.pending.setdefault(key, [0] * len(row))
+                for i, value in enumerate(row):
+                    mine[i] += value
+
+
+atexit.register(flush)
+
+
+def record(view, timings, total, size=None):
+    values = {
+        'request_duration_seconds': total,
+        'request_db_seconds': timings.db_seconds,
+        'request_queries': timings.queries,
+        'request_template_seconds': timings.template_seconds,
+    }
+    if size is not None:
+        values['response_size_bytes'] = size
+    registry.observe(view, values)
+
+    if settings.METRICS_DB and time.monotonic() - registry.last_flush >= settings.METRICS_FLUSH_SECONDS:
+        flush()
+
+
+def collect():
+    """All histograms: the shared sink's totals, or this worker's own."""
+    if not settings.METRICS_DB:
+        return registry.snapshot()
+    flush()
+    totals = {}
+    conn = connect_sink()
+    try:
+        for view, name, slot, value in conn.execute('SELECT view, metric, slot, value FROM histogram'):
+            if name not in HISTOGRAMS:
+                continue   # renamed / removed metric
+            row = totals.setdefault((view, name), [0] * (len(HISTOGRAMS[name][1]) + 2))
+            row[slot] += value
+    finally:
+        conn.close()
+    return totals
+
+
+# 📝 Prometheus text format
+# ------------------------
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus(histograms=None):
+    histograms = collect() if histograms is None else histograms
+    lines = []
+    for name, (help_text, bounds) in HISTOGRAMS.items():
+        metric = f'{PREFIX}_{name}'
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} histogram')
+        for (view, row_name), row in sorted(histograms.items()):
+            if row_name != name:
+                continue
+            view = _label(view)
+            cumulative = 0
+            for bound, count in zip(bounds, row):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{view="{view}",le="{_number(bound)}"}} {_number(cumulative)}')
+            cumulative += row[len(bounds)]
+            lines.append(f'{metric}_bucket{{view="{view}",le="+Inf"}} {_number(cumulative)}')
+            lines.append(f'{metric}_sum{{view="{view}"}} {_number(row[-1])}')
+            lines.append(f'{metric}_count{{view="{view}"}} {_number(cumulative)}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,324 @@
+# store/middleware.py
+"""
+🧩 Store middleware
+"""
+import itertools
+import logging
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.urls import ResolverMatch
+from django.utils.cache import patch_vary_headers
+from django.utils.functional import SimpleLazyObject
+
+from . import metrics, prerender, profiling, slowlog
+from .routers import catalog_read_alias, is_pinned_to_primary, reset_primary_pin
+
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = 'db_primary_pin'
+
+
+def _is_staff(request):
+    """
+    Staff, judged only from a user the request already loaded: looking
+    it up here would cost the session + user queries on every request.
+    AuthenticationMiddleware's lazy ``request.user`` keeps the loaded user
+    in ``request._cached_user`` (django.contrib.auth.middleware.get_user).
+    """
+    user = getattr(request, 'user', None)
+    if isinstance(user, SimpleLazyObject) and not hasattr(request, '_cached_user'):
+        return False
+    return bool(user is not None and user.is_authenticated and user.is_staff)
+
+
+class QueryCounter:
+    """
+    ``connection.execute_wrapper`` callable that counts queries per alias.
+    """
+
+    def __init__(self):
+        self.counts = {}
+
+    def for_alias(self, alias):
+        def wrapper(execute, sql, params, many, context):
+            self.counts[alias] = self.counts.get(alias, 0) + 1
+            return execute(sql, params, many, context)
+        return wrapper
+
+    def header_value(self):
+        # e.g. "default=3, replica=7"
+        return ', '.join(f'{alias}={n}' for alias, n in sorted(self.counts.items()))
+
+
+class DatabaseRoutingMiddleware:
+    """
+    🔀 Per-request state for store.routers.CatalogReadRouter.
+
+    - Starts every request unpinned, unless the browser wrote something in the
+      last REPLICA_PIN_SECONDS (cookie), so redirects see their own writes.
+    - Counts queries per database alias and reports them in the debug log,
+      and in the ``X-DB-Queries`` response header under DEBUG or to staff
+      (on pages that loaded the user anyway).
+
+    Works in both WSGI and ASGI stacks. Under ASGI the query wrappers are
+    installed from the request's sync thread, which is where the async ORM
+    runs its queries.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        counter, stack = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            stack.close()
+        return self._finish(request, response, counter)
+
+    async def __acall__(self, request):
+        counter, stack = await sync_to_async(self._start)(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self._finish(request, response, counter)
+
+    def _start(self, request):
+        reset_primary_pin(pinned=PIN_COOKIE in request.COOKIES)
+
+        counter = QueryCounter()
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(
+                connections[alias].execute_wrapper(counter.for_alias(alias))
+            )
+        return counter, stack
+
+    def _finish(self, request, response, counter):
+        queries = counter.header_value()
+        logger.debug('%s %s queries: %s', request.method, request.path, queries)
+        if settings.DEBUG or _is_staff(request):
+            response['X-DB-Queries'] = queries
+
+        # Only worth a cookie when there is a replica to be stale against
+        if is_pinned_to_primary() and catalog_read_alias() and PIN_COOKIE not in request.COOKIES:
+            response.set_cookie(PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True)
+
+        reset_primary_pin()
+        return response
+
+
+class MetricsMiddleware:
+    """
+    📈 Per-view timing, query count and response size (store/metrics.py).
+
+    - adds a ``Server-Timing`` header (app / db / template time), shown in
+      the browser dev tools under Network ➝ Timing; the query count only
+      under DEBUG or to staff, like ``X-DB-Queries``
+    - records the request in the per-view histograms served at ``/metrics``
+
+    Goes first in MIDDLEWARE so the wall time covers the whole stack.
+    Switched off entirely with ``METRICS_ENABLED=False``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        timings, stack = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            stack.close()
+            metrics.current.set(None)
+        return self._finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings, stack = await sync_to_async(self._start)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self._finish(request, response, timings)
+
+    def _start(self):
+        timings = metrics.RequestTimings()
+        metrics.current.set(timings)
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(timings.sql_wrapper))
+        return timings, stack
+
+    def _finish(self, request, response, timings):
+        total = timings.elapsed()
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unmatched'
+        size = None if response.streaming else len(response.content)
+
+        if settings.SERVER_TIMING_HEADER:
+            show_queries = settings.DEBUG or _is_staff(request)
+            response['Server-Timing'] = metrics.server_timing(timings, total, queries=show_queries)
+        metrics.record(view, timings, total, size)
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    🔬 Sampled cProfile capture (store/profiling.py).
+
+    Profiles one request in every ``PROFILE_EVERY_N``, plus staff requests
+    asking for it with ``X-Profile: 1`` / ``?_profile=1`` when
+    ``PROFILE_ON_REQUEST`` is on. Sits after AuthenticationMiddleware so it
+    can tell staff apart. Not installed at all (MiddlewareNotUsed) when both
+    are off.
+    """
+
+    def __init__(self, get_response):
+        self.every = settings.PROFILE_EVERY_N
+        self.on_request = settings.PROFILE_ON_REQUEST
+        if not self.every and not self.on_request:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.counter = itertools.count(1)
+
+    def _wanted(self, request):
+        if self.every and next(self.counter) % self.every == 0:
+            return True
+        if self.on_request and (request.headers.get('X-Profile') == '1' or request.GET.get('_profile') == '1'):
+            user = getattr(request, 'user', None)
+            return bool(user and user.is_staff)
+        return False
+
+    def __call__(self, request):
+        if not self._wanted(request):
+            return self.get_response(request)
+
+        response, profiler = profiling.profile_call(self.get_response, request)
+        if profiler is not None:
+            match = getattr(request, 'resolver_match', None)
+            path = profiling.save(profiler, match.view_name if match else 'unmatched')
+            response['X-Profile-Dump'] = path.name
+        return response
+
+
+class SlowQueryMiddleware:
+    """
+    🐢 Installs the slow query log (store/slowlog.py) for each request.
+    Not installed at all when ``SLOW_QUERY_MS`` is 0.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.SLOW_QUERY_MS <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        stack = self._start(request)
+        try:
+            return self.get_response(request)
+        finally:
+            stack.close()
+            slowlog.maybe_flush()
+
+    async def __acall__(self, request):
+        stack = await sync_to_async(self._start)(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            slowlog.maybe_flush()
+
+    def _start(self, request):
+        wrapper = slowlog.SlowQueryWrapper(request)
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(wrapper))
+        return stack
+
+
+class PrerenderedPageMiddleware:
+    """
+    🖨 Serves catalog pages to anonymous visitors from the files written by
+    ``manage.py render_catalog`` (store/prerender.py).
+
+    "Anonymous" here means no session cookie, so the answer needs no session,
+    user or query at all. Anything else (logged in, a pending message, a page
+    not rendered yet) goes to the view as usual. The ``X-Prerendered``
+    header tells the two apart.
+
+    Sits after CsrfViewMiddleware, which sets the cookie for the CSRF token
+    filled into the page, and before AuthenticationMiddleware. Not installed
+    when ``PRERENDERED_PAGES`` is off.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PRERENDERED_PAGES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self._serve(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        # A small read from the page cache: not worth a thread hop
+        return self._serve(request) or await self.get_response(request)
+
+    def _serve(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        if settings.SESSION_COOKIE_NAME in request.COOKIES or 'messages' in request.COOKIES:
+            return None
+        page = prerender.lookup(request)
+        if page is None:
+            return None
+        path, url_name = page
+        try:
+            with open(path, 'rb') as handle:
+                body = handle.read()
+        except FileNotFoundError:
+            return None
+
+        origin = f'{request.scheme}://{request.get_host()}'
+        response = HttpResponse(prerender.fill_in(body, get_token(request), origin))
+        response['X-Prerendered'] = '1'
+        patch_vary_headers(response, ('Cookie',))
+        # Reported in /metrics as e.g. "prerendered:product_detail"
+        request.resolver_match = ResolverMatch(self, (), {}, url_name=url_name, namespaces=['prerendered'])
+        return response
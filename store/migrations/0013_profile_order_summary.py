@@ -0,0 +1,57 @@
+# Generated by Django 5.2.3 on 2026-10-19 02:47
+
+from django.db import migrations, models
+
+
+def backfill_summaries(apps, schema_editor):
+    """Fill the new Profile summary fields for every user who has orders."""
+    Order = apps.get_model('store', 'Order')
+    OrderItem = apps.get_model('store', 'OrderItem')
+    Profile = apps.get_model('store', 'Profile')
+
+    spend = dict(
+        OrderItem.objects
+        .exclude(order__status='cancelled')
+        .values('order__user_id')
+        .annotate(total=models.Sum(models.F('quantity') * models.F('product__price')))
+        .values_list('order__user_id', 'total')
+    )
+    rows = (
+        Order.objects
+        .values('user_id')
+        .annotate(n=models.Count('id'), last=models.Max('order_date'))
+    )
+    for row in rows.iterator(chunk_size=2000):
+        Profile.objects.update_or_create(
+            user_id=row['user_id'],
+            defaults={
+                'order_count': row['n'],
+                'last_order_date': row['last'],
+                'lifetime_spend': spend.get(row['user_id']) or 0,
+            },
+        )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0012_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='last_order_date',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='lifetime_spend',
+            field=models.DecimalField(decimal_places=3, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='order_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.3 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    """
+    Existing lines get today's product price (the best we know), existing
+    orders count as rolled up. Run `manage.py update_sales_rollups --rebuild`
+    once afterwards so every day is priced from these unit prices.
+    """
+    Order = apps.get_model('store', 'Order')
+    OrderItem = apps.get_model('store', 'OrderItem')
+    Product = apps.get_model('store', 'Product')
+
+    OrderItem.objects.update(
+        unit_price=models.Subquery(Product.objects.filter(pk=models.OuterRef('product_id')).values('price')[:1])
+    )
+    Order.objects.update(rolled_up=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0015_order_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='rolled_up',
+            field=models.BooleanField(db_default=False, editable=False),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='orderitem',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=3, max_digits=10),
+        ),
+    ]
@@ -10,6 +10,8 @@ This file defines the main data structures for the e-commerce application:
 - OrderItem ➝ A single product inside an order
 - Cart     ➝ A shopping cart belonging to a user
 - CartItem ➝ A single product inside a cart
+- *SalesDaily ➝ Pre-aggregated daily sales (see store/rollups.py)
+- Archived*  ➝ Old finished orders moved out of the hot tables (see store/archive.py)
 """
 
 
@@ -54,6 +56,15 @@ class Product(models.Model):
     category = models.ForeignKey(Category,on_delete=models.SET_NULL,null=True,blank=True,related_name='products')
     brand = models.ForeignKey(Brand,on_delete=models.SET_NULL,null=True,blank=True,related_name='products')
 
+    # 🕒 Bumped on every save; in-process catalog indexes use it as a change version
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # product_list filtered by brand and category together
+            models.Index(fields=['brand', 'category', 'id'], name='product_brand_cat_idx'),
+        ]
+
     def __str__(self):
         # Example: "SKU123: Bottle Water 1.5L"
         return f"{self.sku}: {self.name}"
@@ -85,7 +96,22 @@ class Order(models.Model):
     )
 
     # 🔹 Date/time when the order was created
-    order_date = models.DateTimeField(auto_now_add=True)
+    order_date = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    # 🔹 Already counted in the sales rollups (store/rollups.py)? Orders
+    # saved through the ORM are, from the start; rows inserted any other way
+    # wait for `manage.py update_sales_rollups`.
+    rolled_up = models.BooleanField(db_default=False, editable=False)
+
+    is_archived = False   # see ArchivedOrder
+
+    class Meta:
+        indexes = [
+            # dashboard / my orders: one user's orders, newest first
+            models.Index(fields=['user', 'order_date'], name='order_user_date_idx'),
+            # staff order list filtered by status, newest first
+            models.Index(fields=['status', 'order_date'], name='order_status_date_idx'),
+        ]
 
     def __str__(self):
         # Example: "Order#5 by nashi"
@@ -105,7 +131,7 @@ class Order(models.Model):
         💰 Returns the total price for this order.
         Sum of all line totals of the order items.
         """
-        return sum(item.quantity * item.product.price for item in self.items.all())
+        return sum(item.line_total for item in self.items.all())
 
 
 
@@ -126,18 +152,62 @@ class OrderItem(models.Model):
         related_name='order_items'
     )
     quantity = models.IntegerField()
+    # Price when the order was placed: later price changes don't rewrite old
+    # orders (or their sales rollups). Same name as on ArchivedOrderItem, so
+    # templates work with both.
+    unit_price = models.DecimalField(max_digits=10, decimal_places=3, blank=True)
+
+    def save(self, *args, **kwargs):
+        # 💰 Left empty ➝ the product's current price
+        if self.unit_price is None:
+            self.unit_price = self.product.price
+        super().save(*args, **kwargs)
+
+    @property
+    def product_name(self):
+        return self.product.name
 
     @property
     def line_total(self):
         """
         Returns the total price for this line:
-        product price × quantity.
+        unit price × quantity.
         """
-        return self.quantity * self.product.price
+        return self.quantity * self.unit_price
 
     def __str__(self):
         # Example: "2 x Bottle Water 1.5L (Order #5)"
-        return f"{self.quantity} x {self.product.name} (Order #{self.order.id})"
+        return f"{self.quantity} x {self.product.name} (Order #{self.order_id})"
+
+
+# 🕓 OrderEvent Model
+class OrderEvent(models.Model):
+    """
+    One status change of an order (who, when, from → to).
+    Written in bulk by store/bulk.py, so one row per order per change.
+    """
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        related_name='events'
+    )
+    from_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    to_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['order', 'created_at'], name='orderevent_order_idx')]
+
+    def __str__(self):
+        # Example: "Order #5: pending → shipped"
+        return f"Order #{self.order_id}: {self.from_status} → {self.to_status}"
 
 
 # 🛒 Cart Model
@@ -170,7 +240,7 @@ class Cart(models.Model):
         """
         Returns the total price of all items in the cart.
         """
-        return sum(item.quantity * item.product.price for item in self.items.all())
+        return sum(item.line_total for item in self.items.all())
 
     def __str__(self):
         return f"Cart for {self.user.username}"
@@ -223,6 +293,136 @@ class Profile(models.Model):
     # Optional future enhancement:
     # avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
 
+    # 📊 Order summary, kept up to date by store/signals.py (see
+    # orders.refresh_customer_summaries) so the dashboard never counts orders
+    order_count = models.PositiveIntegerField(default=0)
+    lifetime_spend = models.DecimalField(max_digits=14, decimal_places=3, default=0)  # cancelled orders excluded
+    last_order_date = models.DateTimeField(null=True, blank=True)
+
     def __str__(self):
         return f"Profile for {self.user.username}"
 
+
+# 📈 Sales rollups
+# ----------------
+# One row per (day, product / brand / category). Maintained by store/rollups.py
+# whenever orders change, so reports never have to scan Order / OrderItem.
+# Cancelled orders are kept apart in the cancelled_* columns.
+
+class SalesRollupBase(models.Model):
+    day = models.DateField()
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=3, default=0)
+    cancelled_units = models.IntegerField(default=0)
+    cancelled_revenue = models.DecimalField(max_digits=14, decimal_places=3, default=0)
+
+    class Meta:
+        abstract = True
+
+
+class ProductSalesDaily(SalesRollupBase):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    # Copied from the product when the day is rolled up
+    brand = models.ForeignKey(Brand, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    class Meta:
+        unique_together = ('day', 'product')
+
+    def __str__(self):
+        return f"{self.day} {self.product_id}: {self.units} units"
+
+
+class BrandSalesDaily(SalesRollupBase):
+    brand = models.ForeignKey(Brand, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    class Meta:
+        indexes = [models.Index(fields=['day', 'brand'], name='brandsales_day_idx')]
+
+    def __str__(self):
+        return f"{self.day} brand {self.brand_id}: {self.revenue}"
+
+
+class CategorySalesDaily(SalesRollupBase):
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    class Meta:
+        indexes = [models.Index(fields=['day', 'category'], name='categorysales_day_idx')]
+
+    def __str__(self):
+        return f"{self.day} category {self.category_id}: {self.revenue}"
+
+
+class RollupWatermark(models.Model):
+    """
+    🔖 Highest Order id already rolled up by `manage.py update_sales_rollups`.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    last_order_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ order {self.last_order_id}"
+
+
+# 🗄 Order archive
+# ----------------
+# Delivered / cancelled orders older than ORDER_ARCHIVE_AFTER_DAYS are moved
+# here by store/archive.py, keeping their original ids. Items keep a copy of
+# the product name / SKU / price, so old orders read the same even after the
+# product changes or is deleted. Read both sides through archive.py.
+
+class ArchivedOrder(models.Model):
+    id = models.BigIntegerField(primary_key=True)  # same id as the original Order
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_orders')
+    order_date = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    is_archived = True
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'order_date'], name='archorder_user_date_idx'),
+            models.Index(fields=['order_date'], name='archorder_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived order#{self.id} by {self.user.username}"
+
+    @property
+    def total_items(self) -> int:
+        return sum(item.quantity for item in self.items.all())
+
+    @property
+    def total_amount(self):
+        return sum(item.line_total for item in self.items.all())
+
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)  # same id as the original OrderItem
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    product_name = models.CharField(max_length=100)
+    product_sku = models.CharField(max_length=20)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=3)
+    quantity = models.IntegerField()
+
+    @property
+    def line_total(self):
+        return self.quantity * self.unit_price
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_name} (Order #{self.order_id})"
+
+
+class ArchivedOrderEvent(models.Model):
+    id = models.BigIntegerField(primary_key=True)  # same id as the original OrderEvent
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='events')
+    from_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    to_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Order #{self.order_id}: {self.from_status} → {self.to_status}"
@@ -0,0 +1,250 @@
+# store/orders.py
+"""
+📦 Order query helpers shared by the staff order console, "my orders" and
+the admin.
+
+- ``with_totals(qs)`` adds item count and amount per order as correlated
+  subqueries, so only the rows actually fetched (one page) are computed.
+- ``keyset_page(qs, ...)`` pages newest-first on ``(order_date, id)``.
+  Unlike OFFSET, the cost of a page doesn't grow with how deep you are in
+  the history: every page is an index range scan of ``size + 1`` rows.
+- ``status_summary(qs)`` gives count and revenue per status in one grouped
+  query.
+- ``refresh_customer_summaries(user_ids)`` recomputes the order summary
+  stored on Profile (order count, lifetime spend, last order date), live
+  and archived orders together.
+"""
+import datetime
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.db.models import (
+    Count,
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    IntegerField,
+    Max,
+    Min,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+)
+
+from .db import on_commit_batched
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem, Profile
+
+
+AMOUNT_FIELD = DecimalField(max_digits=14, decimal_places=3)
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+# 🧮 Totals
+# ---------
+
+def with_totals(queryset):
+    """
+    Annotate ``items_total`` and ``amount_total`` on every order.
+    (The ``total_items`` / ``total_amount`` model properties do the same in
+    Python, but cost a query per order.)
+    Works for ArchivedOrder querysets too.
+    """
+    items = ArchivedOrderItem.objects if queryset.model.is_archived else OrderItem.objects
+    items = items.filter(order=OuterRef('pk')).order_by().values('order')
+    return queryset.annotate(
+        items_total=Subquery(
+            items.annotate(n=Sum('quantity')).values('n'),
+            output_field=IntegerField(),
+        ),
+        amount_total=Subquery(
+            items.annotate(
+                amount=Sum(ExpressionWrapper(F('quantity') * F('unit_price'), output_field=AMOUNT_FIELD))
+            ).values('amount'),
+            output_field=AMOUNT_FIELD,
+        ),
+    )
+
+
+def status_summary(queryset):
+    """
+    ``[{'status', 'label', 'orders', 'revenue'}, ...]`` for the filtered
+    orders, one grouped aggregate over Order ⨝ OrderItem.
+    """
+    labels = dict(Order.STATUS_CHOICES)
+    rows = (
+        queryset
+        .order_by()
+        .values('status')
+        .annotate(
+            orders=Count('id', distinct=True),
+            revenue=Sum(
+                ExpressionWrapper(F('items__quantity') * F('items__unit_price'), output_field=AMOUNT_FIELD)
+            ),
+        )
+        .order_by('status')
+    )
+    return [dict(row, label=labels.get(row['status'], row['status'])) for row in rows]
+
+
+# 📑 Keyset pagination
+# --------------------
+
+def encode_cursor(order):
+    """``"<microseconds since epoch>-<id>"`` of an order, safe in a URL."""
+    delta = order.order_date - EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return f"{micros}-{order.id}"
+
+
+def decode_cursor(value):
+    """Inverse of ``encode_cursor``; ``None`` for a missing or garbled cursor."""
+    try:
+        micros, pk = (int(part) for part in (value or '').split('-'))
+        return EPOCH + datetime.timedelta(microseconds=micros), pk
+    except (ValueError, OverflowError):   # OverflowError: a date past year 9999
+        return None
+
+
+def _fetch(queryset, after, before, size):
+    """
+    Up to ``size + 1`` rows next to the cursor, newest first.
+    With ``before`` these are the rows closest *above* the cursor.
+    """
+    if before:
+        date, pk = before
+        # The leading order_date__gte keeps the condition usable by the index
+        rows = list(
+            queryset
+            .filter(Q(order_date__gte=date) & (Q(order_date__gt=date) | Q(id__gt=pk)))
+            .order_by('order_date', 'id')[:size + 1]
+        )
+        return rows[::-1]
+    if after:
+        date, pk = after
+        queryset = queryset.filter(Q(order_date__lte=date) & (Q(order_date__lt=date) | Q(id__lt=pk)))
+    return list(queryset.order_by('-order_date', '-id')[:size + 1])
+
+
+def keyset_page(queryset, after=None, before=None, size=50):
+    """
+    One page of ``queryset`` newest first.
+
+    ``queryset`` may also be a list of querysets (e.g. live + archived
+    orders): each one reads at most ``size + 1`` rows and the results are
+    merged, so the page still costs one index range read per table.
+
+    ``after``: cursor of the last row of the previous page (go older).
+    ``before``: cursor of the first row of the next page (go newer).
+
+    Returns ``(orders, next_cursor, prev_cursor)``; a cursor is ``None``
+    when there is nothing further in that direction.
+    """
+    after, before = decode_cursor(after), decode_cursor(before)
+    querysets = queryset if isinstance(queryset, (list, tuple)) else [queryset]
+
+    rows = []
+    for qs in querysets:
+        rows.extend(_fetch(qs, after, before, size))
+    rows.sort(key=lambda order: (order.order_date, order.id), reverse=True)
+
+    if before:
+        has_newer = len(rows) > size
+        rows = rows[-size:] if size else []
+        has_older = True
+    else:
+        has_older = len(rows) > size
+        rows = rows[:size]
+        has_newer = after is not None
+
+    next_cursor = encode_cursor(rows[-1]) if rows and has_older else None
+    prev_cursor = encode_cursor(rows[0]) if rows and has_newer else None
+    return rows, next_cursor, prev_cursor
+
+
+def attach_first_items(orders):
+    """
+    Set ``order.first_item`` (with its product) on every order of a page,
+    using one query per table instead of ``order.items.first`` per order.
+    """
+    for item_model, archived in ((OrderItem, False), (ArchivedOrderItem, True)):
+        page = [order for order in orders if order.is_archived == archived]
+        if not page:
+            continue
+        first_ids = dict(
+            item_model.objects
+            .filter(order__in=[order.id for order in page])
+            .values('order_id')
+            .annotate(first_id=Min('id'))
+            .values_list('order_id', 'first_id')
+        )
+        items = item_model.objects.select_related('product').in_bulk(first_ids.values())
+        for order in page:
+            order.first_item = items.get(first_ids.get(order.id))
+    return orders
+
+
+# 👤 Per-customer summary (stored on Profile)
+# -------------------------------------------
+
+def refresh_customer_summaries(user_ids):
+    """
+    Recompute ``order_count``, ``lifetime_spend`` (cancelled orders
+    excluded) and ``last_order_date`` on the users' profiles.
+    Profiles are created when missing; deleted users are skipped.
+    """
+    user_ids = set(User.objects.filter(id__in=set(user_ids)).values_list('id', flat=True))
+    if not user_ids:
+        return
+
+    counts, last_dates, spend = Counter(), {}, Counter()
+    for order_model, item_model in (
+        (Order, OrderItem),
+        (ArchivedOrder, ArchivedOrderItem),   # archived orders still count
+    ):
+        rows = (
+            order_model.objects
+            .filter(user_id__in=user_ids)
+            .order_by()
+            .values('user_id')
+            .annotate(n=Count('id'), last=Max('order_date'))
+        )
+        for row in rows:
+            counts[row['user_id']] += row['n']
+            if row['user_id'] not in last_dates or row['last'] > last_dates[row['user_id']]:
+                last_dates[row['user_id']] = row['last']
+        spend.update(dict(
+            item_model.objects
+            .filter(order__user_id__in=user_ids)
+            .exclude(order__status='cancelled')
+            .order_by()
+            .values('order__user_id')
+            .annotate(total=Sum(ExpressionWrapper(F('quantity') * F('unit_price'), output_field=AMOUNT_FIELD)))
+            .values_list('order__user_id', 'total')
+        ))
+
+    # One upsert for all users instead of a get + save per profile
+    Profile.objects.bulk_create(
+        [
+            Profile(
+                user_id=user_id,
+                order_count=counts[user_id],
+                last_order_date=last_dates.get(user_id),
+                lifetime_spend=spend[user_id],
+            )
+            for user_id in user_ids
+        ],
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['order_count', 'last_order_date', 'lifetime_spend'],
+    )
+
+
+def schedule_customer_refresh(user_id):
+    """
+    Refresh one user's summary once the current transaction commits
+    (immediately when not inside one). Same idea as
+    ``rollups.schedule_refresh``: many changes, one refresh per user.
+    """
+    on_commit_batched(refresh_customer_summaries, user_id)
@@ -0,0 +1,307 @@
+# store/prerender.py
+"""
+🖨 Pre-rendered catalog pages
+
+``manage.py render_catalog`` renders the catalog pages as an anonymous
+visitor sees them to HTML files under ``settings.PRERENDER_ROOT``:
+
+- ``/products/<id>/``                        (product_detail)
+- ``/brand/<slug>/`` and ``/category/<slug>/`` (brand_products, category_products)
+- ``/products/``, ``/products/?brand=<slug>`` and ``/products/?category=<slug>``
+  (product_list as the menus link to it; the list has no further pages)
+
+Every page has a *version*: ``Product.updated_at`` for a product page, the
+product count + newest ``updated_at`` for a list. The versions of the last
+run are kept in a manifest, so the next run only renders the pages whose
+version moved, and removes the pages of deleted objects. Everything is
+re-rendered when the site-wide part changes: the brands / categories in the
+menus, the templates, or the year in the footer.
+
+``store.middleware.PrerenderedPageMiddleware`` answers GET requests
+without a session cookie straight from these files: no session, no user,
+no query. Two things differ per visitor and are filled in on the way out:
+the CSRF token of the add-to-cart forms and the site origin in the share
+links.
+
+What a file can't show:
+
+- the "recently viewed" strip, which lives in the visitor's session
+- changes since the last run. Saving or deleting a product drops its own
+  page (see signals.py); the lists it appears on, bulk imports and brand /
+  category edits wait for the next run. Run the command after imports or
+  from cron; a run with nothing to do only reads the versions.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import connections
+from django.db.models import Count, Max
+from django.http import Http404
+from django.template.loader import get_template
+from django.test import RequestFactory
+from django.urls import Resolver404, resolve, reverse
+
+from .models import Brand, Category, Product
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = '.manifest.json'
+
+# Catalog views that get pre-rendered, by URL name
+TEMPLATES = {
+    'product_detail': 'store/product_detail.html',
+    'brand_products': 'store/brand_products.html',
+    'category_products': 'store/category_products.html',
+    'product_list': 'store/product_list.html',
+}
+LIST_FILTERS = ('brand', 'category')
+_SLUG = re.compile(r'^[-a-zA-Z0-9_]+$')
+
+# Per-visitor values, written into the files as placeholders
+CSRF_PLACEHOLDER = b'prerendered-csrf-token'
+RENDER_HOST = 'prerender.invalid'
+ORIGIN_PLACEHOLDER = f'http://{RENDER_HOST}'.encode()
+_CSRF_INPUT = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+
+# 🗂 Where a page lives
+# --------------------
+
+def page_file(path, query=''):
+    """``('/products/7/', '')`` ➝ ``<PRERENDER_ROOT>/products/7/index.html``"""
+    name = f'index.{query}.html' if query else 'index.html'
+    return os.path.join(str(settings.PRERENDER_ROOT), path.strip('/'), name)
+
+
+def lookup(request):
+    """
+    ``(file path, url name)`` of the page for this request, or None when it
+    isn't one that gets pre-rendered. The file itself may not exist (yet).
+    """
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return None
+    if match.url_name not in TEMPLATES:
+        return None
+
+    query = ''
+    if request.GET:
+        # Only the single-filter lists; anything else is rendered live
+        if match.url_name != 'product_list' or len(request.GET) != 1:
+            return None
+        key, values = next(iter(request.GET.lists()))
+        if key not in LIST_FILTERS or len(values) != 1 or not _SLUG.match(values[0]):
+            return None
+        query = f'{key}={values[0]}'
+    return page_file(request.path_info, query), match.url_name
+
+
+def fill_in(body, csrf_token, origin):
+    """Replace the placeholders of a pre-rendered page for one visitor."""
+    if CSRF_PLACEHOLDER in body:
+        body = body.replace(CSRF_PLACEHOLDER, csrf_token.encode())
+    if ORIGIN_PLACEHOLDER in body:
+        body = body.replace(ORIGIN_PLACEHOLDER, origin.encode())
+    return body
+
+
+def forget(paths):
+    """Delete the files of these ``(path, query)`` pages, so they are served live again."""
+    for path, query in paths:
+        try:
+            os.remove(page_file(path, query))
+        except FileNotFoundError:
+            pass
+
+
+def product_page(pk):
+    """The ``(path, query)`` of a product's own page."""
+    return reverse('product_detail', args=[pk]), ''
+
+
+# 🔢 Versions
+# -----------
+
+def site_version():
+    """Changes whenever every page has to be re-rendered."""
+    parts = [
+        list(Brand.objects.order_by('id').values_list('id', 'name', 'slug', 'image')),
+        list(Category.objects.order_by('id').values_list('id', 'name', 'slug', 'image')),
+        date.today().year,
+    ]
+    for name in ('store/base.html', *TEMPLATES.values()):
+        origin = get_template(name).origin.name
+        parts.append((name, os.stat(origin).st_mtime_ns))
+    return hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()[:16]
+
+
+def _list_version(count, latest):
+    return f"{count}:{latest.isoformat() if latest else ''}"
+
+
+def page_versions():
+    """``{(path, query): version}`` of every page to pre-render."""
+    # reverse() once per URL name, not once per product
+    detail = reverse('product_detail', args=[987654321]).replace('987654321', '{}')
+    versions = {
+        (detail.format(pk), ''): updated_at.isoformat()
+        for pk, updated_at in Product.objects.values_list('id', 'updated_at').iterator(chunk_size=10_000)
+    }
+
+    product_list = reverse('product_list')
+    totals = Product.objects.aggregate(count=Count('id'), latest=Max('updated_at'))
+    versions[(product_list, '')] = _list_version(totals['count'], totals['latest'])
+
+    for field, model, view in (('brand', Brand, 'brand_products'), ('category', Category, 'category_products')):
+        groups = {
+            pk: _list_version(count, latest)
+            for pk, count, latest in (
+                Product.objects.order_by().values_list(f'{field}_id')
+                .annotate(count=Count('id'), latest=Max('updated_at'))
+            )
+        }
+        page = reverse(view, args=['slug']).replace('slug', '{}')
+        for pk, slug in model.objects.values_list('id', 'slug'):
+            version = groups.get(pk, _list_version(0, None))
+            versions[(page.format(slug), '')] = version
+            versions[(product_list, f'{field}={slug}')] = version
+    return versions
+
+
+def load_manifest():
+    try:
+        with open(os.path.join(str(settings.PRERENDER_ROOT), MANIFEST)) as handle:
+            data = json.load(handle)
+    except (FileNotFoundError, ValueError):
+        return None, {}
+    return data.get('site'), {tuple(key.split('?', 1)): version for key, version in data.get('pages', {}).items()}
+
+
+def save_manifest(site, versions):
+    pages = {f'{path}?{query}': version for (path, query), version in sorted(versions.items())}
+    _write(os.path.join(str(settings.PRERENDER_ROOT), MANIFEST), json.dumps({'site': site, 'pages': pages}).encode())
+
+
+# 🖨 Rendering (runs in the worker processes)
+# ------------------------------------------
+
+def _write(target, content):
+    """Write via a temporary file + rename, so a request never reads half a page."""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(content)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, target)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def render_page(path, query=''):
+    """The HTML of one page as an anonymous visitor sees it, with placeholders; None on 404."""
+    from . import views   # the sync views, whatever ASYNC_CATALOG_VIEWS says
+
+    request = RequestFactory().get(path, dict([query.split('=', 1)]) if query else None)
+    request.get_host = lambda: RENDER_HOST
+    request.user = AnonymousUser()
+    request.session = import_module(settings.SESSION_ENGINE).SessionStore()
+    request.resolver_match = match = resolve(path)
+
+    try:
+        response = getattr(views, match.url_name)(request, *match.args, **match.kwargs)
+    except Http404:
+        return None
+    if response.status_code != 200:
+        return None
+    return _CSRF_INPUT.sub(rb'\g<1>' + CSRF_PLACEHOLDER + rb'\g<2>', response.content)
+
+
+def render_pages(pages):
+    """Render and write a batch of ``(path, query)`` pages. Returns ``(written, missing, failed)`` lists."""
+    written, missing, failed = [], [], []
+    for path, query in pages:
+        try:
+            content = render_page(path, query)
+        except Exception:
+            logger.exception("pre-rendering %s?%s failed", path, query)
+            failed.append((path, query))
+            continue
+        if content is None:
+            forget([(path, query)])
+            missing.append((path, query))
+        else:
+            _write(page_file(path, query), content)
+            written.append((path, query))
+    connections.close_all()
+    return written, missing, failed
+
+
+def _worker_init():
+    import django
+    django.setup()
+
+
+# 🏭 The whole run
+# ----------------
+
+def render_catalog(jobs=None, force=False, batch_size=200, progress=None):
+    """
+    Bring ``PRERENDER_ROOT`` up to date. Returns::
+
+        {'pages': 12000, 'rendered': 40, 'unchanged': 11960, 'removed': 2,
+         'failed': 0, 'full': False, 'seconds': 1.9}
+    """
+    started = time.perf_counter()
+    site = site_version()
+    versions = page_versions()
+    old_site, old_versions = load_manifest()
+    full = force or site != old_site
+
+    todo = [page for page, version in versions.items() if full or old_versions.get(page) != version]
+    gone = [page for page in old_versions if page not in versions]
+    forget(gone)
+    if progress:
+        progress(f"{len(versions)} page(s), {len(todo)} to render{' (everything)' if full else ''}, "
+                 f"{len(gone)} removed")
+
+    done = {page: version for page, version in old_versions.items() if page in versions and not full}
+    rendered = failed = 0
+    if todo:
+        batches = [todo[i:i + batch_size] for i in range(0, len(todo), batch_size)]
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=jobs or os.cpu_count(), initializer=_worker_init) as pool:
+            for written, missing, errors in pool.map(render_pages, batches):
+                for page in written:
+                    done[page] = versions[page]
+                for page in missing + errors:
+                    done.pop(page, None)
+                rendered += len(written)
+                failed += len(errors)
+                if progress:
+                    progress(f"{rendered} rendered")
+
+    save_manifest(site, done)
+    return {
+        'pages': len(versions),
+        'rendered': rendered,
+        'unchanged': len(versions) - len(todo),
+        'removed': len(gone),
+        'failed': failed,
+        'full': full,
+        'seconds': round(time.perf_counter() - started, 2),
+    }
@@ -0,0 +1,116 @@
+# store/profiling.py
+"""
+🔬 Sampled cProfile dumps from live requests
+
+``store.middleware.ProfilingMiddleware`` runs ``cProfile`` around:
+
+- one request in every ``settings.PROFILE_EVERY_N`` (0 = no sampling)
+- any request from a staff user carrying ``X-Profile: 1`` or ``?_profile=1``
+  (when ``settings.PROFILE_ON_REQUEST`` is on)
+
+Each profile is saved as ``<view>--<UTC timestamp>--<pid>.pstats`` in
+``settings.PROFILE_DIR`` (newest ``PROFILE_KEEP`` files kept), readable with
+``python -m pstats`` or snakeviz, and summarised per view on the staff page
+``/staff/profiles/``.
+
+With both switches off the middleware removes itself at startup, so there is
+no per-request cost at all.
+"""
+import cProfile
+import os
+import pstats
+import re
+import threading
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+
+
+SUFFIX = '.pstats'
+
+# cProfile can only run one profiler at a time per process
+_profiler_lock = threading.Lock()
+
+
+def profile_dir():
+    return Path(settings.PROFILE_DIR)
+
+
+def _safe(view):
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', view) or 'unmatched'
+
+
+def profile_call(func, *args):
+    """
+    Run ``func(*args)`` under cProfile. Returns ``(result, profiler)``;
+    ``profiler`` is None when another request is already being profiled.
+    """
+    if not _profiler_lock.acquire(blocking=False):
+        return func(*args), None
+    try:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            result = func(*args)
+        finally:
+            profiler.disable()
+    finally:
+        _profiler_lock.release()
+    return result, profiler
+
+
+def save(profiler, view):
+    """Write the dump for ``view`` and drop the oldest beyond PROFILE_KEEP."""
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(dt_timezone.utc).strftime('%Y%m%dT%H%M%S.%f')
+    path = directory / f'{_safe(view)}--{stamp}--{os.getpid()}{SUFFIX}'
+    profiler.dump_stats(path)
+
+    dumps = sorted(directory.glob(f'*{SUFFIX}'), key=lambda p: p.stat().st_mtime)
+    # Not dumps[:-KEEP]: with PROFILE_KEEP = 0 that slice is empty
+    for old in dumps[:max(len(dumps) - settings.PROFILE_KEEP, 0)]:
+        old.unlink(missing_ok=True)
+    return path
+
+
+# 📖 Reading dumps back
+# --------------------
+
+def dumps_by_view():
+    """``{view: [paths, newest first]}``"""
+    views = {}
+    for path in sorted(profile_dir().glob(f'*{SUFFIX}'), reverse=True):
+        view = path.name.split('--', 1)[0]
+        views.setdefault(view, []).append(path)
+    return dict(sorted(views.items()))
+
+
+def top_functions(paths, limit=30):
+    """
+    Functions with the highest cumulative time over all ``paths`` combined:
+    ``[{'function', 'ncalls', 'tottime', 'cumtime', 'percall'}]``.
+    """
+    if not paths:
+        return []
+    stats = pstats.Stats(*map(str, paths))
+    rows = []
+    for (filename, line, name), (_cc, ncalls, tottime, cumtime, _callers) in stats.stats.items():
+        rows.append({
+            'function': f'{name} ({os.path.relpath(filename) if os.path.isabs(filename) else filename}:{line})',
+            'ncalls': ncalls,
+            'tottime': tottime,
+            'cumtime': cumtime,
+            'percall': cumtime / ncalls if ncalls else 0.0,
+        })
+    rows.sort(key=lambda row: row['cumtime'], reverse=True)
+    return rows[:limit]
+
+
+def dump_path(name):
+    """Path of a dump by file name, or None (never leaves PROFILE_DIR)."""
+    if '/' in name or '\\' in name or not name.endswith(SUFFIX):
+        return None
+    path = profile_dir() / name
+    return path if path.is_file() else None
@@ -0,0 +1,242 @@
+# store/resources.py
+"""
+📥 django-import-export resources for the catalog
+
+Used by the admin import / export buttons (store/admin.py). Built for big
+spreadsheets:
+
+- ``use_bulk``: rows are written in batches of ``BATCH_SIZE`` (``bulk_create``
+  for new rows, an upsert for existing ones) instead of one ``save()`` per row
+- ``PrefetchInstanceLoader``: existing rows are looked up by their natural key
+  (product SKU, brand / category slug) for the whole file up front, a few
+  ``IN (...)`` queries instead of one query per row
+- brand / category columns hold slugs, resolved from an in-memory map loaded
+  once per import (``SlugForeignKeyWidget``)
+- a SKU / UPC / slug used twice in the file, or already taken by another
+  row in the database, is reported on that row instead of failing the
+  whole batch at the database (``BulkResource.unique_fields``)
+
+Product files use the columns of the old bulk upload CSV, with ``brand`` /
+``category`` slugs instead of ids::
+
+    sku,upc,name,description,price,stock,brand,category
+"""
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from import_export import fields, resources
+from import_export.instance_loaders import ModelInstanceLoader
+from import_export.widgets import ForeignKeyWidget
+
+from .models import Brand, Category, Product
+
+
+BATCH_SIZE = 1000
+
+# Keeps every "key IN (...)" below SQLite's bound-parameter limit
+PREFETCH_CHUNK = 5000
+
+
+class PrefetchInstanceLoader(ModelInstanceLoader):
+    """
+    Loads every existing row the dataset refers to, keyed by the single
+    ``import_id_fields`` column, before the first row is imported.
+    (import-export's CachedInstanceLoader does the same with one unbounded
+    ``IN``, which SQLite refuses past ~32k keys.)
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        key = self.resource.get_import_id_fields()[0]
+        self.key_field = self.resource.fields[key]
+        self.instances = {}
+
+        if not self.dataset or self.key_field.column_name not in (self.dataset.headers or []):
+            return   # no key column: every row is new
+
+        column = self.dataset.headers.index(self.key_field.column_name)
+        keys = list({value for value in self.dataset.get_col(column) if value not in (None, '')})
+        attribute = self.key_field.attribute
+        for start in range(0, len(keys), PREFETCH_CHUNK):
+            chunk = keys[start:start + PREFETCH_CHUNK]
+            for obj in self.get_queryset().filter(**{f'{attribute}__in': chunk}):
+                self.instances[getattr(obj, attribute)] = obj
+
+    def get_instance(self, row):
+        return self.instances.get(self.key_field.clean(row))
+
+
+class SlugForeignKeyWidget(ForeignKeyWidget):
+    """
+    Brand / category by slug. Both tables are small, so the whole
+    ``{slug: object}`` map is read once per import instead of one
+    ``get()`` per row. Call ``reset()`` before each import.
+    """
+
+    def __init__(self, model, **kwargs):
+        super().__init__(model, field='slug', **kwargs)
+        self._by_slug = None
+
+    def reset(self):
+        self._by_slug = None
+
+    def clean(self, value, row=None, **kwargs):
+        if not value:
+            return None
+        if self._by_slug is None:
+            self._by_slug = {obj.slug: obj for obj in self.model.objects.all()}
+        try:
+            return self._by_slug[value.strip()]
+        except KeyError:
+            raise ValueError(f"Unknown {self.model._meta.verbose_name} slug: {value!r}")
+
+
+class BulkResource(resources.ModelResource):
+    """
+    Shared import behaviour for the catalog resources:
+
+    - unchanged rows are skipped by comparing a tuple of the imported
+      attributes, instead of import-export's deepcopy + diff of every
+      instance (``skip_diff`` is on, so the admin preview shows no diff)
+    - existing rows are written with ``INSERT ... ON CONFLICT (id) DO
+      UPDATE`` batches; Django's ``bulk_update()`` builds one CASE WHEN per
+      field and row, which gets very slow for thousands of rows
+    - ``unique_fields`` are checked row by row: a value already used by an
+      earlier row of the file, or by another row in the database, makes
+      the row invalid (a batch insert would otherwise fail as a whole)
+    """
+
+    # Attributes with a unique constraint in the database
+    unique_fields = ()
+
+    def before_import(self, dataset, **kwargs):
+        for field in self.fields.values():
+            if isinstance(field.widget, SlugForeignKeyWidget):
+                field.widget.reset()
+        self._load_owners(dataset)
+        super().before_import(dataset, **kwargs)
+
+    def _load_owners(self, dataset):
+        """``{attribute: {value: pk}}`` of the rows already holding the file's values."""
+        self._claimed = {attribute: {} for attribute in self.unique_fields}
+        self._owners = {attribute: {} for attribute in self.unique_fields}
+        model, headers = self._meta.model, dataset.headers or []
+        for attribute in self.unique_fields:
+            column = self.fields[attribute].column_name
+            if column not in headers:
+                continue
+            values = list({str(value).strip() for value in dataset.get_col(headers.index(column)) if value not in (None, '')})
+            for start in range(0, len(values), PREFETCH_CHUNK):
+                rows = model.objects.filter(**{f'{attribute}__in': values[start:start + PREFETCH_CHUNK]})
+                self._owners[attribute].update(rows.values_list(attribute, 'pk'))
+
+    def before_import_row(self, row, row_number=None, **kwargs):
+        self._row_number = row_number
+        super().before_import_row(row, row_number=row_number, **kwargs)
+
+    def validate_instance(self, instance, import_validation_errors=None, validate_unique=True):
+        errors = dict(import_validation_errors or {})
+        for attribute, claimed in self._claimed.items():
+            value = getattr(instance, attribute)
+            if attribute in errors or value in (None, ''):
+                continue
+            owner = self._owners[attribute].get(value)
+            if value in claimed:
+                errors[attribute] = ValidationError(f"{value!r} is already used in row {claimed[value]} of this file.")
+            elif owner is not None and owner != instance.pk:
+                errors[attribute] = ValidationError(
+                    f"{value!r} already belongs to another {self._meta.model._meta.verbose_name}."
+                )
+            else:
+                claimed[value] = self._row_number
+        super().validate_instance(instance, errors, validate_unique)
+
+    def _snapshot(self, instance):
+        return tuple(getattr(instance, field.attribute) for field in self.get_import_fields())
+
+    def after_init_instance(self, instance, new, row, **kwargs):
+        if not new:
+            instance._import_snapshot = self._snapshot(instance)
+
+    def skip_row(self, instance, original, row, import_validation_errors=None):
+        if import_validation_errors:
+            return False
+        snapshot = getattr(instance, '_import_snapshot', None)
+        return snapshot is not None and snapshot == self._snapshot(instance)
+
+    def bulk_update(self, using_transactions, dry_run, raise_errors, batch_size=None, result=None):
+        if self.update_instances and (using_transactions or not dry_run):
+            try:
+                self._meta.model.objects.bulk_create(
+                    self.update_instances,
+                    batch_size=batch_size,
+                    update_conflicts=True,
+                    unique_fields=['pk'],
+                    update_fields=self.get_bulk_update_fields(),
+                )
+            except Exception as e:
+                self.handle_import_error(result, e, raise_errors)
+            finally:
+                self.update_instances.clear()
+
+
+# 🏷️ Brand / Category
+# -------------------
+
+class BrandResource(BulkResource):
+    unique_fields = ('name', 'slug')
+
+    class Meta:
+        model = Brand
+        fields = ('name', 'slug')
+        import_id_fields = ('slug',)
+        instance_loader_class = PrefetchInstanceLoader
+        use_bulk = True
+        batch_size = BATCH_SIZE
+        skip_diff = True
+        report_skipped = False
+
+
+class CategoryResource(BulkResource):
+    unique_fields = ('slug',)
+
+    class Meta:
+        model = Category
+        fields = ('name', 'slug')
+        import_id_fields = ('slug',)
+        instance_loader_class = PrefetchInstanceLoader
+        use_bulk = True
+        batch_size = BATCH_SIZE
+        skip_diff = True
+        report_skipped = False
+
+
+# 🧾 Product
+# ----------
+
+class ProductResource(BulkResource):
+    brand = fields.Field(attribute='brand', column_name='brand', widget=SlugForeignKeyWidget(Brand))
+    category = fields.Field(attribute='category', column_name='category', widget=SlugForeignKeyWidget(Category))
+
+    unique_fields = ('sku', 'upc')
+
+    class Meta:
+        model = Product
+        fields = ('sku', 'upc', 'name', 'description', 'price', 'stock', 'brand', 'category')
+        import_id_fields = ('sku',)
+        instance_loader_class = PrefetchInstanceLoader
+        use_bulk = True
+        batch_size = BATCH_SIZE
+        skip_diff = True
+        report_skipped = False
+
+    def get_queryset(self):
+        # Export renders brand / category slugs: join them in
+        return super().get_queryset().select_related('brand', 'category')
+
+    def before_save_instance(self, instance, row, **kwargs):
+        # Set explicitly for the bulk upsert; the catalog indexes (catalog.py,
+        # search.py) rely on updated_at to notice changed products
+        instance.updated_at = timezone.now()
+
+    def get_bulk_update_fields(self):
+        return super().get_bulk_update_fields() + ['updated_at']
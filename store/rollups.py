@@ -0,0 +1,332 @@
+# store/rollups.py
+"""
+📈 Daily sales rollups
+
+Staff reports read only the ``*SalesDaily`` tables. They are kept current
+incrementally, one order at a time:
+
+- the order signals (store/signals.py) and bulk order operations apply the
+  *difference* an order makes: its lines are added when they are created,
+  moved between the regular and the ``cancelled_*`` columns when the order
+  is cancelled / un-cancelled, subtracted when they are deleted. That costs
+  a few statements per order, however busy its day, inside the same
+  transaction as the change.
+- rows written without the ORM (imports, ``generate_fake_data``) have
+  ``Order.rolled_up = False``: ``manage.py update_sales_rollups`` adds them,
+  looking only at orders newer than its watermark (the highest Order id
+  processed).
+- ``--rebuild`` recomputes everything from the source rows.
+
+Every line counts at its ``unit_price`` (the price when it was ordered), live
+or archived (store/archive.py), so a price change never rewrites past days.
+A product's brand / category are those of its first rollup row that day.
+"""
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Max, Q, Sum
+from django.utils import timezone
+
+from .models import (
+    ArchivedOrder,
+    ArchivedOrderItem,
+    BrandSalesDaily,
+    CategorySalesDaily,
+    Order,
+    OrderItem,
+    ProductSalesDaily,
+    RollupWatermark,
+)
+
+
+WATERMARK_NAME = 'sales_rollups'
+
+REVENUE_FIELD = DecimalField(max_digits=14, decimal_places=3)
+
+
+def day_bounds(day):
+    """
+    Aware [start, end) datetimes of a calendar day in the current time zone,
+    so the order_date index can be used (no DATE() on the column).
+    """
+    start = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+    return start, start + datetime.timedelta(days=1)
+
+
+def order_day(order_date):
+    return timezone.localdate(order_date)
+
+
+# 🧮 Rebuilding a day from scratch
+# -------------------------------
+
+def _new_bucket():
+    return {'units': 0, 'revenue': Decimal('0'), 'cancelled_units': 0, 'cancelled_revenue': Decimal('0')}
+
+
+def _add(bucket, cancelled, units, revenue):
+    prefix = 'cancelled_' if cancelled else ''
+    bucket[prefix + 'units'] += units
+    bucket[prefix + 'revenue'] += revenue
+
+
+def _day_lines(item_model, start, end):
+    """
+    Per-product totals of one day from OrderItem or ArchivedOrderItem.
+    Archived lines of a deleted product come as one ``product_id=None`` row.
+    """
+    revenue = ExpressionWrapper(F('quantity') * F('unit_price'), output_field=REVENUE_FIELD)
+    return (
+        item_model.objects
+        .filter(order__order_date__gte=start, order__order_date__lt=end)
+        .values('product_id', 'product__brand_id', 'product__category_id')
+        .annotate(
+            units=Sum('quantity', filter=~Q(order__status='cancelled')),
+            revenue=Sum(revenue, filter=~Q(order__status='cancelled')),
+            c_units=Sum('quantity', filter=Q(order__status='cancelled')),
+            c_revenue=Sum(revenue, filter=Q(order__status='cancelled')),
+        )
+    )
+
+
+@transaction.atomic
+def rebuild_day(day):
+    """
+    Recompute every rollup row for one day from Order / OrderItem, plus the
+    archived orders of that day.
+    """
+    start, end = day_bounds(day)
+
+    products = {}
+    brands, categories = defaultdict(_new_bucket), defaultdict(_new_bucket)
+    for item_model in (OrderItem, ArchivedOrderItem):
+        for row in _day_lines(item_model, start, end):
+            totals = {
+                'units': row['units'] or 0,
+                'revenue': row['revenue'] or Decimal('0'),
+                'cancelled_units': row['c_units'] or 0,
+                'cancelled_revenue': row['c_revenue'] or Decimal('0'),
+            }
+            # A deleted product still counts for the day (under no brand /
+            # category), it just gets no per-product row
+            product = products.get(row['product_id'])
+            if product is not None:
+                for field, value in totals.items():
+                    setattr(product, field, getattr(product, field) + value)
+            elif row['product_id'] is not None:
+                products[row['product_id']] = ProductSalesDaily(
+                    day=day,
+                    product_id=row['product_id'],
+                    brand_id=row['product__brand_id'],
+                    category_id=row['product__category_id'],
+                    **totals,
+                )
+            for bucket in (brands[row['product__brand_id']], categories[row['product__category_id']]):
+                _add(bucket, False, totals['units'], totals['revenue'])
+                _add(bucket, True, totals['cancelled_units'], totals['cancelled_revenue'])
+
+    ProductSalesDaily.objects.filter(day=day).delete()
+    BrandSalesDaily.objects.filter(day=day).delete()
+    CategorySalesDaily.objects.filter(day=day).delete()
+
+    ProductSalesDaily.objects.bulk_create(products.values(), batch_size=1000)
+    BrandSalesDaily.objects.bulk_create(
+        [BrandSalesDaily(day=day, brand_id=pk, **t) for pk, t in brands.items()]
+    )
+    CategorySalesDaily.objects.bulk_create(
+        [CategorySalesDaily(day=day, category_id=pk, **t) for pk, t in categories.items()]
+    )
+    return len(products)
+
+
+def rebuild_days(days):
+    for day in sorted(set(days)):
+        rebuild_day(day)
+
+
+def refresh_orders(order_ids):
+    """
+    Rebuild the days of the given orders from scratch (after changes that
+    bypassed the signals and ``apply()``, e.g. a raw SQL fix).
+    """
+    dates = Order.objects.filter(id__in=order_ids).values_list('order_date', flat=True)
+    rebuild_days({order_day(d) for d in dates})
+
+
+# ➕ Applying one change
+# ---------------------
+
+COLUMNS = ('units', 'revenue', 'cancelled_units', 'cancelled_revenue')
+
+# Keeps every "IN (...)" well below SQLite's bound-parameter limit
+CHUNK_SIZE = 500
+
+
+def _chunks(values, size=CHUNK_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def lines(**filters):
+    """
+    The OrderItem rows matching ``filters`` as rollup lines::
+
+        [(day, product_id, brand_id, category_id, cancelled, units, revenue), ...]
+    """
+    rows = OrderItem.objects.filter(**filters).values_list(
+        'order__order_date', 'order__status', 'product_id', 'product__brand_id', 'product__category_id',
+        'quantity', 'unit_price',
+    )
+    return [
+        (order_day(date), product, brand, category, status == 'cancelled', quantity, quantity * price)
+        for date, status, product, brand, category, quantity, price in rows
+    ]
+
+
+def moved(sales, cancelled=None, day=None):
+    """The same ``lines()`` with another status (cancelled or not) and / or day."""
+    return [
+        (line[0] if day is None else day, *line[1:4], line[4] if cancelled is None else cancelled, *line[5:])
+        for line in sales
+    ]
+
+
+def negated(sales):
+    """The same ``lines()``, taken away instead of added."""
+    return [(*line[:5], -line[5], -line[6]) for line in sales]
+
+
+def _shift(bucket, delta):
+    for column in COLUMNS:
+        bucket[column] += delta[column]
+
+
+def _shift_row(row, delta):
+    for column in COLUMNS:
+        setattr(row, column, getattr(row, column) + delta[column])
+
+
+def _negative(delta):
+    return any(value < 0 for value in delta.values())
+
+
+def _update_rows(model, field, deltas):
+    """
+    Add ``{(day, key): delta}`` to the brand / category rows, creating
+    the missing ones (unless that would store a negative total).
+    """
+    if not deltas:
+        return
+    rows = {}
+    for days in _chunks({day for day, _key in deltas}):
+        for row in model.objects.select_for_update().filter(day__in=days):
+            rows.setdefault((row.day, getattr(row, field)), row)
+    changed, new = [], []
+    for (day, key), delta in deltas.items():
+        row = rows.get((day, key))
+        if row is not None:
+            _shift_row(row, delta)
+            changed.append(row)
+        elif not _negative(delta):
+            new.append(model(day=day, **{field: key}, **delta))
+    model.objects.bulk_update(changed, COLUMNS, batch_size=CHUNK_SIZE)
+    model.objects.bulk_create(new, batch_size=CHUNK_SIZE)
+
+
+@transaction.atomic
+def apply(sales, sign=1):
+    """
+    Add (``sign=1``) or subtract (``sign=-1``) ``sales`` (see ``lines()``)
+    to / from the product, brand and category rows of their days. A few
+    statements, however many orders those days already have.
+
+    A line whose product row is gone (the product was just deleted) only
+    changes the brand / category totals.
+    """
+    products, defaults = defaultdict(_new_bucket), {}
+    for day, product, brand, category, cancelled, units, revenue in sales:
+        _add(products[day, product], cancelled, sign * units, sign * revenue)
+        defaults.setdefault((day, product), (brand, category))
+    if not products:
+        return
+
+    existing = {}
+    days = {day for day, _product in products}
+    for chunk in _chunks({product for _day, product in products}):
+        for row in ProductSalesDaily.objects.select_for_update().filter(day__in=days, product_id__in=chunk):
+            existing[row.day, row.product_id] = row
+
+    changed, new = [], []
+    brands, categories = defaultdict(_new_bucket), defaultdict(_new_bucket)
+    for (day, product), delta in products.items():
+        row = existing.get((day, product))
+        if row is not None:
+            # Same brand / category as the sales already counted for it that day
+            brand, category = row.brand_id, row.category_id
+            _shift_row(row, delta)
+            changed.append(row)
+        else:
+            brand, category = defaults[day, product]
+            if not _negative(delta):
+                new.append(ProductSalesDaily(day=day, product_id=product, brand_id=brand, category_id=category, **delta))
+        _shift(brands[day, brand], delta)
+        _shift(categories[day, category], delta)
+
+    ProductSalesDaily.objects.bulk_update(changed, COLUMNS, batch_size=CHUNK_SIZE)
+    ProductSalesDaily.objects.bulk_create(new, batch_size=CHUNK_SIZE)
+    _update_rows(BrandSalesDaily, 'brand_id', brands)
+    _update_rows(CategorySalesDaily, 'category_id', categories)
+
+
+# 🔖 Catch-up with a watermark
+# ----------------------------
+
+def catch_up(batch_size=5000):
+    """
+    Roll up the orders created after the stored watermark that aren't yet
+    (``rolled_up=False``: written without the ORM). Each batch commits
+    with its watermark, so an interrupted run resumes where it stopped.
+    Returns ``(orders_rolled_up, days_touched)``.
+    """
+    mark, _ = RollupWatermark.objects.get_or_create(name=WATERMARK_NAME)
+    rolled_up, days = 0, set()
+
+    last_id = mark.last_order_id
+    while True:
+        batch = list(Order.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'rolled_up')[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1][0]
+        with transaction.atomic():
+            for chunk in _chunks(pk for pk, done in batch if not done):
+                # Locked and re-checked: a concurrent run can't count them twice
+                todo = list(Order.objects.select_for_update().filter(id__in=chunk, rolled_up=False).values_list('id', flat=True))
+                new_lines = lines(order_id__in=todo)
+                apply(new_lines)
+                Order.objects.filter(id__in=todo).update(rolled_up=True)
+                rolled_up += len(todo)
+                days.update(line[0] for line in new_lines)
+            RollupWatermark.objects.filter(pk=mark.pk).update(last_order_id=last_id)
+    return rolled_up, len(days)
+
+
+def rebuild_all():
+    """Recompute every day that has orders and reset the watermark."""
+    days = set()
+    for model in (Order, ArchivedOrder):
+        dates = model.objects.values_list('order_date', flat=True).iterator(chunk_size=5000)
+        days.update(order_day(d) for d in dates)
+
+    with transaction.atomic():
+        ProductSalesDaily.objects.all().delete()
+        BrandSalesDaily.objects.all().delete()
+        CategorySalesDaily.objects.all().delete()
+        rebuild_days(days)
+
+        last_id = Order.objects.aggregate(m=Max('id'))['m'] or 0
+        Order.objects.filter(rolled_up=False).update(rolled_up=True)
+        RollupWatermark.objects.update_or_create(name=WATERMARK_NAME, defaults={'last_order_id': last_id})
+    return len(days)
@@ -0,0 +1,120 @@
+# store/routers.py
+"""
+🔀 Database routing
+
+Catalog pages (home, product list / detail, brand & category pages) are pure
+reads of Product, Brand and Category. When a read alias is configured
+(``settings.CATALOG_READ_DB``) those reads go there, taking load off the
+primary. Only views marked with ``@catalog_view`` read from the replica;
+everything else (staff edit forms, cart, admin, commands) stays on
+``default``, so nothing is ever saved back from a stale snapshot.
+
+Read-your-writes:
+- every write goes to ``default`` and pins the rest of the request to it
+- reads inside ``transaction.atomic()`` stay on ``default``
+- ``DatabaseRoutingMiddleware`` resets the pin per request and keeps it for
+  a few seconds afterwards via a cookie (see ``REPLICA_PIN_SECONDS``)
+"""
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+CATALOG_MODELS = {'product', 'brand', 'category'}
+
+# Writes to these apps don't pin: sessions are saved after the view has
+# finished all of its reads anyway.
+UNPINNED_APPS = {'sessions'}
+
+# True once the current request (or task) has written to the primary
+_pinned_to_primary = ContextVar('pinned_to_primary', default=False)
+
+
+# True while a @catalog_view runs
+_in_catalog_view = ContextVar('in_catalog_view', default=False)
+
+
+def catalog_view(view):
+    """
+    🏷 Mark a read-only catalog page: its Product / Brand / Category reads may
+    go to the read alias. Works on sync and async views.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            token = _in_catalog_view.set(True)
+            try:
+                return await view(*args, **kwargs)
+            finally:
+                _in_catalog_view.reset(token)
+    else:
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            token = _in_catalog_view.set(True)
+            try:
+                return view(*args, **kwargs)
+            finally:
+                _in_catalog_view.reset(token)
+    return wrapper
+
+
+def pin_to_primary():
+    _pinned_to_primary.set(True)
+
+
+def is_pinned_to_primary():
+    return _pinned_to_primary.get()
+
+
+def reset_primary_pin(pinned=False):
+    _pinned_to_primary.set(pinned)
+
+
+def catalog_read_alias():
+    """
+    The configured read alias, or ``None`` when there is no usable replica.
+    """
+    alias = getattr(settings, 'CATALOG_READ_DB', None)
+    if not alias or alias == DEFAULT_DB_ALIAS or alias not in connections.databases:
+        return None
+    return alias
+
+
+class CatalogReadRouter:
+    """
+    Sends catalog reads made by a ``@catalog_view`` to the read alias,
+    everything else to the default DB.
+    """
+
+    def _is_catalog(self, model):
+        return model._meta.app_label == 'store' and model._meta.model_name in CATALOG_MODELS
+
+    def db_for_read(self, model, **hints):
+        if not self._is_catalog(model) or not _in_catalog_view.get():
+            return None
+
+        alias = catalog_read_alias()
+        if alias is None:
+            return None
+
+        if is_pinned_to_primary() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in UNPINNED_APPS:
+            pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica is a copy of the primary, so cross-alias relations are fine
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is only ever written by snapshot_replica
+        if db == catalog_read_alias():
+            return False
+        return None
@@ -0,0 +1,230 @@
+# store/search.py
+"""
+🔤 Typeahead product search
+
+Search-as-you-type fires a request on every keystroke, so it must not hit the
+database. Each worker keeps a compact prefix index in memory:
+
+- Every product contributes one entry per word of its name, one for its SKU
+  and one per word of its brand name.
+- Terms live in one sorted list (with a parallel list of product slots), so a
+  prefix query is two ``bisect`` calls plus a slice.
+- Very short prefixes (1-2 characters) would match a big chunk of the catalog,
+  so their top results are precomputed while building.
+
+The index is rebuilt lazily: a request that notices a new catalog version
+(or a brand added, renamed or deleted) rebuilds it, while concurrent
+requests keep answering from the previous one.
+"""
+import hashlib
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+from django.db.models import Sum
+
+from .catalog import catalog_version
+from .models import Brand, Product, ProductSalesDaily
+
+
+REFRESH_SECONDS = getattr(settings, 'CATALOG_INDEX_REFRESH_SECONDS', 5)
+
+# Prefixes up to this length get a precomputed result list
+SHORT_PREFIX_LEN = 2
+
+# How many suggestions we keep / return
+MAX_RESULTS = 10
+
+_NON_WORD = re.compile(r'[^0-9a-z]+')
+
+
+def normalise(text):
+    """
+    Lowercase, strip accents and collapse punctuation to single spaces.
+    "Café-Latté 1.5L" ➝ "cafe latte 1 5l"
+    """
+    text = unicodedata.normalize('NFKD', text or '')
+    text = text.encode('ascii', 'ignore').decode('ascii').lower()
+    return _NON_WORD.sub(' ', text).strip()
+
+
+def _product_popularity():
+    """
+    📈 Units sold per product id, used to rank suggestions.
+    Read from the daily sales rollups; empty dict when there is no sales data yet.
+    """
+    rows = (
+        ProductSalesDaily.objects
+        .values('product_id')
+        .order_by()
+        .annotate(units=Sum('units'))
+        .values_list('product_id', 'units')
+    )
+    return dict(rows)
+
+
+def brand_version():
+    """
+    🔢 A short hash of every brand's id, name and slug. Brand names are
+    indexed too, and renaming a brand doesn't touch its products, so
+    ``catalog_version()`` alone would miss it.
+    """
+    rows = Brand.objects.order_by('id').values_list('id', 'name', 'slug')
+    return hashlib.sha256(repr(list(rows)).encode()).hexdigest()[:16]
+
+
+def _index_version():
+    return catalog_version(), brand_version()
+
+
+class PrefixIndex:
+    """
+    In-memory prefix index over product names, SKUs and brand names.
+    Read-only once built; a rebuild swaps in a brand new instance state.
+    """
+
+    def __init__(self, products, brands, popularity):
+        # products: iterable of (id, name, sku, brand_name)
+        # brands:   iterable of (name, slug)
+        self.products = []       # slot -> (id, name, sku, normalised name, normalised sku)
+        self.scores = []         # slot -> popularity (units sold)
+        entries = []
+
+        for slot, (pk, name, sku, brand_name) in enumerate(products):
+            norm_name = normalise(name)
+            norm_sku = normalise(sku).replace(' ', '')
+            self.products.append((pk, name, sku, norm_name, norm_sku))
+            self.scores.append(popularity.get(pk, 0))
+
+            terms = set(norm_name.split())
+            terms.update(normalise(brand_name).split())
+            if norm_sku:
+                terms.add(norm_sku)
+            for term in terms:
+                entries.append((term, slot))
+
+        entries.sort()
+        self.terms = [term for term, _slot in entries]
+        self.slots = [slot for _term, slot in entries]
+
+        self.brands = sorted((normalise(name), name, slug) for name, slug in brands)
+        self.brand_keys = [b[0] for b in self.brands]
+
+        # Precompute the best products for very short prefixes
+        self.short_results = {}
+        for prefix in {t[:n] for t in self.terms for n in range(1, SHORT_PREFIX_LEN + 1)}:
+            self.short_results[prefix] = self._top_slots(prefix, MAX_RESULTS)
+
+    def _range(self, prefix):
+        lo = bisect_left(self.terms, prefix)
+        hi = bisect_right(self.terms, prefix + '\uffff')
+        return lo, hi
+
+    def _top_slots(self, prefix, limit, must_contain=()):
+        lo, hi = self._range(prefix)
+        candidates = set(self.slots[lo:hi])
+        if must_contain:
+            candidates = {
+                slot for slot in candidates
+                if all(self._has_word_prefix(slot, word) for word in must_contain)
+            }
+        # Most popular first, then shorter / alphabetical names
+        return heapq.nsmallest(
+            limit,
+            candidates,
+            key=lambda slot: (-self.scores[slot], self.products[slot][3]),
+        )
+
+    def _has_word_prefix(self, slot, word):
+        _pk, _name, _sku, norm_name, norm_sku = self.products[slot]
+        return norm_sku.startswith(word) or any(w.startswith(word) for w in norm_name.split())
+
+    def suggest(self, query, limit=MAX_RESULTS):
+        """
+        Returns ``{"products": [...], "brands": [...]}`` for a partial query.
+        Every typed word must match the start of some word in the product.
+        The longest word is the most selective one, so it drives the index
+        lookup and the others only filter its candidates.
+        """
+        words = normalise(query).split()
+        if not words:
+            return {'products': [], 'brands': []}
+
+        prefix = max(words, key=len)
+        others = list(words)
+        others.remove(prefix)
+        if not others and len(prefix) <= SHORT_PREFIX_LEN:
+            slots = self.short_results.get(prefix, [])[:limit]
+        else:
+            slots = self._top_slots(prefix, limit, must_contain=others)
+
+        products = [
+            {'id': self.products[s][0], 'name': self.products[s][1], 'sku': self.products[s][2]}
+            for s in slots
+        ]
+
+        full = ' '.join(words)
+        lo = bisect_left(self.brand_keys, full)
+        hi = bisect_right(self.brand_keys, full + '\uffff')
+        brands = [{'name': name, 'slug': slug} for _key, name, slug in self.brands[lo:hi][:5]]
+
+        return {'products': products, 'brands': brands}
+
+
+class Autocomplete:
+    """
+    ♻️ Holds the current PrefixIndex for this worker and rebuilds it lazily
+    when the catalog (or brand) version changes.
+    """
+
+    def __init__(self, refresh_seconds=REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._index = None
+        self._version = None
+        self._checked_at = 0.0
+
+    def build(self):
+        version = _index_version()
+        products = (
+            Product.objects
+            .values_list('id', 'name', 'sku', 'brand__name')
+            .iterator(chunk_size=5000)
+        )
+        brands = Brand.objects.values_list('name', 'slug')
+        index = PrefixIndex(products, brands, _product_popularity())
+        self._index, self._version = index, version
+        self._checked_at = time.monotonic()
+        return index
+
+    def get_index(self):
+        now = time.monotonic()
+        if self._index is not None and now - self._checked_at < self.refresh_seconds:
+            return self._index
+
+        if self._index is None:
+            # Nobody can answer yet: wait for the first build
+            with self._lock:
+                return self._index or self.build()
+
+        # Someone else is already rebuilding → keep serving the old index
+        if not self._lock.acquire(blocking=False):
+            return self._index
+        try:
+            self._checked_at = now
+            if _index_version() != self._version:
+                self.build()
+        finally:
+            self._lock.release()
+        return self._index
+
+    def suggest(self, query, limit=MAX_RESULTS):
+        return self.get_index().suggest(query, limit)
+
+
+# One shared autocomplete index per worker process
+autocomplete = Autocomplete()
@@ -0,0 +1,141 @@
+# store/signals.py
+"""
+📡 Model signals
+
+Keep derived data (sales rollups, the order summary on Profile) in step
+with orders, and pre-rendered pages in step with products. Connected in
+StoreConfig.ready().
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import prerender, rollups
+from .orders import schedule_customer_refresh
+from .models import Order, OrderItem, Product
+
+
+_muted = ContextVar('store_signals_muted', default=False)
+
+
+@contextmanager
+def muted():
+    """
+    Skip the refreshes below for changes that don't alter any total
+    (e.g. archive.py moving orders to the archive tables).
+    """
+    token = _muted.set(True)
+    try:
+        yield
+    finally:
+        _muted.reset(token)
+
+
+# 📈 Rollups: the pre_* handlers read what is counted now, the post_*
+# handlers apply the difference (rollups.apply), in the same transaction.
+# Lines deleted along with their order / product are subtracted all at
+# once by that order's / product's handlers, not one by one.
+
+def _deleted_for(origin):
+    """The model whose delete() started this deletion."""
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+
+@receiver(pre_save, sender=Order)
+def order_saving(sender, instance, **kwargs):
+    if _muted.get():
+        return
+    if instance._state.adding:
+        # Counted from the start: its lines are added one by one
+        instance.rolled_up = True
+    else:
+        instance._rollup_before = rollups.lines(order_id=instance.pk, order__rolled_up=True)
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, **kwargs):
+    """Cancelled / un-cancelled or moved to another day → move its lines."""
+    if _muted.get():
+        return
+    before = instance.__dict__.pop('_rollup_before', None)
+    if before:
+        after = rollups.moved(before, cancelled=instance.status == 'cancelled', day=rollups.order_day(instance.order_date))
+        if after != before:
+            rollups.apply(rollups.negated(before) + after)
+    schedule_customer_refresh(instance.user_id)
+
+
+@receiver(pre_delete, sender=Order)
+def order_deleting(sender, instance, **kwargs):
+    if not _muted.get():
+        instance._rollup_before = rollups.lines(order_id=instance.pk, order__rolled_up=True)
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    if _muted.get():
+        return
+    rollups.apply(instance.__dict__.pop('_rollup_before', []), -1)
+    schedule_customer_refresh(instance.user_id)
+
+
+@receiver(pre_save, sender=OrderItem)
+@receiver(pre_delete, sender=OrderItem)
+def order_item_changing(sender, instance, origin=None, **kwargs):
+    if _muted.get():
+        return
+    if kwargs['signal'] is pre_delete and _deleted_for(origin) is not OrderItem:
+        instance._rollup_before = None   # see order_deleted / product_deleted
+    elif instance._state.adding:
+        instance._rollup_before = []
+    else:
+        instance._rollup_before = rollups.lines(pk=instance.pk, order__rolled_up=True)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def order_item_changed(sender, instance, **kwargs):
+    """New, edited or deleted line → the difference it makes."""
+    if _muted.get():
+        return
+    before = instance.__dict__.pop('_rollup_before', [])
+    if before is None:
+        return
+    after = rollups.lines(pk=instance.pk, order__rolled_up=True) if kwargs['signal'] is post_save else []
+    if before != after:
+        rollups.apply(rollups.negated(before) + after)
+    user_id = Order.objects.filter(pk=instance.order_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        schedule_customer_refresh(user_id)
+
+
+@receiver(pre_delete, sender=Product)
+def product_deleting(sender, instance, **kwargs):
+    if _muted.get():
+        return
+    instance._rollup_before = rollups.lines(product_id=instance.pk, order__rolled_up=True)
+    instance._customers = set(
+        Order.objects.filter(items__product_id=instance.pk).values_list('user_id', flat=True).distinct()
+    )
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    """Its order lines are gone with it: so are their totals."""
+    if _muted.get():
+        return
+    rollups.apply(instance.__dict__.pop('_rollup_before', []), -1)
+    for user_id in instance.__dict__.pop('_customers', ()):
+        schedule_customer_refresh(user_id)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_changed(sender, instance, **kwargs):
+    """Edited / deleted product → its pre-rendered page is served live until the next render_catalog."""
+    if settings.PRERENDERED_PAGES:
+        prerender.forget([prerender.product_page(instance.pk)])
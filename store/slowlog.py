@@ -0,0 +1,263 @@
+# store/slowlog.py
+"""
+🐢 Slow query log
+
+``store.middleware.SlowQueryMiddleware`` wraps every query of a request
+(``connection.execute_wrapper``). Queries slower than
+``settings.SLOW_QUERY_MS`` are:
+
+- logged on the ``store.slowlog`` logger
+- grouped by *fingerprint*: the SQL with literals, placeholders and
+  ``IN (...)`` lists folded, so the same query with other ids counts once
+- tagged with a call site: view name, the innermost project code line and,
+  when the query ran while rendering, the template line
+- explained once per fingerprint (``EXPLAIN QUERY PLAN`` on SQLite)
+
+Groups are kept per worker and, with ``settings.METRICS_DB`` set, added to
+the shared metrics file like the request histograms (store/metrics.py).
+``/staff/slow-queries/`` lists them by total time, which makes an N+1
+(e.g. one query per brand in a template loop) stand out at the top.
+
+Timings cover ``execute()`` only; rows fetched lazily by the database
+driver afterwards are not included.
+"""
+import atexit
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+from django.conf import settings
+
+from . import metrics
+
+
+logger = logging.getLogger(__name__)
+
+# Instrumentation frames skipped when looking for the calling code
+_SKIP_FILES = {
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+    for name in ('slowlog.py', 'metrics.py', 'middleware.py', 'profiling.py')
+}
+
+# 🧮 Fingerprints
+# ---------------
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ROWS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_SPACE = re.compile(r"\s+")
+
+
+def normalise(sql):
+    """``... WHERE id IN (%s, %s) AND name = 'x'`` ➝ ``... WHERE id IN (...) AND name = ?``"""
+    sql = _STRING.sub('?', sql.replace('%s', '?'))
+    sql = _NUMBER.sub('?', sql)
+    sql = _ROWS.sub('(...)', _IN_LIST.sub('(...)', sql))
+    return _SPACE.sub(' ', sql).strip()
+
+
+def fingerprint(statement):
+    return hashlib.sha1(statement.encode()).hexdigest()[:12]
+
+
+# 📍 Call sites
+# -------------
+
+def call_site(view):
+    """``"view | store/views.py:120 in home | store/home.html:42"``"""
+    code = template = None
+    frame = sys._getframe(2)
+    base = str(settings.BASE_DIR)
+    while frame is not None and (code is None or template is None):
+        if template is None and frame.f_code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            origin, token = getattr(node, 'origin', None), getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                template = f"{origin.template_name or origin.name}:{token.lineno}"
+        filename = frame.f_code.co_filename
+        if (code is None and filename.startswith(base) and 'site-packages' not in filename
+                and filename not in _SKIP_FILES):
+            code = f"{os.path.relpath(filename, base)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return ' | '.join(part for part in (view, code, template) if part)
+
+
+def explain(connection, sql, params):
+    """The query plan as text, or None. Runs on a raw cursor, outside the wrappers."""
+    if not sql.lstrip()[:6].upper().startswith(('SELECT', 'WITH')):
+        return None
+    try:
+        cursor = connection.create_cursor()
+        try:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+        finally:
+            cursor.close()
+    except Exception as exc:   # a failed EXPLAIN must never break the request
+        logger.debug("EXPLAIN failed: %s", exc)
+        return None
+
+
+# 📊 Aggregation
+# --------------
+
+class SlowQueries:
+    """``{(fingerprint, site): [statement, calls, total_ms, max_ms, plan]}`` since the last flush."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.explained = set()
+        self.last_flush = time.monotonic()
+
+    def add(self, key, statement, ms, plan):
+        with self.lock:
+            row = self.pending.get(key)
+            if row is None:
+                row = self.pending[key] = [statement, 0, 0.0, 0.0, None]
+            row[1] += 1
+            row[2] += ms
+            row[3] = max(row[3], ms)
+            row[4] = row[4] or plan
+
+    def take(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.last_flush = time.monotonic()
+        return pending
+
+    def snapshot(self):
+        with self.lock:
+            return {key: list(row) for key, row in self.pending.items()}
+
+
+slow_queries = SlowQueries()
+
+
+class SlowQueryWrapper:
+    """``execute_wrapper`` callable for one request."""
+
+    def __init__(self, request):
+        self.request = request
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        ms = (time.perf_counter() - start) * 1000
+        if ms >= settings.SLOW_QUERY_MS:
+            self.record(sql, params, many, context, ms)
+        return result
+
+    def record(self, sql, params, many, context, ms):
+        match = getattr(self.request, 'resolver_match', None)
+        site = call_site(match.view_name if match else '(middleware)')
+        statement = normalise(sql)
+        key = (fingerprint(statement), site)
+
+        plan = None
+        if not many and settings.SLOW_QUERY_EXPLAIN and key[0] not in slow_queries.explained:
+            slow_queries.explained.add(key[0])
+            plan = explain(context['connection'], sql, params)
+
+        logger.warning("slow query %.1f ms [%s] at %s: %s", ms, key[0], site, statement[:500])
+        slow_queries.add(key, statement, ms, plan)
+
+
+# 🗃 Shared sink (same file as the request metrics)
+# ------------------------------------------------
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS slow_query (
+    fingerprint TEXT NOT NULL,
+    site        TEXT NOT NULL,
+    statement   TEXT NOT NULL,
+    calls       INTEGER NOT NULL,
+    total_ms    REAL NOT NULL,
+    max_ms      REAL NOT NULL,
+    plan        TEXT,
+    PRIMARY KEY (fingerprint, site)
+);
+"""
+
+
+def flush():
+    if not settings.METRICS_DB:
+        return
+    pending = slow_queries.take()
+    if not pending:
+        return
+    try:
+        conn = metrics.connect_sink(SCHEMA)
+    except sqlite3.Error as exc:
+        logger.warning("slow query sink unavailable, %d group(s) dropped: %s", len(pending), exc)
+        return
+    try:
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany(
+                'INSERT INTO slow_query (fingerprint, site, statement, calls, total_ms, max_ms, plan) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (fingerprint, site) DO UPDATE SET '
+                'calls = calls + excluded.calls, total_ms = total_ms + excluded.total_ms, '
+                'max_ms = MAX(max_ms, excluded.max_ms), plan = COALESCE(plan, excluded.plan)',
+                [(fp, site, *row) for (fp, site), row in pending.items()],
+            )
+    except sqlite3.Error as exc:
+        logger.warning("slow query sink write failed, %d group(s) dropped: %s", len(pending), exc)
+    finally:
+        conn.close()
+
+
+atexit.register(flush)
+
+
+def maybe_flush():
+    if settings.METRICS_DB and time.monotonic() - slow_queries.last_flush >= settings.METRICS_FLUSH_SECONDS:
+        flush()
+
+
+def report(limit=50):
+    """
+    Fingerprints by total time, each with its call sites::
+
+        [{'fingerprint', 'statement', 'calls', 'total_ms', 'max_ms', 'avg_ms',
+          'plan', 'sites': [{'site', 'calls', 'total_ms'}, ...]}, ...]
+    """
+    if settings.METRICS_DB:
+        flush()
+        conn = metrics.connect_sink(SCHEMA)
+        try:
+            rows = {
+                (fp, site): [statement, calls, total, peak, plan]
+                for fp, site, statement, calls, total, peak, plan in conn.execute(
+                    'SELECT fingerprint, site, statement, calls, total_ms, max_ms, plan FROM slow_query'
+                )
+            }
+        finally:
+            conn.close()
+    else:
+        rows = slow_queries.snapshot()
+
+    groups = {}
+    for (fp, site), (statement, calls, total, peak, plan) in rows.items():
+        group = groups.setdefault(fp, {
+            'fingerprint': fp, 'statement': statement, 'calls': 0, 'total_ms': 0.0,
+            'max_ms': 0.0, 'plan': None, 'sites': [],
+        })
+        group['calls'] += calls
+        group['total_ms'] += total
+        group['max_ms'] = max(group['max_ms'], peak)
+        group['plan'] = group['plan'] or plan
+        group['sites'].append({'site': site, 'calls': calls, 'total_ms': total})
+
+    ordered = sorted(groups.values(), key=lambda g: g['total_ms'], reverse=True)[:limit]
+    for group in ordered:
+        group['avg_ms'] = group['total_ms'] / group['calls']
+        group['sites'].sort(key=lambda s: s['total_ms'], reverse=True)
+    return ordered
@@ -1,3 +1,1365 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
 
-# Create your tests here.
+import tablib
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import async_views, views, urls as store_urls
+from .archive import archive_batch, archive_orders, get_order, order_history
+from .bulk import transition_orders
+from .catalog import BarcodeIndex, barcode_index
+from .db import on_commit_batched
+from .fakedata import generate
+from .feeds import read_feed, sync_feed
+from .media import IMMUTABLE, REVALIDATE, MediaError, collect_garbage, content_name, name_digest
+from .metrics import Registry, render_prometheus
+from .middleware import PIN_COOKIE
+from .models import (
+    ArchivedOrder, Brand, BrandSalesDaily, Cart, CartItem, Category, CategorySalesDaily, Order,
+    OrderEvent, OrderItem, Product, ProductSalesDaily, Profile, RollupWatermark,
+)
+from .orders import encode_cursor, refresh_customer_summaries
+from .profiling import profile_call, save as save_profile
+from .resources import ProductResource
+from .rollups import order_day, rebuild_day
+from .routers import CatalogReadRouter, catalog_view, reset_primary_pin
+from .search import autocomplete
+
+
+# ============================================
+# 🧭 QUERY PLANS FOR THE HOT VIEWS
+# ============================================
+
+# "SCAN store_order" (SQLite < 3.36: "SCAN TABLE store_order") = full table
+# scan. "SCAN x USING (COVERING) INDEX" is an index walk and fine for listing
+# pages.
+FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)$')
+TEMP_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+
+
+class QueryPlanTests(TestCase):
+    """
+    🧭 Runs the hot views, EXPLAINs every query they issue and fails when a
+    filtered query falls back to a full table scan (or sorts in a temp
+    B-tree because no index matches its ORDER BY).
+
+    Queries without a WHERE clause are listings by design (e.g. the brand
+    dropdown) and are not checked.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('planner', password='pw')
+        cls.staff = User.objects.create_user('staffer', password='pw', is_staff=True)
+
+        cls.brand = Brand.objects.create(name='Abraaj', slug='abraaj')
+        cls.category = Category.objects.create(name='Water', slug='water')
+        cls.products = [
+            Product.objects.create(
+                sku=f'KW{i:06d}', upc=f'628{i:09d}', name=f'Water {i}',
+                description='', price='0.250', stock=10,
+                brand=cls.brand, category=cls.category,
+            )
+            for i in range(5)
+        ]
+
+        for _ in range(3):
+            order = Order.objects.create(user=cls.user)
+            OrderItem.objects.create(order=order, product=cls.products[0], quantity=2)
+        cls.order = order
+
+    def explain(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexedQueries(self, queries):
+        """
+        Re-runs every ``(sql, params)`` pair through EXPLAIN QUERY PLAN.
+        """
+        for sql, params in queries:
+            if ' WHERE ' not in sql or not sql.lstrip().upper().startswith('SELECT'):
+                continue
+
+            plan = self.explain(sql, params)
+            for step in plan:
+                self.assertIsNone(
+                    FULL_SCAN.match(step),
+                    f"Full table scan ({step}) in:\n{sql}\nplan: {plan}",
+                )
+                self.assertNotIn(TEMP_SORT, step, f"Unindexed ORDER BY in:\n{sql}\nplan: {plan}")
+
+    def get_and_check(self, url, user=None):
+        if user:
+            self.client.force_login(user)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        # Captured SQL already has its params inlined, so EXPLAIN it as is
+        self.assertIndexedQueries((q['sql'], []) for q in captured.captured_queries)
+        return response
+
+    # 🌍 Catalog
+    # ----------
+
+    def test_home(self):
+        self.get_and_check(reverse('home'))
+
+    def test_product_list_filtered_by_brand_and_category(self):
+        self.get_and_check(reverse('product_list') + '?brand=abraaj&category=water')
+
+    def test_product_list_filtered_by_brand(self):
+        self.get_and_check(reverse('product_list') + '?brand=abraaj')
+
+    def test_product_detail(self):
+        self.get_and_check(reverse('product_detail', args=[self.products[0].id]))
+
+    def test_brand_and_category_pages(self):
+        self.get_and_check(reverse('brand_products', args=['abraaj']))
+        self.get_and_check(reverse('category_products', args=['water']))
+
+    # 📦 Orders
+    # ---------
+
+    def test_dashboard(self):
+        self.get_and_check(reverse('dashboard'), user=self.user)
+
+    def test_my_orders(self):
+        self.get_and_check(reverse('my_orders'), user=self.user)
+
+    def test_order_list(self):
+        self.get_and_check(reverse('order_list'), user=self.staff)
+        self.get_and_check(reverse('order_list') + '?status=pending&user=planner', user=self.staff)
+
+    def test_order_list_older_page(self):
+        self.get_and_check(reverse('order_list') + f'?after={encode_cursor(self.order)}', user=self.staff)
+
+    def test_order_detail(self):
+        self.get_and_check(reverse('order_detail', args=[self.order.id]), user=self.staff)
+
+    # 🔎 Query shapes used outside a single page
+    # ------------------------------------------
+
+    def test_sku_lookup_uses_unique_index(self):
+        qs = Product.objects.filter(sku='KW000001')
+        self.assertIndexedQueries([qs.query.sql_with_params()])
+        plan = self.explain(*qs.query.sql_with_params())
+        self.assertTrue(any('sku' in step for step in plan), plan)
+
+    def test_orders_by_status_newest_first(self):
+        qs = Order.objects.filter(status='pending').order_by('-order_date')[:50]
+        plan = self.explain(*qs.query.sql_with_params())
+        self.assertTrue(any('order_status_date_idx' in step for step in plan), plan)
+        self.assertFalse(any(TEMP_SORT in step for step in plan), plan)
+
+    def test_user_orders_newest_first(self):
+        qs = Order.objects.filter(user=self.user).order_by('-order_date')[:15]
+        plan = self.explain(*qs.query.sql_with_params())
+        self.assertTrue(any('order_user_date_idx' in step for step in plan), plan)
+
+
+# ============================================
+# 🧮 QUERY BUDGETS FOR EVERY PAGE
+# ============================================
+
+def _grow(scale, start=0):
+    """
+    Add ``scale`` units of realistic data: per unit 6 brands, 6 categories
+    (enough to fill the home page sections), 12 products, a customer with
+    2 orders and, for the main customer,
+    3 orders (3 lines each), 1 archived order, 3 cart lines and 3 events.
+    Returns the new products.
+    """
+    customer = User.objects.get(username='customer')
+    staff = User.objects.get(username='boss')
+    cart, _ = Cart.objects.get_or_create(user=customer)
+    products = []
+
+    for unit in range(start, start + scale):
+        brands = [Brand.objects.create(name=f'Brand {unit}-{i}', slug=f'brand-{unit}-{i}') for i in range(6)]
+        categories = [Category.objects.create(name=f'Cat {unit}-{i}', slug=f'cat-{unit}-{i}') for i in range(6)]
+        batch = Product.objects.bulk_create([
+            Product(
+                sku=f'B{unit:03d}{i:03d}', upc=f'9{unit:05d}{i:05d}', name=f'Product {unit}-{i}',
+                description='', price='1.250', stock=20,
+                brand=brands[i % 6], category=categories[i % 6],
+            )
+            for i in range(12)
+        ])
+        products += batch
+
+        other = User.objects.create_user(f'shopper{unit}', password='pw')
+        for user, count in ((customer, 3), (other, 2)):
+            for _ in range(count):
+                order = Order.objects.create(user=user)
+                OrderItem.objects.bulk_create(
+                    [OrderItem(order=order, product=p, quantity=2, unit_price=p.price) for p in batch[:3]]
+                )
+                OrderEvent.objects.create(order=order, from_status='pending', to_status='pending', actor=staff)
+
+        old = Order.objects.create(user=customer, status='delivered')
+        Order.objects.filter(id=old.id).update(order_date=timezone.now() - timedelta(days=800))
+        OrderItem.objects.create(order=old, product=batch[0], quantity=1)
+        archive_batch([old.id])
+
+        CartItem.objects.bulk_create([CartItem(cart=cart, product=p, quantity=1) for p in batch[3:6]])
+    return products
+
+
+QUERY_STRINGS = {
+    'product_lookup': '?code=B000001',
+    'product_autocomplete': '?q=prod',
+}
+
+CUSTOMER_ACTIONS = {
+    'add_to_cart', 'update_cart_item', 'remove_cart_item', 'logout',
+    'session_add_to_cart', 'session_update_cart', 'session_remove_from_cart',
+}
+
+# POST body per action: route ➝ f(test) ➝ kwargs for client.post
+ACTION_DATA = {
+    'add_to_cart': lambda t: {'data': {'quantity': 1}},
+    'update_cart_item': lambda t: {'data': {'quantity': 2}},
+    'session_add_to_cart': lambda t: {'data': {'quantity': 1}},
+    'session_update_cart': lambda t: {'data': {'quantity': 2}},
+    'order_update_status': lambda t: {'data': {'status': 'shipped'}},
+    'order_bulk_status': lambda t: {
+        'data': json.dumps({
+            'status': 'shipped',
+            'order_ids': list(Order.objects.filter(status='pending').values_list('id', flat=True)),
+        }),
+        'content_type': 'application/json',
+    },
+    # One page worth of ticked products (Django deletes in batches of 100 rows)
+    'product_bulk_delete': lambda t: {
+        'data': json.dumps({'product_ids': list(Product.objects.values_list('id', flat=True)[:10])}),
+        'content_type': 'application/json',
+    },
+    'product_lookup_batch': lambda t: {
+        'data': json.dumps({'codes': list(Product.objects.values_list('sku', flat=True))}),
+        'content_type': 'application/json',
+    },
+}
+
+
+class QueryBudgetTests(TestCase):
+    """
+    🧮 Every route in store/urls.py (and every admin changelist) has a fixed
+    maximum number of SQL queries, per kind of visitor. Each test then grows
+    the data 10× and checks that no count went up: a page that runs one
+    more query per product / order / cart line (N+1) fails here. (A count
+    may go down, e.g. my_orders stops reading archived lines once the
+    first page is all recent orders.)
+
+    When a page legitimately needs another query, raise its budget below.
+    """
+
+    # route ➝ {visitor: max queries}; visitors: anon, user, staff
+    PAGES = {
+        'home': {'anon': 7, 'user': 10, 'staff': 10},
+        'product_list': {'anon': 5, 'user': 7, 'staff': 7},
+        'product_detail': {'anon': 9, 'user': 10, 'staff': 10},
+        'brand_products': {'anon': 4, 'user': 6, 'staff': 6},
+        'category_products': {'anon': 4, 'user': 6, 'staff': 6},
+        'order_list': {'anon': 0, 'user': 2, 'staff': 6},
+        'order_detail': {'anon': 4, 'user': 6, 'staff': 6},
+        'order_update_status': {'anon': 0, 'user': 2, 'staff': 5},
+        'order_delete': {'anon': 0, 'user': 2, 'staff': 5},
+        'register': {'anon': 2, 'user': 4, 'staff': 4},
+        'login': {'anon': 2, 'user': 4, 'staff': 4},
+        'dashboard': {'anon': 0, 'user': 7, 'staff': 7},
+        'my_orders': {'anon': 0, 'user': 10, 'staff': 6},
+        'cart_detail': {'anon': 0, 'user': 6, 'staff': 5},
+        'session_cart_detail': {'anon': 0, 'user': 5, 'staff': 5},
+        'profile': {'anon': 0, 'user': 5, 'staff': 5},
+        'profile_edit': {'anon': 0, 'user': 5, 'staff': 5},
+        'product_create': {'anon': 0, 'user': 2, 'staff': 6},
+        'product_delete_list': {'anon': 0, 'user': 2, 'staff': 5},
+        'product_edit': {'anon': 0, 'user': 2, 'staff': 7},
+        'bulk_upload': {'anon': 0, 'user': 2, 'staff': 4},
+        'product_lookup': {'anon': 1, 'user': 1, 'staff': 1},
+        # Product + brand version check (refresh_seconds=0 here; every few seconds in real life)
+        'product_autocomplete': {'anon': 2, 'user': 2, 'staff': 2},
+        'sales_dashboard': {'anon': 0, 'user': 2, 'staff': 9},
+        'export_data': {'anon': 0, 'user': 2, 'staff': 4},
+        'metrics': {'anon': 0, 'user': 2, 'staff': 2},
+        'slow_queries': {'anon': 0, 'user': 2, 'staff': 4},
+        'profile_list': {'anon': 0, 'user': 2, 'staff': 4},
+        'profile_download': {'anon': 0, 'user': 2, 'staff': 2},
+    }
+
+    # POST-only routes: route ➝ max queries (as staff, or customer for carts)
+    ACTIONS = {
+        'logout': 4,
+        'add_to_cart': 10,
+        'update_cart_item': 7,
+        'remove_cart_item': 7,
+        'session_add_to_cart': 6,
+        'session_update_cart': 5,
+        'session_remove_from_cart': 5,
+        # Rollups change in the same transaction: + read + write per rollup table
+        'order_update_status': 11,
+        'order_delete': 13,
+        'delete_product': 12,
+        'order_bulk_status': 10,
+        'product_lookup_batch': 4,
+        'product_bulk_delete': 19,   # last: removes products the other actions use
+    }
+
+    # Admin changelists (model label) and change pages ➝ max queries, as staff
+    ADMIN = {
+        'store.Brand': 5,
+        'store.Category': 5,
+        'store.Product': 4,
+        'store.Order': 4,
+        'store.OrderItem': 4,
+        'store.OrderEvent': 4,
+        'store.ArchivedOrder': 4,
+        'store.Cart': 4,
+        'store.CartItem': 4,
+        'store.Profile': 5,
+        'order change': 9,
+        'archived order change': 6,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('customer', password='pw')
+        cls.staff = User.objects.create_user('boss', password='pw', is_staff=True, is_superuser=True)
+        _grow(1)
+
+    def setUp(self):
+        self.grown = False
+        # Check the in-memory indexes' catalog version on every request,
+        # not every few seconds, so their counts don't depend on the clock
+        for index in (barcode_index, autocomplete):
+            self.addCleanup(setattr, index, 'refresh_seconds', index.refresh_seconds)
+            index.refresh_seconds = 0
+
+    def grow_tenfold(self):
+        _grow(9, start=1)
+        self.grown = True
+
+    # 🔧 Helpers
+    # ----------
+
+    def login(self, visitor):
+        self.client.logout()
+        if visitor == 'anon':
+            return
+        self.client.force_login(self.customer if visitor == 'user' else self.staff)
+        # Session cart and recently viewed products grow with the data too
+        ids = list(Product.objects.order_by('-id').values_list('id', flat=True)[:30])
+        session = self.client.session
+        session['session_cart'] = {str(pk): 1 for pk in ids}
+        session['recently_viewed'] = ids[:15]
+        session.save()
+
+    def url_args(self):
+        order = Order.objects.filter(user=self.customer).latest('id')
+        product = Product.objects.latest('id')
+        return {
+            'product_id': product.id, 'pk': product.id, 'order_id': order.id,
+            'item_id': CartItem.objects.latest('id').id,
+            'slug': product.brand.slug, 'dataset': 'orders', 'name': 'missing.pstats',
+        }
+
+    def route_url(self, name):
+        pattern = next(p for p in store_urls.urlpatterns if getattr(p, 'name', None) == name)
+        args = self.url_args()
+        if name == 'category_products':
+            args['slug'] = Product.objects.latest('id').category.slug
+        url = reverse(name, kwargs={key: args[key] for key in pattern.pattern.converters})
+        return url + QUERY_STRINGS.get(name, '')
+
+    def count(self, method, url, warm=True, **kwargs):
+        if warm:
+            getattr(self.client, method)(url, **kwargs)
+        with CaptureQueriesContext(connection) as captured:
+            response = getattr(self.client, method)(url, **kwargs)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 500, url)
+        return len(captured)
+
+    def measure_pages(self, visitors):
+        counts = {}
+        for name, budgets in self.PAGES.items():
+            for visitor in visitors:
+                if visitor in budgets:
+                    self.login(visitor)
+                    counts[name, visitor] = self.count('get', self.route_url(name))
+        return counts
+
+    def assertBudgets(self, measure, budgets):
+        before = measure()
+        for key, count in before.items():
+            with self.subTest(key=key):
+                self.assertLessEqual(count, budgets[key], f"{key}: {count} queries, budget {budgets[key]}")
+
+        self.grow_tenfold()
+        after = measure()
+        for key, count in after.items():
+            with self.subTest(key=key, scale='10x'):
+                self.assertLessEqual(count, before[key], f"{key}: {before[key]} queries ➝ {count} with 10x the data")
+
+    # 🧪 Tests
+    # --------
+
+    def test_every_route_has_a_budget(self):
+        names = {p.name for p in store_urls.urlpatterns if getattr(p, 'name', None)}
+        self.assertEqual(names - set(self.PAGES) - set(self.ACTIONS), set())
+
+    def test_public_pages(self):
+        budgets = {(name, 'anon'): b['anon'] for name, b in self.PAGES.items() if 'anon' in b}
+        self.assertBudgets(lambda: self.measure_pages(['anon']), budgets)
+
+    def test_customer_pages(self):
+        budgets = {(name, 'user'): b['user'] for name, b in self.PAGES.items() if 'user' in b}
+        self.assertBudgets(lambda: self.measure_pages(['user']), budgets)
+
+    def test_staff_pages(self):
+        budgets = {(name, 'staff'): b['staff'] for name, b in self.PAGES.items() if 'staff' in b}
+        self.assertBudgets(lambda: self.measure_pages(['staff']), budgets)
+
+    def test_async_catalog_views(self):
+        """
+        The async views (async_views.py) aren't routed here (the URLconf
+        picks them at import time and ASYNC_CATALOG_VIEWS is off), so they
+        are called directly, as an anonymous visitor: same budgets, same HTML.
+        """
+        names = ('home', 'product_list', 'product_detail', 'brand_products', 'category_products')
+
+        def call(view, name):
+            pattern = next(p for p in store_urls.urlpatterns if getattr(p, 'name', None) == name)
+            args = self.url_args()
+            if name == 'category_products':
+                args['slug'] = Product.objects.latest('id').category.slug
+            request = AsyncRequestFactory().get('/')
+            request.user, request.session = AnonymousUser(), SessionStore()
+            run = async_to_sync(view) if iscoroutinefunction(view) else view
+            with CaptureQueriesContext(connection) as captured:
+                response = run(request, **{key: args[key] for key in pattern.pattern.converters})
+            self.assertEqual(response.status_code, 200, name)
+            # CSRF tokens are masked differently on every render
+            return re.sub(rb'name="csrfmiddlewaretoken" value="\w+"', b'', response.content), len(captured)
+
+        def measure():
+            counts = {}
+            for name in names:
+                html, counts[name, 'anon'] = call(getattr(async_views, name), name)
+                with self.subTest(name=name):
+                    self.assertEqual(html, call(getattr(views, name), name)[0])
+            return counts
+
+        self.assertBudgets(measure, {(name, 'anon'): self.PAGES[name]['anon'] for name in names})
+
+    def test_post_actions(self):
+        def measure():
+            counts = {}
+            for name, budget in self.ACTIONS.items():
+                self.login('user' if name in CUSTOMER_ACTIONS else 'staff')
+                kwargs = ACTION_DATA.get(name, lambda test: {})(self)
+                counts[name] = self.count('post', self.route_url(name), warm=False, **kwargs)
+            return counts
+        self.assertBudgets(measure, self.ACTIONS)
+
+    def test_admin_changelists(self):
+        models = [model for model in admin.site._registry if model._meta.app_label == 'store']
+
+        def measure():
+            self.login('staff')
+            counts = {
+                model._meta.label: self.count('get', reverse(f'admin:store_{model._meta.model_name}_changelist'))
+                for model in models
+            }
+            # Change pages with inlines
+            order = Order.objects.latest('id')
+            counts['order change'] = self.count('get', reverse('admin:store_order_change', args=[order.id]))
+            archived = ArchivedOrder.objects.latest('id')
+            counts['archived order change'] = self.count(
+                'get', reverse('admin:store_archivedorder_change', args=[archived.id]))
+            return counts
+
+        self.assertBudgets(measure, self.ADMIN)
+
+
+# ============================================
+# 🧾 STAFF PAGES WITH BAD QUERY STRINGS
+# ============================================
+
+class BadQueryStringTests(TestCase):
+    """Hand-edited filters and cursors must never give a 500."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('boss', password='pw', is_staff=True, is_superuser=True)
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def test_order_list_impossible_date_is_ignored(self):
+        for query in ('?from=2024-02-30', '?to=2024-13-01', '?from=2024-02-30&to=2024-02-31'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(reverse('order_list') + query).status_code, 200)
+
+    def test_order_list_out_of_range_cursor_is_ignored(self):
+        for cursor in ('100000000000000000000-1', '-100000000000000000000-1', 'x-1', '12'):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get(reverse('order_list') + f'?after={cursor}').status_code, 200)
+                self.assertEqual(self.client.get(reverse('order_list') + f'?before={cursor}').status_code, 200)
+
+    def test_sales_dashboard_impossible_date_falls_back_to_defaults(self):
+        response = self.client.get(reverse('sales_dashboard') + '?from=2024-02-30&to=2024-02-31')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['date_to'], timezone.localdate())
+
+    def test_export_rejects_bad_dates(self):
+        url = reverse('export_data', args=['orders'])
+        for query in ('?from=2024-02-30', '?to=2024-13-01', '?from=yesterday'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(url + query).status_code, 400)
+        response = self.client.get(url + '?from=2024-02-01&to=2024-02-29')
+        self.assertEqual(response.status_code, 200)
+        b''.join(response.streaming_content)
+
+
+# ============================================
+# 🧪 SYNTHETIC DATA
+# ============================================
+
+class FakeDataTests(TestCase):
+    END = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+
+    def make(self, prefix, **options):
+        options = {'brands': 5, 'categories': 5, 'products': 300, 'users': 50, 'order_items': 30_000,
+                   'days': 360, 'seed': 7, 'end': self.END, 'summaries': False, **options}
+        generate(prefix=prefix, **options)
+        first_order = Order.objects.filter(user__username__startswith=f'{prefix.lower()}-').order_by('id').first()
+        first_user = User.objects.filter(username__startswith=f'{prefix.lower()}-').order_by('id').first().id
+        first_product = Product.objects.filter(sku__startswith=prefix).order_by('id').first().id
+        orders = list(
+            Order.objects.filter(id__gte=first_order.id).order_by('id')
+            .values_list('id', 'status', 'user_id', 'order_date')
+        )
+        lines = list(
+            OrderItem.objects.filter(order_id__gte=first_order.id).order_by('id')
+            .values_list('order_id', 'product_id', 'quantity')
+        )
+        # Ids relative to the run, so two runs can be compared
+        return (
+            [(pk - first_order.id, status, user - first_user, date) for pk, status, user, date in orders],
+            [(order - first_order.id, product - first_product, quantity) for order, product, quantity in lines],
+        )
+
+    def test_items_per_order_and_dates_are_honoured(self):
+        orders, lines = self.make('A', items_per_order=3.0)
+        self.assertEqual(len(lines), 30_000)
+        self.assertAlmostEqual(len(lines) / len(orders), 3.0, delta=0.1)
+
+        # Evenly over the days: no month much busier than the others, none in the future
+        start = self.END - timedelta(days=360)
+        per_month = [0] * 12
+        for _pk, _status, _user, date in orders:
+            self.assertLessEqual(date, self.END)
+            per_month[(date - start).days // 30] += 1
+        mean = len(orders) / 12
+        for month, count in enumerate(per_month):
+            self.assertAlmostEqual(count, mean, delta=mean * 0.15, msg=f'month {month}: {per_month}')
+
+        # Ids grow with time
+        dates = [date for _pk, _status, _user, date in orders]
+        self.assertEqual(dates, sorted(dates))
+
+    def test_same_seed_same_rows(self):
+        self.assertEqual(self.make('A'), self.make('B'))
+        self.assertNotEqual(self.make('C', seed=8)[1], self.make('D')[1])
+
+
+# ============================================
+# 🚚 SUPPLIER FEEDS
+# ============================================
+
+class FeedTests(TestCase):
+    def test_jsonl_lines_that_are_not_objects_are_row_errors(self):
+        Product.objects.create(sku='SKU1', upc='0001', name='One', price='1.000', stock=1)
+        feed = io.StringIO('[1, 2]\n42\n"x"\n{not json\n{"sku": "SKU1", "price": "2.000", "stock": 1}\n')
+
+        report = sync_feed(read_feed(feed, 'jsonl'))
+
+        self.assertEqual(report['errors'], 4)
+        self.assertEqual([row['line'] for row in report['error_rows']], [1, 2, 3, 4])
+        self.assertEqual(report['updated'], 1)
+
+    def test_jsonl_numbers_where_text_is_expected(self):
+        Brand.objects.create(name='Seven', slug='7')
+        feed = io.StringIO(
+            '{"sku": "NEW1", "price": 1.5, "stock": 3, "upc": 6281007000000, "name": "Milk", "brand": 7}\n'
+            '{"sku": "NEW2", "price": 1.5, "stock": 3, "upc": 6281007000001, "name": "Laban", "category": 12}\n'
+        )
+
+        report = sync_feed(read_feed(feed, 'jsonl'))
+
+        self.assertEqual((report['inserted'], report['errors']), (1, 1))
+        self.assertEqual(report['error_rows'][0]['line'], 2)
+        self.assertIn('unknown category', report['error_rows'][0]['error'])
+        product = Product.objects.get(sku='NEW1')
+        self.assertEqual((product.upc, product.brand.slug), ('6281007000000', '7'))
+
+
+# ============================================
+# 🔀 CATALOG READ REPLICA
+# ============================================
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    A ``replica`` alias mirroring the test database, as REPLICA_DB_PATH
+    sets one up (TEST MIRROR = default): the same (committed) data through
+    its own connection, so the queries sent to each side can be told apart.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # Added here, not in settings: the test runner only sets up 'default'
+        connections.settings['replica'] = {**connections['default'].settings_dict, 'TEST': {'MIRROR': 'default'}}
+        cls.addClassCleanup(connections.settings.pop, 'replica')
+        cls.addClassCleanup(connections['replica'].close)
+        cls.databases = {'default', 'replica'}
+        super().setUpClass()
+
+    def setUp(self):
+        settings = override_settings(CATALOG_READ_DB='replica')
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        brand = Brand.objects.create(name='Acme', slug='acme')
+        self.product = Product.objects.create(sku='TEA', upc='0001', name='Tea', price='1.000', stock=5, brand=brand)
+        User.objects.create_user('shopper', password='pw')
+
+    def get(self, url):
+        """``(queries on default, queries on replica)`` for one GET, plus the response."""
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return primary, replica, response
+
+    def test_catalog_pages_read_the_replica(self):
+        for url in (reverse('home'), reverse('product_list'), reverse('product_detail', args=[self.product.id]),
+                    reverse('brand_products', args=['acme'])):
+            with self.subTest(url=url):
+                primary, replica, _response = self.get(url)
+                self.assertTrue(any('"store_product"' in q['sql'] for q in replica), replica.captured_queries)
+                self.assertFalse(any('"store_product"' in q['sql'] for q in primary), primary.captured_queries)
+
+    def test_other_pages_stay_on_the_primary(self):
+        self.client.login(username='shopper', password='pw')
+        _primary, replica, _response = self.get(reverse('cart_detail'))
+        self.assertEqual(len(replica), 0)
+
+    def test_write_pins_the_browser_to_the_primary(self):
+        # Logging in writes last_login: the answer carries the pin cookie
+        response = self.client.post(reverse('login'), {'username': 'shopper', 'password': 'pw'})
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], settings.REPLICA_PIN_SECONDS)
+
+        primary, replica, _response = self.get(reverse('product_list'))
+        self.assertEqual(len(replica), 0)
+        self.assertTrue(any('"store_product"' in q['sql'] for q in primary))
+
+        # Pin expired: back to the replica, no new cookie for a read
+        del self.client.cookies[PIN_COOKIE]
+        _primary, replica, response = self.get(reverse('product_list'))
+        self.assertTrue(any('"store_product"' in q['sql'] for q in replica))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_reads_inside_a_transaction_stay_on_the_primary(self):
+        router = CatalogReadRouter()
+
+        @catalog_view
+        def page():
+            routes = [router.db_for_read(Product), router.db_for_read(Order)]
+            with transaction.atomic():
+                routes.append(router.db_for_read(Product))
+            return routes
+
+        reset_primary_pin()   # setUp's writes pinned this test
+        self.assertEqual(page(), ['replica', None, 'default'])
+        self.assertIsNone(router.db_for_read(Product))   # not a catalog page
+
+
+# ============================================
+# 🗄 ORDER ARCHIVE
+# ============================================
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user('shopper', password='pw')
+        self.rice = Product.objects.create(sku='RICE5', upc='0001', name='Rice 5kg', price='2.000', stock=9)
+        long_ago = timezone.now() - timedelta(days=800)
+
+        self.old = Order.objects.create(user=self.customer, status='delivered')
+        OrderItem.objects.create(order=self.old, product=self.rice, quantity=3, unit_price='1.500')
+        OrderEvent.objects.create(order=self.old, from_status='shipped', to_status='delivered')
+        self.open = Order.objects.create(user=self.customer)   # old but still pending
+        OrderItem.objects.create(order=self.open, product=self.rice, quantity=1)
+        Order.objects.filter(id__in=[self.old.id, self.open.id]).update(order_date=long_ago)
+        self.recent = Order.objects.create(user=self.customer, status='delivered')
+        OrderItem.objects.create(order=self.recent, product=self.rice, quantity=2)
+
+    def test_only_old_finished_orders_move(self):
+        rollups_before = list(ProductSalesDaily.objects.order_by('day').values_list('day', 'units', 'revenue'))
+        self.assertEqual(archive_orders(older_than_days=365), (1, 1))
+        self.assertEqual(archive_orders(older_than_days=365), (0, 0))
+
+        self.assertEqual(set(Order.objects.values_list('id', flat=True)), {self.open.id, self.recent.id})
+        self.assertFalse(OrderItem.objects.filter(order_id=self.old.id).exists())
+        self.assertFalse(OrderEvent.objects.filter(order_id=self.old.id).exists())
+
+        archived = ArchivedOrder.objects.get()
+        self.assertEqual((archived.id, archived.status, archived.user_id), (self.old.id, 'delivered', self.customer.id))
+        self.assertEqual(
+            list(archived.items.values_list('product_id', 'product_name', 'product_sku', 'unit_price', 'quantity')),
+            [(self.rice.id, 'Rice 5kg', 'RICE5', Decimal('1.500'), 3)],
+        )
+        self.assertEqual(list(archived.events.values_list('from_status', 'to_status')), [('shipped', 'delivered')])
+        # Same lines, same prices: the rollups don't change
+        self.assertEqual(list(ProductSalesDaily.objects.order_by('day').values_list('day', 'units', 'revenue')), rollups_before)
+
+    def test_archived_orders_are_still_shown(self):
+        archive_orders(older_than_days=365)
+
+        order = get_order(self.old.id)
+        self.assertIsInstance(order, ArchivedOrder)
+        self.assertEqual(order.total_amount, Decimal('4.500'))
+
+        orders, _older, _newer = order_history(self.customer)
+        self.assertEqual(
+            {o.id: (o.items_total, o.amount_total) for o in orders},
+            {self.recent.id: (2, Decimal('4.000')), self.open.id: (1, Decimal('2.000')),
+             self.old.id: (3, Decimal('4.500'))},
+        )
+
+        self.client.force_login(self.customer)
+        page = self.client.get(reverse('my_orders'))
+        self.assertIn(self.old.id, [o.id for o in page.context['orders']])
+        detail = self.client.get(reverse('order_detail', args=[self.old.id]))
+        self.assertEqual((detail.status_code, detail.context['total_amount']), (200, Decimal('4.500')))
+
+
+# ============================================
+# 👤 CUSTOMER ORDER SUMMARIES
+# ============================================
+
+class CustomerSummaryTests(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user('shopper', password='pw')
+        self.tea = Product.objects.create(sku='TEA', upc='0001', name='Tea', price='9.000', stock=50)
+
+    def order(self, status, quantity, unit_price, days_ago=0):
+        order = Order.objects.create(user=self.customer, status=status)
+        OrderItem.objects.create(order=order, product=self.tea, quantity=quantity, unit_price=unit_price)
+        Order.objects.filter(pk=order.pk).update(order_date=timezone.now() - timedelta(days=days_ago))
+        return Order.objects.get(pk=order.pk)
+
+    def test_live_and_archived_orders_cancelled_excluded_from_spend(self):
+        archived = self.order('delivered', 1, '4.000', days_ago=800)
+        archive_batch([archived.id])
+        self.order('cancelled', 5, '2.000', days_ago=10)
+        latest = self.order('pending', 2, '1.500', days_ago=1)
+        other = User.objects.create_user('other', password='pw')
+
+        refresh_customer_summaries([self.customer.id, other.id, 999999])
+
+        profile = Profile.objects.get(user=self.customer)
+        self.assertEqual(
+            (profile.order_count, profile.lifetime_spend, profile.last_order_date),
+            (3, Decimal('7.000'), latest.order_date),
+        )
+        other_profile = Profile.objects.get(user=other)
+        self.assertEqual((other_profile.order_count, other_profile.lifetime_spend), (0, 0))
+        self.assertIsNone(other_profile.last_order_date)
+
+    def test_refreshed_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = self.order('pending', 2, '1.500')
+        self.assertEqual(Profile.objects.get(user=self.customer).lifetime_spend, Decimal('3.000'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            transition_orders([order.id], 'cancelled')
+        profile = Profile.objects.get(user=self.customer)
+        self.assertEqual((profile.order_count, profile.lifetime_spend), (1, 0))
+
+
+# ============================================
+# 📦 BULK ORDER TRANSITIONS
+# ============================================
+
+class TransitionOrdersTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user('boss', password='pw', is_staff=True)
+        customer = User.objects.create_user('shopper', password='pw')
+        self.pending = [Order.objects.create(user=customer) for _ in range(3)]
+        self.delivered = Order.objects.create(user=customer, status='delivered')
+
+    def test_allowed_move_writes_one_event_per_order(self):
+        ids = [order.id for order in self.pending]
+        summary = transition_orders(ids + [self.delivered.id, 999999], 'shipped', actor=self.staff)
+
+        self.assertEqual(summary['updated'], 3)
+        self.assertEqual(summary['from'], {'pending': 3})
+        self.assertEqual(summary['skipped'], {str(self.delivered.id): 'delivered', '999999': 'missing'})
+        self.assertEqual(set(Order.objects.filter(id__in=ids).values_list('status', flat=True)), {'shipped'})
+        self.assertEqual(
+            sorted(OrderEvent.objects.values_list('order_id', 'from_status', 'to_status', 'actor_id')),
+            [(pk, 'pending', 'shipped', self.staff.id) for pk in ids],
+        )
+
+    def test_refused_move_changes_nothing(self):
+        summary = transition_orders([self.delivered.id, self.pending[0].id], 'pending')
+
+        self.assertEqual(summary['updated'], 0)
+        self.assertEqual(Order.objects.get(pk=self.delivered.pk).status, 'delivered')
+        self.assertFalse(OrderEvent.objects.exists())
+
+    def test_cancelled_order_can_be_reopened(self):
+        order = self.pending[0]
+        transition_orders([order.id], 'cancelled')
+        self.assertEqual(transition_orders([order.id], 'pending')['updated'], 1)
+        self.assertEqual(
+            list(OrderEvent.objects.filter(order=order).order_by('id').values_list('to_status', flat=True)),
+            ['cancelled', 'pending'],
+        )
+
+    def test_unknown_status(self):
+        with self.assertRaises(ValueError):
+            transition_orders([self.pending[0].id], 'lost')
+
+
+# ============================================
+# 📥 ADMIN IMPORTS
+# ============================================
+
+class ProductImportTests(TestCase):
+    HEADERS = ['sku', 'upc', 'name', 'description', 'price', 'stock', 'brand', 'category']
+
+    def setUp(self):
+        self.brand = Brand.objects.create(name='Acme', slug='acme')
+        self.old = Product.objects.create(sku='OLD', upc='111', name='Old', price='1.000', stock=1, brand=self.brand)
+        self.same = Product.objects.create(sku='SAME', upc='222', name='Same', price='1.000', stock=1)
+
+    def run_import(self, *rows):
+        return ProductResource().import_data(tablib.Dataset(*rows, headers=self.HEADERS))
+
+    def test_create_update_and_skip_unchanged(self):
+        result = self.run_import(
+            ['NEW', '333', 'New', 'Fresh', '2.000', 5, 'acme', ''],
+            ['OLD', '111', 'Old', '', '1.500', 1, 'acme', ''],
+            ['SAME', '222', 'Same', '', '1.000', 1, '', ''],
+        )
+
+        self.assertFalse(result.has_errors() or result.has_validation_errors())
+        self.assertEqual((result.totals['new'], result.totals['update'], result.totals['skip']), (1, 1, 1))
+        self.assertEqual(
+            sorted(Product.objects.values_list('sku', 'upc', 'price', 'brand__slug')),
+            [('NEW', '333', Decimal('2.000'), 'acme'), ('OLD', '111', Decimal('1.500'), 'acme'),
+             ('SAME', '222', Decimal('1.000'), None)],
+        )
+
+    def test_unknown_slug_is_a_row_error(self):
+        result = self.run_import(['NEW', '333', 'New', '', '2.000', 5, 'nope', ''])
+        [row] = result.invalid_rows
+        self.assertEqual(row.error_dict, {'brand': ["Unknown brand slug: 'nope'"]})
+        self.assertFalse(Product.objects.filter(sku='NEW').exists())
+
+    def test_taken_sku_or_upc_is_a_row_error(self):
+        result = self.run_import(
+            ['NEW1', '333', 'New', '', '2.000', 5, '', ''],
+            ['NEW2', '333', 'Same UPC', '', '2.000', 5, '', ''],   # earlier row's UPC
+            ['NEW1', '444', 'Same SKU', '', '2.000', 5, '', ''],   # earlier row's SKU
+            ['NEW3', 111, 'Taken UPC', '', '2.000', 5, '', ''],    # OLD's UPC (read as a number)
+            ['NEW4', '555', 'Fine', '', '2.000', 5, '', ''],
+        )
+
+        self.assertFalse(result.has_errors())
+        self.assertEqual({row.number: row.error_dict for row in result.invalid_rows}, {
+            2: {'upc': ["'333' is already used in row 1 of this file."]},
+            3: {'sku': ["'NEW1' is already used in row 1 of this file."]},
+            4: {'upc': ["'111' already belongs to another product."]},
+        })
+        # The valid rows still made it in (one batch, no IntegrityError)
+        self.assertEqual(set(Product.objects.values_list('sku', flat=True)), {'OLD', 'SAME', 'NEW1', 'NEW4'})
+
+
+# ============================================
+# 📟 BARCODE LOOKUPS
+# ============================================
+
+class BarcodeIndexTests(TestCase):
+    def setUp(self):
+        self.rice = Product.objects.create(sku='RICE5', upc='6281000000011', name='Rice 5kg', price='2.750', stock=9)
+        self.tea = Product.objects.create(sku='TEA100', upc='6281000000028', name='Tea', price='1.250', stock=3)
+        self.index = BarcodeIndex(refresh_seconds=0)
+
+    def test_lookup_by_upc_or_sku(self):
+        self.assertEqual(self.index.get('6281000000011'), {
+            'id': self.rice.id, 'sku': 'RICE5', 'upc': '6281000000011', 'name': 'Rice 5kg',
+            'price': '2.750', 'stock': 9,
+        })
+        self.assertEqual(self.index.get(' TEA100 ')['id'], self.tea.id)
+        self.assertIsNone(self.index.get('0000000000000'))
+
+    def test_edit_is_patched_in_without_a_reload(self):
+        self.index.get('RICE5')
+        self.rice.upc, self.rice.price = '6281000000035', '3.000'
+        self.rice.save()
+
+        # Version check + the changed rows only
+        with self.assertNumQueries(2):
+            self.assertEqual(self.index.get('6281000000035')['price'], '3.000')
+        self.assertIsNone(self.index.get('6281000000011'))
+        self.assertEqual(self.index.get('TEA100')['id'], self.tea.id)
+
+    def test_deleted_product_is_gone(self):
+        self.index.get('RICE5')
+        self.rice.delete()
+        self.assertIsNone(self.index.get('RICE5'))
+        self.assertIsNone(self.index.get('6281000000011'))
+        self.assertEqual(self.index.get('TEA100')['id'], self.tea.id)
+
+    def test_basket_endpoint(self):
+        self.addCleanup(setattr, barcode_index, 'refresh_seconds', barcode_index.refresh_seconds)
+        barcode_index.refresh_seconds = 0
+        barcode_index.load()
+
+        response = self.client.post(
+            reverse('product_lookup_batch'),
+            json.dumps({'codes': ['6281000000011', 'TEA100', 'NOPE', '6281000000011']}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        basket = response.json()
+        self.assertEqual(
+            [(item['sku'], item['quantity'], item['line_total']) for item in basket['items']],
+            [('RICE5', 2, '5.500'), ('TEA100', 1, '1.250')],
+        )
+        self.assertEqual((basket['missing'], basket['total']), (['NOPE'], '6.750'))
+
+        bad = self.client.post(reverse('product_lookup_batch'), json.dumps({'codes': [1]}),
+                               content_type='application/json')
+        self.assertEqual(bad.status_code, 400)
+
+
+# ============================================
+# 🔤 TYPEAHEAD SEARCH
+# ============================================
+
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        self.addCleanup(setattr, autocomplete, 'refresh_seconds', autocomplete.refresh_seconds)
+        autocomplete.refresh_seconds = 0
+
+    def test_brand_rename_and_delete_rebuild_the_index(self):
+        brand = Brand.objects.create(name='Almarai', slug='almarai')
+        Product.objects.create(sku='SKU1', upc='0001', name='Fresh Milk', price='1.000', stock=1, brand=brand)
+        self.assertEqual(autocomplete.suggest('alma')['brands'], [{'name': 'Almarai', 'slug': 'almarai'}])
+
+        Brand.objects.filter(pk=brand.pk).update(name='Nadec', slug='nadec')
+        self.assertEqual(autocomplete.suggest('alma'), {'products': [], 'brands': []})
+        self.assertEqual(autocomplete.suggest('nadec')['products'][0]['sku'], 'SKU1')
+
+        Product.objects.update(brand=None)
+        Brand.objects.all().delete()
+        self.assertEqual(autocomplete.suggest('nadec'), {'products': [], 'brands': []})
+
+
+# ============================================
+# ⏳ WORK BATCHED UNTIL COMMIT
+# ============================================
+
+class OnCommitBatchedTests(TestCase):
+    def test_one_flush_per_transaction_with_every_item(self):
+        flushed = []
+        with self.captureOnCommitCallbacks(execute=True):
+            for item in (1, 2, 1):
+                on_commit_batched(flushed.append, item)
+            try:
+                with transaction.atomic():
+                    on_commit_batched(flushed.append, 3)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        # 3 was rolled back with its savepoint: flushed anyway, never lost
+        self.assertEqual(flushed, [{1, 2, 3}])
+
+        # Nothing pending: the next transaction starts clean
+        with self.captureOnCommitCallbacks(execute=True):
+            on_commit_batched(flushed.append, 4)
+        self.assertEqual(flushed, [{1, 2, 3}, {4}])
+
+
+# ============================================
+# 📈 SALES ROLLUPS
+# ============================================
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.brand = Brand.objects.create(name='Acme', slug='acme')
+        self.category = Category.objects.create(name='Tea', slug='tea')
+        self.tea = Product.objects.create(sku='TEA', upc='0001', name='Tea', price='2.000', stock=50,
+                                          brand=self.brand, category=self.category)
+        self.user = User.objects.create_user('shopper', password='pw')
+
+    def totals(self):
+        """(units, revenue, cancelled_units, cancelled_revenue) of every rollup table, for today."""
+        day = order_day(timezone.now())
+        columns = ('units', 'revenue', 'cancelled_units', 'cancelled_revenue')
+        return {
+            model.__name__: [tuple(map(float, row)) for row in model.objects.filter(day=day).values_list(*columns)]
+            for model in (ProductSalesDaily, BrandSalesDaily, CategorySalesDaily)
+        }
+
+    def expect(self, units, revenue, cancelled_units=0, cancelled_revenue=0):
+        row = [(units, revenue, cancelled_units, cancelled_revenue)]
+        self.assertEqual(self.totals(), dict.fromkeys(('ProductSalesDaily', 'BrandSalesDaily', 'CategorySalesDaily'), row))
+
+    def test_new_order_is_counted_at_its_unit_price(self):
+        order = Order.objects.create(user=self.user)
+        OrderItem.objects.create(order=order, product=self.tea, quantity=3)
+        self.expect(3, 6)
+
+        # A later price change doesn't reprice what was sold
+        self.tea.price = '5.000'
+        self.tea.save()
+        OrderItem.objects.create(order=order, product=self.tea, quantity=1)
+        self.expect(4, 11)
+
+    def test_cancelling_moves_totals_and_back(self):
+        order = Order.objects.create(user=self.user)
+        OrderItem.objects.create(order=order, product=self.tea, quantity=3)
+
+        order.status = 'cancelled'
+        order.save()
+        self.expect(0, 0, 3, 6)
+
+        order.status = 'pending'
+        order.save()
+        self.expect(3, 6)
+
+    def test_bulk_transition_moves_totals(self):
+        order = Order.objects.create(user=self.user)
+        OrderItem.objects.create(order=order, product=self.tea, quantity=3)
+
+        transition_orders([order.id], 'cancelled')
+        self.expect(0, 0, 3, 6)
+        transition_orders([order.id], 'pending')
+        self.expect(3, 6)
+
+    def test_deleting_an_order_takes_its_lines_away(self):
+        kept, gone = Order.objects.create(user=self.user), Order.objects.create(user=self.user)
+        OrderItem.objects.create(order=kept, product=self.tea, quantity=1)
+        OrderItem.objects.create(order=gone, product=self.tea, quantity=3)
+
+        gone.delete()
+        self.expect(1, 2)
+
+    def test_catch_up_counts_unsaved_orders_once(self):
+        counted = Order.objects.create(user=self.user)
+        OrderItem.objects.create(order=counted, product=self.tea, quantity=1)
+        # Written without the ORM's save(): no signals, not rolled up yet
+        [imported] = Order.objects.bulk_create([Order(user=self.user)])
+        OrderItem.objects.bulk_create([OrderItem(order=imported, product=self.tea, quantity=2, unit_price='3.000')])
+        self.expect(1, 2)
+
+        for _ in range(2):
+            call_command('update_sales_rollups', stdout=io.StringIO())
+            self.expect(3, 8)
+        self.assertTrue(Order.objects.get(pk=imported.pk).rolled_up)
+        self.assertEqual(RollupWatermark.objects.get().last_order_id, imported.id)
+
+        # The same numbers as recomputing the day from scratch
+        rebuild_day(order_day(imported.order_date))
+        self.expect(3, 8)
+
+    def test_archived_lines_of_a_deleted_product_still_count(self):
+        brand, category = self.brand, self.category
+        self.tea.delete()
+        gone, kept = Product.objects.bulk_create([
+            Product(sku=f'SKU{i}', upc=f'000{i}', name=f'Tea {i}', price='1.000', stock=5,
+                    brand=brand, category=category)
+            for i in (1, 2)
+        ])
+        order = Order.objects.create(user=self.user, status='delivered')
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=gone, quantity=2, unit_price=gone.price),
+            OrderItem(order=order, product=kept, quantity=3, unit_price=kept.price),
+        ])
+        archive_batch([order.id])
+        gone.delete()
+
+        rebuild_day(order_day(order.order_date))
+
+        self.assertEqual(list(ProductSalesDaily.objects.values_list('product_id', 'units')), [(kept.id, 3)])
+        for model, field, pk in ((BrandSalesDaily, 'brand_id', brand.id), (CategorySalesDaily, 'category_id', category.id)):
+            with self.subTest(model=model.__name__):
+                self.assertEqual(dict(model.objects.values_list(field, 'units')), {pk: 3, None: 2})
+
+
+# ============================================
+# 🖼 MEDIA FILES
+# ============================================
+
+class MediaTestCase(TestCase):
+    """Runs every test on an empty temporary MEDIA_ROOT."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=self.root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def write(self, name, content=b'picture', age=0):
+        """Put a file at ``MEDIA_ROOT/name``, last modified ``age`` seconds ago."""
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as handle:
+            handle.write(content)
+        when = time.time() - age
+        os.utime(path, (when, when))
+        return path
+
+    def upload(self, name, content, age=0):
+        """Save through the default (content-addressed) storage, like a form upload."""
+        name = default_storage.save(name, ContentFile(content))
+        when = time.time() - age
+        os.utime(default_storage.path(name), (when, when))
+        return name
+
+    def product(self, n, image):
+        return Product.objects.create(sku=f'SKU{n}', upc=f'000{n}', name=f'Product {n}', price='1.000',
+                                      stock=1, image=image)
+
+
+class MediaGarbageTests(MediaTestCase):
+    def test_shared_file_survives_while_referenced(self):
+        name = self.upload('products/rice.png', b'rice', age=7200)
+        self.assertEqual(self.upload('products/other-name.png', b'rice', age=7200), name)
+        first, second = self.product(1, name), self.product(2, name)
+        self.product(3, self.upload('products/tea.png', b'tea', age=7200))
+
+        first.delete()
+        report = collect_garbage()
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(report['orphan_files'], 0)
+
+        second.delete()
+        report = collect_garbage()
+        self.assertFalse(default_storage.exists(name))
+        self.assertEqual(report['orphan_files'], 1)
+
+    def test_old_orphans_go_recent_ones_stay(self):
+        self.product(1, self.upload('products/kept.png', b'kept', age=7200))
+        old = self.write('products/aa/old.png', age=7200)
+        new = self.write('products/bb/new.png', age=60)
+
+        report = collect_garbage(min_age=3600)
+
+        self.assertFalse(os.path.exists(old))
+        self.assertFalse(os.path.isdir(os.path.dirname(old)))   # empty shard removed too
+        self.assertTrue(os.path.exists(new))
+        self.assertEqual((report['orphan_files'], report['recent_files']), (1, 1))
+
+    def test_variants_of_live_content_are_kept(self):
+        name = self.upload('products/rice.png', b'rice', age=7200)
+        self.product(1, name)
+        live = self.write(f'_variants/{name_digest(name)}.webp', age=7200)
+        dead = self.write(f'_variants/{"0" * 16}.webp', age=7200)
+
+        report = collect_garbage()
+
+        self.assertTrue(os.path.exists(live))
+        self.assertFalse(os.path.exists(dead))
+        self.assertEqual(report['variants_deleted'], 1)
+
+    def test_rehash_repoints_rows_to_content_names(self):
+        legacy = self.write('products/legacy.png', b'same', age=7200)
+        self.write('products/copy.png', b'same', age=7200)
+        first, second = self.product(1, 'products/legacy.png'), self.product(2, 'products/copy.png')
+
+        report = collect_garbage(rehash_files=True)
+
+        target = content_name('products/legacy.png', hashlib.sha256(b'same').hexdigest())
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.image.name, second.image.name), (target, target))
+        self.assertEqual((report['rehashed_files'], report['rehashed_rows']), (2, 2))
+        self.assertTrue(default_storage.exists(target))
+        self.assertFalse(os.path.exists(legacy))   # old name: an orphan now
+
+    def test_refuses_to_empty_the_media_without_any_reference(self):
+        path = self.write('products/aa/picture.png', age=7200)
+        with self.assertRaises(MediaError):
+            collect_garbage()
+        self.assertTrue(os.path.exists(path))
+
+        self.assertEqual(collect_garbage(dry_run=True)['orphan_files'], 1)
+        self.assertTrue(os.path.exists(path))
+
+        collect_garbage(allow_empty=True)
+        self.assertFalse(os.path.exists(path))
+
+
+class MediaServeTests(MediaTestCase):
+    CONTENT = b'0123456789abcdefghijklmnopqrstuvwxyz'
+
+    def setUp(self):
+        super().setUp()
+        self.name = self.upload('products/rice.png', self.CONTENT)
+        self.plain = f'/media/{self.name}'
+        self.hashed = default_storage.url(self.name)
+
+    def get(self, url, **headers):
+        response = self.client.get(url, headers=headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    def test_whole_file_then_not_modified(self):
+        response, body = self.get(self.plain)
+        self.assertEqual((response.status_code, body), (200, self.CONTENT))
+        self.assertEqual(response['Cache-Control'], REVALIDATE)
+        self.assertEqual(response['Content-Length'], str(len(self.CONTENT)))
+
+        response, body = self.get(self.plain, if_none_match=response['ETag'])
+        self.assertEqual((response.status_code, body), (304, b''))
+
+    def test_hashed_url_is_immutable_and_a_stale_digest_redirects(self):
+        self.assertNotEqual(self.hashed, self.plain)
+        response, body = self.get(self.hashed)
+        self.assertEqual((response.status_code, body), (200, self.CONTENT))
+        self.assertEqual(response['Cache-Control'], IMMUTABLE)
+
+        response, _body = self.get(f'/media/{"0" * 16}/{self.name}')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], self.hashed)
+
+    def test_ranges(self):
+        size = len(self.CONTENT)
+        for header, content_range, expected in (
+            ('bytes=10-19', f'bytes 10-19/{size}', self.CONTENT[10:20]),
+            ('bytes=-5', f'bytes {size - 5}-{size - 1}/{size}', self.CONTENT[-5:]),
+            ('bytes=30-', f'bytes 30-{size - 1}/{size}', self.CONTENT[30:]),
+        ):
+            with self.subTest(range=header):
+                response, body = self.get(self.plain, range=header)
+                self.assertEqual((response.status_code, body), (206, expected))
+                self.assertEqual(response['Content-Range'], content_range)
+                self.assertEqual(response['Content-Length'], str(len(expected)))
+
+        response, _body = self.get(self.plain, range=f'bytes={size}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{size}')
+
+    def test_if_range(self):
+        etag = self.get(self.plain)[0]['ETag']
+        response, body = self.get(self.plain, range='bytes=10-19', if_range=etag)
+        self.assertEqual((response.status_code, body), (206, self.CONTENT[10:20]))
+
+        # The file changed since the client got its first part: send it all
+        response, body = self.get(self.plain, range='bytes=10-19', if_range='"0123456789abcdef"')
+        self.assertEqual((response.status_code, body), (200, self.CONTENT))
+
+    def test_no_way_out_of_media_root(self):
+        secret = f'{os.path.basename(self.root)}-secret.txt'   # next to MEDIA_ROOT
+        self.write(f'../{secret}')
+        self.addCleanup(os.remove, os.path.join(os.path.dirname(self.root), secret))
+        self.write(f'_variants/{"0" * 16}.webp')
+        for url in (f'/media/../{secret}', f'/media/products/../../{secret}', f'/media/{"0" * 16}/../{secret}',
+                    f'/media/_variants/{"0" * 16}.webp', '/media/.hidden'):
+            with self.subTest(url=url):
+                self.assertEqual(self.get(url)[0].status_code, 404)
+
+
+# ============================================
+# 📈 REQUEST METRICS
+# ============================================
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user('boss', password='pw', is_staff=True)
+
+    def test_prometheus_histogram_lines(self):
+        registry = Registry()
+        registry.observe('home', {'request_queries': 3})
+        registry.observe('home', {'request_queries': 30})
+        lines = render_prometheus(registry.snapshot()).splitlines()
+
+        self.assertIn('# TYPE ecom_request_queries histogram', lines)
+        start = lines.index('ecom_request_queries_bucket{view="home",le="0"} 0')
+        self.assertEqual(lines[start + 3:start + 14], [
+            'ecom_request_queries_bucket{view="home",le="5"} 1',
+            'ecom_request_queries_bucket{view="home",le="10"} 1',
+            'ecom_request_queries_bucket{view="home",le="20"} 1',
+            'ecom_request_queries_bucket{view="home",le="50"} 2',
+            'ecom_request_queries_bucket{view="home",le="100"} 2',
+            'ecom_request_queries_bucket{view="home",le="200"} 2',
+            'ecom_request_queries_bucket{view="home",le="500"} 2',
+            'ecom_request_queries_bucket{view="home",le="+Inf"} 2',
+            'ecom_request_queries_sum{view="home"} 33',
+            'ecom_request_queries_count{view="home"} 2',
+            '# HELP ecom_request_template_seconds Template render time',
+        ])
+
+    def test_metrics_page_counts_requests(self):
+        self.client.get(reverse('home'))
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response.content.decode(), r'ecom_request_duration_seconds_count\{view="home"\} [1-9]')
+
+    def test_query_count_in_server_timing_only_for_staff(self):
+        url = reverse('sales_dashboard')
+        header = self.client.get(reverse('home'))['Server-Timing']
+        self.assertRegex(header, r'^app;dur=[\d.]+, db;dur=[\d.]+, tpl;dur=[\d.]+$')
+
+        with override_settings(DEBUG=True):
+            self.assertIn(' queries"', self.client.get(reverse('home'))['Server-Timing'])
+
+        self.client.force_login(self.staff)
+        self.assertRegex(self.client.get(url)['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries"')
+
+
+# ============================================
+# 🔬 PROFILE DUMPS
+# ============================================
+
+class ProfileDumpTests(TestCase):
+    def test_only_the_newest_profile_keep_dumps_stay(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        _result, profiler = profile_call(sum, [1, 2])
+        for keep, left in ((2, 2), (1, 1), (0, 0)):
+            with self.subTest(keep=keep), override_settings(PROFILE_DIR=directory, PROFILE_KEEP=keep):
+                for _ in range(3):
+                    save_profile(profiler, 'store.views.home')
+                self.assertEqual(len(os.listdir(directory)), left)
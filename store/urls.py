@@ -1,8 +1,13 @@
 # store/urls.py
 
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path
 from . import views  # 👀 import views from the same app
+from . import async_views
+
+# ⚡ Catalog pages: async versions under ASGI, regular ones under WSGI
+catalog = async_views if settings.ASYNC_CATALOG_VIEWS else views
 
 
 urlpatterns = [
@@ -10,14 +15,15 @@ urlpatterns = [
     path('admin/', admin.site.urls),
 
     # 🌍 Public pages
-    path('', views.home, name='home'),
-    path('products/', views.product_list, name='product_list'),
-    path('products/<int:product_id>/', views.product_detail, name='product_detail'),
+    path('', catalog.home, name='home'),
+    path('products/', catalog.product_list, name='product_list'),
+    path('products/<int:product_id>/', catalog.product_detail, name='product_detail'),
 
 
 
     # 📦 Orders (assignment / demo style)
     path('orders/', views.order_list, name='order_list'),
+    path('orders/bulk-status/', views.order_bulk_status, name='order_bulk_status'),
     path('orders/<int:order_id>/', views.order_detail, name='order_detail'),
     path('orders/<int:order_id>/status/', views.order_update_status, name='order_update_status'),
     path('orders/<int:order_id>/delete/', views.order_delete, name='order_delete'),
@@ -51,11 +57,27 @@ urlpatterns = [
     path('products/create/', views.product_create, name='product_create'),
     path("products/delete/", views.product_delete_list, name="product_delete_list"),
     path("products/delete/<int:product_id>/",views.delete_product, name="delete_product"),
+    path("products/delete/bulk/", views.product_bulk_delete, name="product_bulk_delete"),
     path('products/<int:pk>/edit/', views.product_edit, name='product_edit'),
 
-     path('brand/<slug:slug>/', views.brand_products, name='brand_products'),
-     path("category/<slug:slug>/", views.category_products, name="category_products"),
+     path('brand/<slug:slug>/', catalog.brand_products, name='brand_products'),
+     path("category/<slug:slug>/", catalog.category_products, name="category_products"),
      path("products/bulk-upload/", views.bulk_upload, name="bulk_upload"),
+
+    # 📟 POS scanner lookups (JSON)
+    path('api/lookup/', views.product_lookup, name='product_lookup'),
+    path('api/lookup/batch/', views.product_lookup_batch, name='product_lookup_batch'),
+
+    # 📈 Staff reports
+    path('staff/sales/', views.sales_dashboard, name='sales_dashboard'),
+    path('staff/export/<str:dataset>/', views.export_data, name='export_data'),
+    path('metrics', views.metrics, name='metrics'),
+    path('staff/slow-queries/', views.slow_queries, name='slow_queries'),
+    path('staff/profiles/', views.profile_list, name='profile_list'),
+    path('staff/profiles/<str:name>', views.profile_download, name='profile_download'),
+
+    # 🔤 Header typeahead (JSON)
+    path('api/autocomplete/', views.product_autocomplete, name='product_autocomplete'),
      
 
 
@@ -1,25 +1,67 @@
     # store/views.py
 
-from cProfile import Profile
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import HttpResponse  # (optional: currently not used)
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse,
+)
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required,user_passes_test
 from django.contrib import messages
 from django.contrib.auth.models import User
 from django.contrib.admin.views.decorators import staff_member_required
-import csv, zipfile, os
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import timedelta
+import csv, json, zipfile, os
 from django.core.files.base import ContentFile
 from .forms import ProductForm, ProfileForm, RegistrationForm
 from .models import Product, Cart, CartItem, Order,Profile,Brand,Category
+from .models import BrandSalesDaily, CategorySalesDaily, ProductSalesDaily
+from . import archive, media
+from .bulk import delete_products, transition_orders
+from .catalog import barcode_index
+from .exports import DATASETS, FORMATS, export_lines
+from .metrics import render_prometheus
+from . import profiling, slowlog
+from .orders import attach_first_items, keyset_page, status_summary, with_totals
+from .rollups import day_bounds
+from .routers import catalog_view
+from .search import autocomplete
 
 
 # 🏠 HOME & PRODUCT / ORDER LIST VIEWS
 # -----------------------------------
 
+def _featured_sections(key, groups, size=15):
+    """
+    🔹 Up to ``size`` products for each brand / category in ``groups``,
+    fetched in ONE query (ROW_NUMBER() per group) instead of one per group.
+    Returns ``[{key: group, "products": [...]}]`` for groups with products.
+    """
+    by_group = {group.id: [] for group in groups}
+    ranked = (
+        Product.objects
+        .filter(**{f'{key}__in': list(by_group)})
+        .select_related('brand')
+        .annotate(_rank=Window(RowNumber(), partition_by=F(f'{key}_id'), order_by=F('id').asc()))
+        .filter(_rank__lte=size)
+        .order_by(f'{key}_id', 'id')
+    )
+    for product in ranked:
+        by_group[getattr(product, f'{key}_id')].append(product)
+    return [{key: group, 'products': by_group[group.id]} for group in groups if by_group[group.id]]
+
+
+@catalog_view
 def home(request):
-    # main product list for the horizontal row
-    products = Product.objects.all()
+    # main product list for the horizontal row (the template shows 10)
+    products = Product.objects.select_related('brand')[:10]
 
     # 🔹 Get recently viewed IDs from session
     rv_ids = request.session.get('recently_viewed', [])
@@ -34,25 +76,9 @@ def home(request):
         key=lambda p: id_order.get(p.id, 999)
     )
 
-    # 🔹 FEATURED BRANDS (pick first few brands that actually exist)
-    brand_sections = []
-    for brand in Brand.objects.all()[3:6]:   # change 3 to however many sections you want
-        brand_products = Product.objects.filter(brand=brand)[:15]
-        if brand_products:
-            brand_sections.append({
-                "brand": brand,
-                "products": brand_products,
-            })
-
-    # 🔹 FEATURED CATEGORIES (same idea)
-    category_sections = []
-    for category in Category.objects.all()[2:6]:
-        category_products = Product.objects.filter(category=category)[:15]
-        if category_products:
-            category_sections.append({
-                "category": category,
-                "products": category_products,
-            })
+    # 🔹 FEATURED BRANDS / CATEGORIES (pick a few that actually have products)
+    brand_sections = _featured_sections('brand', list(Brand.objects.all()[3:6]))
+    category_sections = _featured_sections('category', list(Category.objects.all()[2:6]))
 
     context = {
         'products': products,
@@ -66,12 +92,13 @@ def home(request):
 
 
 
+@catalog_view
 def product_list(request):
     """
     🛒 Product list page: grid of all products with brand & category filters.
     Filters are linked: each list only shows options that have products.
     """
-    products = Product.objects.all()
+    products = Product.objects.select_related('brand')
 
     brand_slug = request.GET.get("brand")
     category_slug = request.GET.get("category")
@@ -102,23 +129,79 @@ def product_list(request):
 
 
 
+ORDERS_PER_PAGE = 50
+
+
+def _query_date(request, name):
+    """``?<name>=YYYY-MM-DD`` as a date; None when missing or not a real day (e.g. 2024-02-30)."""
+    try:
+        return parse_date(request.GET.get(name) or '')
+    except ValueError:
+        return None
+
+
+@staff_member_required
 def order_list(request):
     """
-    📦 Admin-style order list: shows all orders with items (for assignment demo).
+    📦 Staff order console:
+    - filters: ?status=, ?from= / ?to= (dates), ?user= (username)
+    - summary header: orders & revenue per status (one grouped query)
+    - keyset pagination (?after= / ?before= cursors), so memory and query
+      cost stay at one page however long the order history gets
     """
-    orders = Order.objects.all().prefetch_related('items__product')
-    return render(request, 'store/order_list.html', {'orders': orders})
+    status = request.GET.get('status') or ''
+    username = (request.GET.get('user') or '').strip()
+    date_from = _query_date(request, 'from')
+    date_to = _query_date(request, 'to')
+
+    orders = Order.objects.all()
+    if status:
+        orders = orders.filter(status=status)
+    if username:
+        orders = orders.filter(user__username=username)
+    if date_from:
+        orders = orders.filter(order_date__gte=day_bounds(date_from)[0])
+    if date_to:
+        orders = orders.filter(order_date__lt=day_bounds(date_to)[1])
+
+    page, next_cursor, prev_cursor = keyset_page(
+        with_totals(orders.select_related('user')),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        size=ORDERS_PER_PAGE,
+    )
+
+    # Filters without the cursor, for the pagination links
+    filters = request.GET.copy()
+    filters.pop('after', None)
+    filters.pop('before', None)
+
+    return render(request, 'store/order_list.html', {
+        'orders': page,
+        'summary': status_summary(orders),
+        'status_choices': Order.STATUS_CHOICES,
+        'current_status': status,
+        'current_user': username,
+        'date_from': date_from,
+        'date_to': date_to,
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor,
+        'filter_query': filters.urlencode(),
+    })
 
 
 def order_detail(request, order_id):
     """
     📄 Order detail page: shows one order and its items.
     """
-    order = get_object_or_404(Order, id=order_id)
-    items = order.items.select_related('product')
+    order = archive.get_order(order_id)   # live or archived
+    items = list(archive.order_items(order))
     return render(request, 'store/order_detail.html', {
         'order': order,
         'items': items,
+        # From the lines already loaded (order.total_amount would re-query them)
+        'total_items': sum(item.quantity for item in items),
+        'total_amount': sum(item.line_total for item in items),
     })
 
 
@@ -191,29 +274,43 @@ def logout_view(request):
 def dashboard_view(request):
     """
     📊 Simple dashboard:
-    - Shows how many orders the current user has
+    - Shows the user's order summary (kept on Profile, no counting)
     - Lists the 5 most recent orders
     """
-    user_orders = Order.objects.filter(user=request.user)
+    profile = Profile.objects.filter(user=request.user).first()
+    recent_orders, _older, _newer = archive.order_history(request.user, size=5)
     context = {
-        'order_count': user_orders.count(),
-        'recent_orders': user_orders.order_by('-order_date')[:15],
+        'order_count': profile.order_count if profile else 0,
+        'lifetime_spend': profile.lifetime_spend if profile else 0,
+        'last_order_date': profile.last_order_date if profile else None,
+        'recent_orders': recent_orders,
     }
     return render(request, 'store/dashboard.html', context)
 
 
+MY_ORDERS_PER_PAGE = 20
+
+
 @login_required
 def my_orders(request):
     """
     🧾 Protected order history:
     - Only shows orders that belong to the logged-in user.
+    - Paginated newest first with ?after= / ?before= cursors, so accounts
+      with thousands of orders load one page at a time.
+    - Archived orders are included (store/archive.py).
     """
-    orders = (
-        Order.objects
-        .filter(user=request.user)
-        .prefetch_related('items__product')
+    orders, next_cursor, prev_cursor = archive.order_history(
+        request.user,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        size=MY_ORDERS_PER_PAGE,
     )
-    return render(request, 'store/my_orders.html', {'orders': orders})
+    return render(request, 'store/my_orders.html', {
+        'orders': attach_first_items(orders),
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor,
+    })
 
 
 # 🛒 CART HELPERS & VIEWS (DB-BACKED CART)
@@ -230,6 +327,7 @@ def _get_user_cart(user):
 
 
 @login_required
+@transaction.atomic   # one write transaction (BEGIN IMMEDIATE in production)
 def add_to_cart(request, product_id):
     """
     ➕ Add to Cart (Function-Based View):
@@ -292,8 +390,8 @@ def cart_detail(request):
             'total_amount': 0,
         })
 
-    items = cart.items.select_related('product')
-    total = cart.total_amount
+    items = list(cart.items.select_related('product'))
+    total = sum(item.line_total for item in items)   # no extra query per line
 
     return render(request, 'store/cart_detail.html', {
         'cart': cart,
@@ -303,6 +401,7 @@ def cart_detail(request):
 
 
 @login_required
+@transaction.atomic
 def update_cart_item(request, item_id):
     """
     ✏️ Update cart item quantity:
@@ -335,6 +434,7 @@ def update_cart_item(request, item_id):
 
 
 @login_required
+@transaction.atomic
 def remove_cart_item(request, item_id):
     """
     🗑 Remove a single item from the cart.
@@ -411,12 +511,17 @@ def session_cart_detail(request):
     """
     cart = _get_session_cart(request)
 
+    # All products of the cart in one query; deleted ones are just skipped
+    products = Product.objects.in_bulk([int(pid) for pid in cart])
+
     # Build a list of item objects for template
     items = []
     total_amount = 0
 
     for pid, quantity in cart.items():
-        product = get_object_or_404(Product, id=int(pid))
+        product = products.get(int(pid))
+        if product is None:
+            continue
         line_total = product.price * quantity
         total_amount += line_total
         items.append({
@@ -482,6 +587,7 @@ def session_remove_from_cart(request, product_id):
 
 
 
+@catalog_view
 def product_detail(request, product_id):
     # Current product
     product = get_object_or_404(Product, id=product_id)
@@ -578,10 +684,15 @@ def order_update_status(request, order_id):
 
     if request.method == 'POST':
         new_status = request.POST.get('status')
-        if new_status in dict(Order.STATUS_CHOICES):
-            order.status = new_status
-            order.save()
-            messages.success(request, "Order status updated.")
+        if new_status == order.status:
+            messages.info(request, "Order status unchanged.")
+        elif new_status in dict(Order.STATUS_CHOICES):
+            # Same rules + event log as the bulk action
+            summary = transition_orders([order.id], new_status, actor=request.user)
+            if summary['updated']:
+                messages.success(request, "Order status updated.")
+            else:
+                messages.error(request, f"Can't move a {order.get_status_display().lower()} order to {new_status}.")
         else:
             messages.error(request, "Invalid status.")
         return redirect('order_detail', order_id=order.id)
@@ -594,7 +705,7 @@ def order_delete(request, order_id):
     """
     🗑 Staff-only: delete an order.
     """
-    order = get_object_or_404(Order, id=order_id)
+    order = get_object_or_404(with_totals(Order.objects.select_related('user')), id=order_id)
 
     if request.method == 'POST':
         order.delete()
@@ -637,12 +748,94 @@ def product_delete_list(request):
     return render(request, "store/product_delete_list.html", {"products": products})
 
 @staff_member_required
+@require_POST
 def delete_product(request, product_id):
     product = get_object_or_404(Product, id=product_id)
     product.delete()
     messages.success(request, "Product deleted successfully.")
     return redirect('product_delete_list')
 
+
+# ============================================
+# 📦 BULK STAFF ACTIONS
+# ============================================
+
+MAX_BULK_IDS = 5000
+
+
+def _bulk_payload(request, ids_key):
+    """
+    Read ``ids_key`` (+ the rest of the body) from a JSON body or a regular
+    form post. Returns ``(ids, data, wants_json)``.
+    """
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+        ids = data.get(ids_key) or []
+        return (ids if isinstance(ids, list) else []), data, True
+    return request.POST.getlist(ids_key), request.POST, False
+
+
+@staff_member_required
+@require_POST
+def order_bulk_status(request):
+    """
+    🚚 Move many orders to one status.
+    Form post (order console checkboxes) or
+    POST /orders/bulk-status/  body: {"order_ids": [1, 2, 3], "status": "shipped"}
+    Only allowed transitions are applied; the rest are reported as skipped.
+    """
+    ids, data, wants_json = _bulk_payload(request, 'order_ids')
+    status = data.get('status')
+
+    error = None
+    if status not in dict(Order.STATUS_CHOICES):
+        error = 'invalid status'
+    elif len(ids) > MAX_BULK_IDS:
+        error = f'at most {MAX_BULK_IDS} orders per call'
+
+    if error:
+        if wants_json:
+            return JsonResponse({'error': error}, status=400)
+        messages.error(request, error.capitalize() + '.')
+        return redirect('order_list')
+
+    summary = transition_orders(ids, status, actor=request.user)
+    if wants_json:
+        return JsonResponse(summary)
+
+    messages.success(request, f"{summary['updated']} of {summary['requested']} orders moved to {status}.")
+    if summary['skipped']:
+        messages.warning(request, f"{len(summary['skipped'])} skipped (status doesn't allow it).")
+    return redirect('order_list')
+
+
+@staff_member_required
+@require_POST
+def product_bulk_delete(request):
+    """
+    🗑 Delete many products at once (chunked transactions).
+    Form post from the delete page or
+    POST /products/delete/bulk/  body: {"product_ids": [1, 2, 3]}
+    """
+    ids, _data, wants_json = _bulk_payload(request, 'product_ids')
+    if len(ids) > MAX_BULK_IDS:
+        if wants_json:
+            return JsonResponse({'error': f'at most {MAX_BULK_IDS} products per call'}, status=400)
+        messages.error(request, f"At most {MAX_BULK_IDS} products per call.")
+        return redirect('product_delete_list')
+
+    summary = delete_products(ids)
+    if wants_json:
+        return JsonResponse(summary)
+
+    messages.success(request, f"{summary['deleted']} products deleted.")
+    return redirect('product_delete_list')
+
 @staff_member_required
 def product_edit(request, pk):
     """
@@ -660,6 +853,7 @@ def product_edit(request, pk):
 
     return render(request, 'store/product_edit.html', {'form': form, 'product': product})
 
+@catalog_view
 def brand_products(request, slug):
     """
     🏷 Display all products for a specific brand.
@@ -675,6 +869,7 @@ def brand_products(request, slug):
         'products': products,
     })
 
+@catalog_view
 def category_products(request, slug):
     category = get_object_or_404(Category, slug=slug)
     products = Product.objects.filter(category=category)
@@ -788,5 +983,223 @@ def bulk_upload(request):
     return render(request, "store/bulk_upload.html")
 
 
+# ============================================
+# 📟 POS SCANNER LOOKUP (in-memory barcode index)
+# ============================================
+
+# Upper bound for one basket call, keeps a bad client from sending megabytes
+MAX_BASKET_CODES = 500
+
+
+@require_GET
+def product_lookup(request):
+    """
+    📟 Exact lookup by UPC (barcode) or SKU for checkout scanners.
+    GET /api/lookup/?code=6281007000000
+    Served from the per-worker hash map, no DB query on the hot path.
+    """
+    code = request.GET.get('code', '').strip()
+    if not code:
+        return JsonResponse({'error': 'code is required'}, status=400)
+
+    item = barcode_index.get(code)
+    if item is None:
+        return JsonResponse({'error': 'not found', 'code': code}, status=404)
+
+    return JsonResponse(item)
+
+
+@csrf_exempt   # read-only, called by scanner devices without a CSRF cookie
+@require_POST
+def product_lookup_batch(request):
+    """
+    🧺 Resolve a whole scanned basket in one call.
+    POST /api/lookup/batch/  body: {"codes": ["628...", "KW000425", "628..."]}
+    Repeated codes are counted as quantity.
+    """
+    try:
+        payload = json.loads(request.body or b'{}')
+        codes = payload.get('codes', [])
+    except (ValueError, AttributeError):
+        return JsonResponse({'error': 'invalid JSON body'}, status=400)
+
+    if not isinstance(codes, list) or not all(isinstance(c, str) for c in codes):
+        return JsonResponse({'error': 'codes must be a list of strings'}, status=400)
+
+    if len(codes) > MAX_BASKET_CODES:
+        return JsonResponse({'error': f'at most {MAX_BASKET_CODES} codes per call'}, status=400)
 
+    return JsonResponse(barcode_index.resolve_basket(codes))
 
+
+# ============================================
+# 🔤 TYPEAHEAD AUTOCOMPLETE (in-memory prefix index)
+# ============================================
+
+@require_GET
+def product_autocomplete(request):
+    """
+    🔤 Search-as-you-type suggestions for the header search box.
+    GET /api/autocomplete/?q=wat  →  {"products": [...], "brands": [...]}
+    Answered from the per-worker prefix index, no DB query per keystroke.
+    """
+    query = request.GET.get('q', '')[:100]
+    return JsonResponse(autocomplete.suggest(query))
+
+
+# ============================================
+# 📈 STAFF SALES DASHBOARD (reads rollups only)
+# ============================================
+
+ROLLUP_TOTALS = {
+    'units': Sum('units'),
+    'revenue': Sum('revenue'),
+    'cancelled_units': Sum('cancelled_units'),
+    'cancelled_revenue': Sum('cancelled_revenue'),
+}
+
+
+@staff_member_required
+def sales_dashboard(request):
+    """
+    📈 Revenue & units per day, brand, category and product.
+    Only the *SalesDaily tables are queried, never Order / OrderItem,
+    so years of history render as fast as a single month.
+    """
+    today = timezone.localdate()
+    date_to = _query_date(request, 'to') or today
+    date_from = _query_date(request, 'from') or date_to - timedelta(days=29)
+    in_range = {'day__gte': date_from, 'day__lte': date_to}
+
+    # Every sold line lands in exactly one category row (NULL = uncategorised),
+    # so the small category table is enough for totals and the daily series.
+    by_category = CategorySalesDaily.objects.filter(**in_range)
+
+    context = {
+        'date_from': date_from,
+        'date_to': date_to,
+        'totals': by_category.aggregate(**ROLLUP_TOTALS),
+        'by_day': by_category.values('day').annotate(**ROLLUP_TOTALS).order_by('-day'),
+        'top_brands': (
+            BrandSalesDaily.objects.filter(**in_range)
+            .values('brand__name').annotate(**ROLLUP_TOTALS).order_by('-revenue')[:10]
+        ),
+        'top_categories': (
+            by_category.values('category__name').annotate(**ROLLUP_TOTALS).order_by('-revenue')[:10]
+        ),
+        'top_products': (
+            ProductSalesDaily.objects.filter(**in_range)
+            .values('product_id', 'product__name', 'product__sku')
+            .annotate(**ROLLUP_TOTALS).order_by('-revenue')[:10]
+        ),
+    }
+    return render(request, 'store/sales_dashboard.html', context)
+
+
+# ============================================
+# 📤 STAFF EXPORTS (streamed CSV / JSONL)
+# ============================================
+
+@staff_member_required
+@require_GET
+def export_data(request, dataset):
+    """
+    📤 Download products / orders / order_items as CSV or JSONL.
+    GET /staff/export/orders/?format=jsonl&status=delivered&from=2025-01-01&to=2025-12-31
+    Streamed straight from the database cursor, so memory stays flat.
+    """
+    fmt = request.GET.get('format', 'csv')
+    if dataset not in DATASETS or fmt not in FORMATS:
+        raise Http404("Unknown export.")
+
+    # A typo in a date must not silently export the whole history
+    for bound in ('from', 'to'):
+        if request.GET.get(bound) and _query_date(request, bound) is None:
+            return HttpResponseBadRequest(f"'{bound}' must be a real date, YYYY-MM-DD.")
+
+    filters = {
+        'from': _query_date(request, 'from'),
+        'to': _query_date(request, 'to'),
+        'status': request.GET.get('status') or None,
+        'brand': request.GET.get('brand') or None,
+        'category': request.GET.get('category') or None,
+    }
+    response = StreamingHttpResponse(export_lines(dataset, fmt, filters), content_type=FORMATS[fmt])
+    stamp = timezone.localdate().isoformat()
+    response['Content-Disposition'] = f'attachment; filename="{dataset}-{stamp}.{fmt}"'
+    return response
+
+
+# ============================================
+# 📈 REQUEST METRICS (Prometheus scrape, slow queries)
+# ============================================
+
+@staff_member_required
+@require_GET
+def metrics(request):
+    """
+    📈 Per-view request histograms in Prometheus text format
+    (all gunicorn workers when METRICS_DB is set, see store/metrics.py).
+    """
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@staff_member_required
+@require_GET
+def slow_queries(request):
+    """
+    🐢 Queries over SLOW_QUERY_MS grouped by fingerprint, by total time,
+    with their call sites and query plan (store/slowlog.py).
+    """
+    context = {
+        'threshold_ms': settings.SLOW_QUERY_MS,
+        'groups': slowlog.report(),
+    }
+    return render(request, 'store/slow_queries.html', context)
+
+
+# ============================================
+# 🔬 SAMPLED PROFILES (cProfile dumps)
+# ============================================
+
+@staff_member_required
+@require_GET
+def profile_list(request):
+    """
+    🔬 Saved request profiles grouped by view, with the top cumulative
+    functions of the selected view (all its dumps merged).
+    GET /staff/profiles/?view=product_list
+    """
+    views = profiling.dumps_by_view()
+    selected = request.GET.get('view') or next(iter(views), None)
+    context = {
+        'views': [(name, len(paths)) for name, paths in views.items()],
+        'selected': selected,
+        'dumps': views.get(selected, [])[:20],
+        'functions': profiling.top_functions(views.get(selected, [])),
+        'every_n': settings.PROFILE_EVERY_N,
+        'on_request': settings.PROFILE_ON_REQUEST,
+    }
+    return render(request, 'store/profile_list.html', context)
+
+
+@staff_member_required
+@require_GET
+def profile_download(request, name):
+    """⬇️ One raw .pstats dump (for snakeviz / python -m pstats)."""
+    path = profiling.dump_path(name)
+    if path is None:
+        raise Http404("No such profile.")
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=name)
+
+
+# 🖼 MEDIA FILES
+# -------------
+
+def media_file(request, name, digest=None):
+    """
+    🖼 Uploaded images: hashed URLs cached for a year, conditional and Range
+    requests, sendfile / X-Accel-Redirect and WebP / gzip variants
+    (see store/media.py).
+    """
+    return media.serve(request, name, digest)
@@ -0,0 +1,151 @@
+# store/warmup.py
+"""
+🔥 Worker warm-up
+
+A fresh worker pays for a lot on its first requests: importing the views,
+compiling templates, building the in-memory catalog indexes, opening the
+database. ``warm_up()`` does all of that before any visitor is waiting:
+
+- ``compile_templates()`` ➝ every template, into the cached loader
+- ``prime_caches()``      ➝ ``catalog.barcode_index`` and ``search.autocomplete``
+- ``run_requests()``      ➝ one synthetic GET through each hot view
+
+gunicorn.conf.py calls it once in the master before forking (preload), so
+the workers start with all of it already in (copy-on-write shared) memory,
+and ``connect()`` in each worker, since connections can't be shared.
+
+Every step is best effort: a failure is logged, never stops the server.
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from .models import Brand, Category, Product
+
+
+logger = logging.getLogger(__name__)
+
+
+def compile_templates():
+    """Load every template file once. Returns ``(compiled, failed)``."""
+    compiled = failed = 0
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        names = set()
+        for loader in engine.engine.template_loaders:
+            for directory in loader.get_dirs():
+                for root, _dirs, files in os.walk(directory):
+                    names.update(
+                        os.path.relpath(os.path.join(root, name), directory)
+                        for name in files if not name.startswith('.')
+                    )
+        for name in sorted(names):
+            try:
+                engine.get_template(name)
+                compiled += 1
+            except Exception as exc:   # e.g. a tag library of an app that isn't installed
+                logger.debug("template %s not compiled: %s", name, exc)
+                failed += 1
+    return compiled, failed
+
+
+def prime_caches():
+    """Build the per-worker catalog indexes now instead of on the first scan / keystroke."""
+    from .catalog import barcode_index
+    from .search import autocomplete
+
+    barcode_index.load()
+    autocomplete.build()
+
+
+def hot_urls():
+    """One URL per hot view, using the first product / brand / category in the database."""
+    urls = [reverse('home'), reverse('login'), f"{reverse('product_autocomplete')}?q=a"]
+    product = Product.objects.order_by('id').values_list('id', 'upc').first()
+    if product:
+        urls += [reverse('product_detail', args=[product[0]]), f"{reverse('product_lookup')}?code={product[1]}"]
+    brand = Brand.objects.order_by('id').values_list('slug', flat=True).first()
+    if brand:
+        # product_list filtered: the same code as the full list, a fraction of the rows
+        urls += [reverse('brand_products', args=[brand]), f"{reverse('product_list')}?brand={brand}"]
+    category = Category.objects.order_by('id').values_list('slug', flat=True).first()
+    if category:
+        urls.append(reverse('category_products', args=[category]))
+    return urls
+
+
+def run_requests(urls=None):
+    """
+    GET each URL through the full middleware stack. Returns
+    ``[(url, status, ms), ...]``.
+
+    Nothing is written: sessions go to a signed cookie, and metrics / slow
+    query log are off so warm-up requests don't show up in /metrics.
+    """
+    results = []
+    with override_settings(
+        ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+        SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies',
+        METRICS_ENABLED=False,
+        SLOW_QUERY_MS=0,
+        PRERENDERED_PAGES=False,   # warm the views, not the files
+    ):
+        client = Client(raise_request_exception=False)
+        for url in urls if urls is not None else hot_urls():
+            started = time.perf_counter()
+            response = client.get(url)
+            results.append((url, response.status_code, round((time.perf_counter() - started) * 1000, 1)))
+    return results
+
+
+def connect():
+    """
+    Open this process's database connections (with their PRAGMAs) ahead of
+    the first request. Only for persistent ones (``CONN_MAX_AGE``): the
+    others are closed again when the first request starts.
+    """
+    for alias in connections:
+        if not connections[alias].settings_dict.get('CONN_MAX_AGE'):
+            continue
+        try:
+            connections[alias].ensure_connection()
+        except Exception as exc:
+            logger.warning("warm-up: could not connect to %r: %s", alias, exc)
+
+
+def warm_up():
+    """
+    Run all the steps. Returns a report, e.g.::
+
+        {'templates': 112, 'template_errors': 0, 'caches_ms': 850.2,
+         'requests': [('/', 200, 41.0), ...], 'seconds': 2.1}
+    """
+    started = time.perf_counter()
+    report = {'templates': 0, 'template_errors': 0, 'caches_ms': None, 'requests': []}
+    try:
+        report['templates'], report['template_errors'] = compile_templates()
+    except Exception:
+        logger.exception("warm-up: compiling templates failed")
+
+    step = time.perf_counter()
+    try:
+        prime_caches()
+        report['caches_ms'] = round((time.perf_counter() - step) * 1000, 1)
+    except Exception:
+        logger.exception("warm-up: priming the catalog caches failed")
+
+    try:
+        report['requests'] = run_requests()
+    except Exception:
+        logger.exception("warm-up: synthetic requests failed")
+
+    report['seconds'] = round(time.perf_counter() - started, 2)
+    return report